@@ -0,0 +1,458 @@
+"""Background alert engine: indicator rules evaluated across a watchlist.
+
+Rules such as ``RSI > 70`` or ``SMA50 crosses above SMA200`` are parsed once
+into vectorized checks over every watched symbol at the same time. The engine
+keeps the last ``WINDOW`` daily closes of each symbol in one (symbols, bars)
+matrix, seeded from history when a symbol is first watched. Each cycle then
+only moves the newest bar forward from one batched quote request and runs the
+``kernels`` over that fixed window, so its cost does not grow with the length
+of the histories.
+
+A rule fires at most once per symbol and bar. Alerts are kept for the
+dashboard and appended to a JSON-lines sink, which also restores what has
+already fired after a restart.
+
+    python alerts.py watchlist.txt --every 60
+    STOCK_DATA_PROVIDER=fake python alerts.py --once --rules rules.txt
+
+The watchlist file uses the screener's universe format; rules files hold one
+``name: condition`` per line.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import kernels
+import metrics
+from cache import refresh_quotes
+from data_provider import MAX_WORKERS
+from helpers import FLOAT32_TOLERANCE, load_stock_data
+from indicators import INDICATOR_COLUMNS
+from screener import RSI_OVERBOUGHT, RSI_OVERSOLD, read_universe
+from symbols import SEED_SYMBOLS
+
+# Bars of history behind every symbol; long enough for SMA200 and for the
+# EMAs to forget where the window starts
+WINDOW = 400
+SEED_PERIOD = "2y"
+
+# Seconds between cycles, and the longest a cycle may take before it is reported
+CYCLE_EVERY = 60
+CYCLE_BUDGET = 5.0
+
+# Alerts kept in memory for the dashboard
+RECENT_ALERTS = 200
+
+DEFAULT_SINK = os.path.join(os.path.expanduser("~"), ".cache", "real-time-stock", "alerts.jsonl")
+
+DEFAULT_RULES = [
+    ("rsi_overbought", f"RSI > {RSI_OVERBOUGHT}"),
+    ("rsi_oversold", f"RSI < {RSI_OVERSOLD}"),
+    ("golden_cross", "SMA50 crosses above SMA200"),
+    ("death_cross", "SMA50 crosses below SMA200"),
+    ("bb_breakout_up", "Close crosses above BB_Upper"),
+    ("bb_breakout_down", "Close crosses below BB_Lower"),
+    ("macd_bullish", "MACD crosses above MACD_Signal"),
+    ("macd_bearish", "MACD crosses below MACD_Signal"),
+]
+
+OPERANDS = ["Close"] + INDICATOR_COLUMNS
+
+# Bars a column needs before it is defined
+MIN_BARS = {
+    "Close": 1, "SMA20": 20, "SMA50": 50, "SMA200": 200, "EMA20": 20, "EMA50": 50, "RSI": 14,
+    "MACD": 26, "MACD_Signal": 34, "MACD_Hist": 34, "BB_Upper": 20, "BB_Lower": 20, "BB_Mid": 20,
+}
+
+# Window kernels: (columns produced, function(closes) -> one array per column)
+_KERNELS = [
+    (("Close",), lambda closes: (closes,)),
+    (("SMA20",), lambda closes: (kernels.sma(closes, 20),)),
+    (("SMA50",), lambda closes: (kernels.sma(closes, 50),)),
+    (("SMA200",), lambda closes: (kernels.sma(closes, 200),)),
+    (("EMA20",), lambda closes: (kernels.ema(closes, 20),)),
+    (("EMA50",), lambda closes: (kernels.ema(closes, 50),)),
+    (("RSI",), lambda closes: (kernels.rsi(closes, 14),)),
+    (("MACD", "MACD_Signal", "MACD_Hist"), kernels.macd),
+    (("BB_Upper", "BB_Mid", "BB_Lower"), kernels.bollinger),
+]
+
+_COMPARISONS = {">": np.greater, "<": np.less, ">=": np.greater_equal, "<=": np.less_equal}
+_RULE_PATTERN = re.compile(r"\s*(\S+)\s+(>=|<=|>|<|crosses above|crosses below)\s+(\S+)\s*", re.IGNORECASE)
+
+metrics.registry.describe("dashboard_alerts_total", "Alerts fired by the alert engine")
+metrics.registry.describe("dashboard_alert_cycle_seconds",
+                          "Wall time of one alert engine cycle, not counting history loads for new symbols")
+metrics.registry.describe("dashboard_alert_cycles_over_budget_total",
+                          "Alert engine cycles slower than their latency budget")
+
+
+def sink_path():
+    """Location of the alert sink, or ``None`` if ``STOCK_ALERT_SINK`` is ``off``"""
+    path = os.environ.get("STOCK_ALERT_SINK", DEFAULT_SINK)
+    return None if path.lower() in ("", "off", "none") else path
+
+
+def _operand(token):
+    for column in OPERANDS:
+        if token.lower() == column.lower():
+            return column
+    try:
+        return float(token)
+    except ValueError:
+        raise ValueError(f"Unknown operand {token!r}; use a number or one of {', '.join(OPERANDS)}") from None
+
+
+class Rule:
+    """One parsed condition: ``left`` and ``right`` are column names or numbers"""
+
+    def __init__(self, name, condition):
+        match = _RULE_PATTERN.fullmatch(condition)
+        if match is None:
+            raise ValueError(f"Cannot parse rule {name!r}: {condition!r}")
+        self.name = name
+        self.condition = condition.strip()
+        self.left = _operand(match.group(1))
+        self.op = match.group(2).lower()
+        self.right = _operand(match.group(3))
+        if not any(isinstance(side, str) for side in (self.left, self.right)):
+            raise ValueError(f"Rule {name!r} compares two numbers")
+
+    @property
+    def columns(self):
+        return [side for side in (self.left, self.right) if isinstance(side, str)]
+
+    def check(self, tails):
+        """Which rows satisfy the rule on their newest bar
+
+        ``tails`` maps each column to a (symbols, 2) array of the previous and
+        newest values; a number operand broadcasts against them.
+        """
+        left = tails[self.left] if isinstance(self.left, str) else np.full((1, 2), self.left)
+        right = tails[self.right] if isinstance(self.right, str) else np.full((1, 2), self.right)
+        if self.op == "crosses above":
+            return (left[:, 0] <= right[:, 0]) & (left[:, 1] > right[:, 1])
+        if self.op == "crosses below":
+            return (left[:, 0] >= right[:, 0]) & (left[:, 1] < right[:, 1])
+        return _COMPARISONS[self.op](left[:, 1], right[:, 1])
+
+
+def read_rules(path):
+    """Return ``[(name, condition)]`` from a file of ``name: condition`` lines"""
+    rules = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                name, _, condition = line.partition(":")
+                rules.append((name.strip(), condition.strip()))
+    return rules
+
+
+def window_tails(closes, counts, columns):
+    """Previous and newest value of each column per row, NaN where a row has too few bars"""
+    tails = {}
+    bars = np.stack([counts - 1, counts], axis=1)
+    for produced, kernel in _KERNELS:
+        if not any(column in columns for column in produced):
+            continue
+        for column, values in zip(produced, kernel(closes)):
+            tail = values[:, -2:].copy()
+            tail[bars < MIN_BARS[column]] = np.nan
+            tails[column] = tail
+    return tails
+
+
+def _load_closes(ticker):
+    history = load_stock_data(ticker, SEED_PERIOD, "1d")
+    if history.empty:
+        return None, None
+    closes = history["Close"].to_numpy(dtype=np.float64)
+    finite = np.isfinite(closes)
+    if not finite.any():
+        return None, None
+    index = history.index[finite]
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return closes[finite], index[-1].to_datetime64().astype("M8[D]")
+
+
+class AlertEngine:
+    """Evaluates ``rules`` on the newest daily bar of every symbol in ``watchlist``"""
+
+    def __init__(self, watchlist, rules=DEFAULT_RULES, window=WINDOW, sink=None,
+                 budget=CYCLE_BUDGET, provider=None):
+        self.watchlist = list(dict.fromkeys(symbol.upper() for symbol in watchlist))
+        self.rules = [Rule(name, condition) for name, condition in rules]
+        self.columns = list(dict.fromkeys(column for rule in self.rules for column in rule.columns))
+        self.window = window
+        self.sink = sink
+        self.budget = budget
+        self._provider = provider
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        # One row per loaded symbol: the last ``window`` closes (short
+        # histories are padded with their first close), how many bars are
+        # real, and the day of the newest bar
+        self.tickers = []
+        self._rows = {}
+        self._closes = np.empty((0, window))
+        self._counts = np.empty(0, dtype=np.int64)
+        self._days = np.empty(0, dtype="M8[D]")
+
+        # (ticker, rule) -> day of the bar it last fired on
+        self._fired = {}
+        self.recent = deque(maxlen=RECENT_ALERTS)
+        # Guards ``recent`` alone, so readers never wait for a whole cycle
+        self._recent_lock = threading.Lock()
+        self.cycles = 0
+        self.over_budget = 0
+        self.last_cycle = None
+        self._restore()
+
+    def _restore(self):
+        if not self.sink or not os.path.exists(self.sink):
+            return
+        with open(self.sink) as f:
+            for line in f:
+                try:
+                    alert = json.loads(line)
+                    self._fired[(alert["ticker"], alert["rule"])] = np.datetime64(alert["bar"], "D")
+                except (ValueError, KeyError):
+                    continue
+                self.recent.append(alert)
+
+    def seed(self, tickers):
+        """Load the closing window of ``tickers`` from history; returns the symbols that failed"""
+        tickers = [t for t in tickers if t not in self._rows]
+        if not tickers:
+            return []
+
+        def load(ticker):
+            try:
+                return _load_closes(ticker)
+            except Exception:
+                return None, None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(tickers)))) as pool:
+            loaded = list(pool.map(load, tickers))
+
+        rows, counts, days, failed = [], [], [], []
+        for ticker, (closes, day) in zip(tickers, loaded):
+            if closes is None:
+                failed.append(ticker)
+                continue
+            closes = closes[-self.window:]
+            row = np.full(self.window, closes[0])
+            row[-len(closes):] = closes
+            rows.append(row)
+            counts.append(len(closes))
+            days.append(day)
+            self._rows[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        if rows:
+            self._closes = np.vstack([self._closes] + rows)
+            self._counts = np.concatenate([self._counts, counts])
+            self._days = np.concatenate([self._days, np.array(days, dtype="M8[D]")])
+        return failed
+
+    def apply_quotes(self, quotes, today=None):
+        """Move each quoted symbol's newest bar to the quote's price
+
+        A quote whose previous close is the window's previous bar revises the
+        newest bar. Otherwise a new session has started: the window shifts by
+        one bar, keeping the quote's previous close as the bar before it. When
+        the two newest closes are equal, a new calendar day decides.
+        """
+        quoted = [q for q in quotes if q.error is None and q.price is not None and q.ticker in self._rows]
+        if not quoted:
+            return
+        rows = np.array([self._rows[q.ticker] for q in quoted])
+        price = np.array([q.price for q in quoted], dtype=np.float64)
+        previous = np.array([np.nan if q.previous_close is None else q.previous_close for q in quoted],
+                            dtype=np.float64)
+        today = np.datetime64(today or "today", "D")
+
+        # Stored closes may be float32, so prices match to that precision
+        revises = np.abs(previous - self._closes[rows, -2]) <= FLOAT32_TOLERANCE
+        extends = np.abs(previous - self._closes[rows, -1]) <= FLOAT32_TOLERANCE
+        starts = np.isfinite(previous) & (~revises | (extends & (self._days[rows] < today)))
+        new = rows[starts]
+        if len(new):
+            self._closes[new, :-1] = self._closes[new, 1:]
+            self._closes[new, -2] = previous[starts]
+            self._counts[new] += 1
+            self._days[new] = np.maximum(self._days[new] + 1, today)
+        self._closes[rows, -1] = price
+
+    def evaluate(self):
+        """Check every rule on every loaded symbol and return the alerts not fired before"""
+        if not self.tickers:
+            return []
+        tails = window_tails(self._closes, self._counts, self.columns)
+        now = datetime.now().isoformat(timespec="seconds")
+        alerts = []
+        for rule in self.rules:
+            for row in np.flatnonzero(rule.check(tails)):
+                ticker = self.tickers[row]
+                day = self._days[row]
+                if self._fired.get((ticker, rule.name)) == day:
+                    continue
+                self._fired[(ticker, rule.name)] = day
+                value = tails[rule.columns[0]][row, 1]
+                alerts.append({"time": now, "ticker": ticker, "rule": rule.name, "condition": rule.condition,
+                               "bar": str(day), "close": round(float(self._closes[row, -1]), 4),
+                               "value": round(float(value), 4)})
+        return alerts
+
+    def _write(self, alerts):
+        os.makedirs(os.path.dirname(os.path.abspath(self.sink)), exist_ok=True)
+        with open(self.sink, "a") as f:
+            f.writelines(json.dumps(alert) + "\n" for alert in alerts)
+
+    def cycle(self):
+        """Seed new symbols, apply fresh quotes, evaluate and publish; returns the new alerts"""
+        start = time.perf_counter()
+        with self._lock:
+            missing = [t for t in self.watchlist if t not in self._rows]
+            if missing:
+                with metrics.span("alerts_seed", symbols=len(missing)):
+                    self.seed(missing)
+            # Loading history for newly watched symbols does not count against the budget
+            seeded = time.perf_counter()
+            if self.tickers:
+                with metrics.span("alerts_quotes", symbols=len(self.tickers)):
+                    quotes = refresh_quotes(self.tickers, provider=self._provider)
+                with metrics.span("alerts_evaluate", symbols=len(self.tickers), rules=len(self.rules)):
+                    self.apply_quotes(quotes)
+                    alerts = self.evaluate()
+            else:
+                alerts = []
+
+            if alerts and self.sink:
+                try:
+                    self._write(alerts)
+                except OSError as e:
+                    metrics.log_event("alert_sink_error", error=str(e))
+            with self._recent_lock:
+                self.recent.extend(alerts)
+            for alert in alerts:
+                metrics.registry.inc("dashboard_alerts_total", rule=alert["rule"])
+                metrics.log_event("alert", **alert)
+
+            end = time.perf_counter()
+            elapsed = end - seeded
+            self.cycles += 1
+            self.last_cycle = {"seconds": elapsed, "seed_seconds": seeded - start, "symbols": len(self.tickers),
+                               "alerts": len(alerts), "at": time.time()}
+        metrics.registry.observe("dashboard_alert_cycle_seconds", elapsed)
+        if elapsed > self.budget:
+            self.over_budget += 1
+            metrics.registry.inc("dashboard_alert_cycles_over_budget_total")
+            metrics.log_event("alert_cycle_over_budget", seconds=round(elapsed, 3), budget=self.budget)
+        return alerts
+
+    def recent_alerts(self, limit=None):
+        """Snapshot of the latest alerts, newest first"""
+        with self._recent_lock:
+            alerts = list(self.recent)
+        return alerts[::-1][:limit]
+
+    def start(self, every=CYCLE_EVERY):
+        """Run ``cycle`` every ``every`` seconds in a daemon thread until ``stop``"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(every,), name="alert-engine", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, every):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.cycle()
+            except Exception as e:
+                # A failed cycle is retried on schedule
+                metrics.log_event("alert_cycle_error", error=f"{type(e).__name__}: {e}")
+            self._stop.wait(max(0.0, every - (time.monotonic() - start)))
+
+    def stats(self):
+        return {"symbols": len(self.tickers), "watchlist": len(self.watchlist), "rules": len(self.rules),
+                "cycles": self.cycles, "over_budget": self.over_budget, "running": self.running}
+
+
+def default_watchlist():
+    """Symbols from the ``STOCK_ALERT_WATCHLIST`` file, or the built-in symbol list"""
+    path = os.environ.get("STOCK_ALERT_WATCHLIST")
+    if path:
+        return read_universe(path)
+    return [symbol for symbol, *_ in SEED_SYMBOLS]
+
+
+def default_rules():
+    """Rules from the ``STOCK_ALERT_RULES`` file, or ``DEFAULT_RULES``"""
+    path = os.environ.get("STOCK_ALERT_RULES")
+    return read_rules(path) if path else DEFAULT_RULES
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide engine, configured from the environment"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine(default_watchlist(), default_rules(), sink=sink_path())
+        return _engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("watchlist", nargs="?", help="universe file (default: the built-in symbol list)")
+    parser.add_argument("--rules", help="file of 'name: condition' lines (default: the screener's flags)")
+    parser.add_argument("--sink", default=sink_path(), help="JSON-lines file alerts are appended to")
+    parser.add_argument("--every", type=float, default=CYCLE_EVERY, help="seconds between cycles")
+    parser.add_argument("--budget", type=float, default=CYCLE_BUDGET, help="cycle latency budget in seconds")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    args = parser.parse_args()
+
+    watchlist = read_universe(args.watchlist) if args.watchlist else default_watchlist()
+    rules = read_rules(args.rules) if args.rules else default_rules()
+    engine = AlertEngine(watchlist, rules, sink=args.sink, budget=args.budget)
+    while True:
+        start = time.monotonic()
+        alerts = engine.cycle()
+        for alert in alerts:
+            print(f"{alert['bar']} {alert['ticker']:<6} {alert['rule']:<18} {alert['condition']} "
+                  f"(close {alert['close']:.2f}, {alert['value']:.2f})")
+        elapsed = time.monotonic() - start
+        print(f"Cycle {engine.cycles}: {len(engine.tickers):,} symbols, {len(alerts)} new alerts "
+              f"in {elapsed * 1e3:.0f} ms", file=sys.stderr)
+        if args.once:
+            return 0
+        time.sleep(max(0.0, args.every - elapsed))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
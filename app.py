@@ -1,12 +1,9 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
-import pytz
-import ta
+from metrics import Trace, prometheus_text, snapshot, span
+
+# Per-rerun timing spans for the debug panel and latency histograms
+trace = Trace()
+
 # test
 # Set page config with dark theme
 st.set_page_config(
@@ -163,235 +160,165 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Main dashboard
+st.markdown("<h1 class=''>Real Time Stock Dashboard</h1>", unsafe_allow_html=True)
+
+# Display popular tickers at the top; the cards are filled in at the end of the run
+st.subheader("Market Overview")
+overview_slot = st.container()
+trace.mark("first_paint")
+
+# Data, indicator and chart modules (pandas and friends) load after the page shell is on screen
+with span("imports", trace):
+    import pandas as pd
+    from cache import cache_stats, cached_info, cached_quotes, invalidate_quotes, prefetch_quotes, quote_cache
+    from data_provider import QuoteSnapshot, get_provider
+    from indicators import LiveTail
+    from helpers import base_frames, format_number, get_stock_data, get_stocks_data, refresh_stock_data, with_indicators
+    from charts import CHART_TYPES, MAX_POINTS, create_candlestick_chart, create_comparison_chart
+    from compare import CORRELATION_WINDOW, PriceMatrix
+    from memory import SessionMemory, sessions_bytes
+    from pyramid import INTERVALS, resample, resolve
+    from live import REFRESH_INTERVALS, get_poller
+    from symbols import get_index
+    from alerts import get_engine
+    from pipeline import Pipeline
+
+POPULAR_TICKERS = ["AAPL", "GOOGL", "AMZN", "META", "MSFT", "TSLA", "NVDA", "JPM"]
+
+# Memoized quotes are refetched after this many seconds even if nothing changed
+QUOTES_MAX_AGE = 60
+
+# Seconds between refreshes of the alert list, and how many alerts it shows
+ALERT_REFRESH = 30
+ALERTS_SHOWN = 20
+
 # Helper functions
-def format_number(num):
-    """Format numbers with suffixes like K, M, B, T for better readability"""
-    if num is None:
-        return "N/A"
-    
-    magnitude = 0
-    suffixes = ["", "K", "M", "B", "T"]
-    while abs(num) >= 1000 and magnitude < len(suffixes) - 1:
-        magnitude += 1
-        num /= 1000.0
-    
-    if magnitude > 0:
-        return f"{num:.2f}{suffixes[magnitude]}"
-    else:
-        return f"{num:.2f}"
+def get_live_bars(history, ticker, refresh_every):
+    """The poller's newest bars from the last bar of the cached history on, or None"""
+    # The poller fetches base bars from the start of the last shown bar, which resample back into it
+    bars = get_poller().bars(ticker, base_interval, history.index[-1], refresh_every)
+    if bars is None or bars.empty:
+        return None
+    return bars if interval == base_interval else resample(bars, interval)
 
-def get_stock_data(ticker, period="1y", interval="1d"):
-    """Fetch stock data from Yahoo Finance"""
-    stock = yf.Ticker(ticker)
-    history = stock.history(period=period, interval=interval)
-    
-    if not history.empty:
-        # Calculate additional metrics
-        history['Date'] = history.index
-        history['Change'] = history['Close'].pct_change() * 100
-        history['Range'] = history['High'] - history['Low']
-        
-        # Add technical indicators
-        history = add_technical_indicators(history)
-    
-    return stock, history
+def get_live_history(history, ticker, refresh_every):
+    """Splice the poller's newest bars onto the cached history without refetching it
 
-def add_technical_indicators(df):
-    """Add technical indicators to the dataframe"""
-    if df.empty:
-        return df
-    
-    # Moving Averages
-    df['SMA20'] = ta.trend.sma_indicator(df['Close'], window=20)
-    df['SMA50'] = ta.trend.sma_indicator(df['Close'], window=50)
-    df['SMA200'] = ta.trend.sma_indicator(df['Close'], window=200)
-    df['EMA20'] = ta.trend.ema_indicator(df['Close'], window=20)
-    df['EMA50'] = ta.trend.ema_indicator(df['Close'], window=50)
-    
-    # RSI
-    df['RSI'] = ta.momentum.rsi(df['Close'], window=14)
-    
-    # MACD
-    macd = ta.trend.MACD(df['Close'])
-    df['MACD'] = macd.macd()
-    df['MACD_Signal'] = macd.macd_signal()
-    df['MACD_Hist'] = macd.macd_diff()
-    
-    # Bollinger Bands
-    bollinger = ta.volatility.BollingerBands(df['Close'])
-    df['BB_Upper'] = bollinger.bollinger_hband()
-    df['BB_Lower'] = bollinger.bollinger_lband()
-    df['BB_Mid'] = bollinger.bollinger_mavg()
-    
-    return df
-
-def create_candlestick_chart(df, ticker, time_period, selected_indicators):
-    """Create an interactive candlestick chart with technical indicators"""
-    # Create figure with secondary y-axis
-    fig = make_subplots(
-        rows=2, 
-        cols=1, 
-        shared_xaxes=True,
-        vertical_spacing=0.1,
-        row_heights=[0.8, 0.2],
-        specs=[[{"secondary_y": True}],
-               [{"secondary_y": False}]]
-    )
-    
-    # Add candlestick chart
-    fig.add_trace(
-        go.Candlestick(
-            x=df.index,
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            name="Price",
-            increasing_line_color='#26a69a', 
-            decreasing_line_color='#ef5350'
-        ),
-        row=1, col=1
-    )
-    
-    # Add volume bar chart
-    fig.add_trace(
-        go.Bar(
-            x=df.index, 
-            y=df['Volume'],
-            name='Volume',
-            marker=dict(
-                color='rgba(100, 100, 255, 0.5)',
-            )
-        ),
-        row=2, col=1
-    )
-    
-    # Add selected technical indicators
-    if 'SMA20' in selected_indicators:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['SMA20'],
-                name='SMA 20',
-                line=dict(color='rgba(255, 255, 100, 0.8)', width=1.5)
-            ),
-            row=1, col=1
-        )
+    Indicators of the spliced bars come from this session's streaming engine,
+    so a tick pays for the polled bars instead of recomputing the whole history.
+    """
+    bars = get_live_bars(history, ticker, refresh_every)
+    if bars is None:
+        return history
+    tail = st.session_state.get("live_tail")
+    if tail is None or not tail.matches(history):
+        tail = st.session_state.live_tail = LiveTail(history)
+    return tail.splice(bars)
+
+def get_quotes(tickers, refresh_every=None):
+    """Quotes from the live poller in live mode, otherwise from the shared cache"""
+    if refresh_every:
+        return get_poller().quotes(tickers, refresh_every)
+    return cached_quotes(tickers)
+
+def session_memory():
+    """This session's accounting of the shared history frames it has loaded"""
+    if "memory" not in st.session_state:
+        st.session_state.memory = SessionMemory()
+    return st.session_state.memory
+
+def fragment_trace(name):
+    """The page trace during a full run, or a new trace for a fragment-only rerun"""
+    return Trace(name) if trace.finished else trace
+
+def finish_fragment(fragment):
+    if fragment is not trace:
+        fragment.finish()
+
+def render_debug_panel(trace, elapsed):
+    """Timing spans, upstream counters, latency percentiles and Prometheus export"""
+    st.metric("Last rerun", f"{elapsed * 1e3:.0f} ms")
+    if trace.spans:
+        st.dataframe(pd.DataFrame(trace.spans).round(2), hide_index=True)
+    if pipeline.runs:
+        st.markdown("**Render stages** (computed or reused from the last rerun)")
+        st.dataframe(pd.DataFrame(pipeline.runs), hide_index=True)
     
-    if 'SMA50' in selected_indicators:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['SMA50'],
-                name='SMA 50',
-                line=dict(color='rgba(255, 100, 100, 0.8)', width=1.5)
-            ),
-            row=1, col=1
-        )
+    data = snapshot()
+    upstream = [dict(c["labels"], metric=c["name"].replace("dashboard_upstream_", ""), value=c["value"])
+                for c in data["counters"] if c["name"].startswith("dashboard_upstream_")]
+    if upstream:
+        st.markdown("**Upstream calls by ticker**")
+        table = pd.DataFrame(upstream).pivot_table(
+            index=["ticker", "method"], columns="metric", values="value", aggfunc="sum", fill_value=0)
+        st.dataframe(table)
     
-    if 'EMA20' in selected_indicators:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['EMA20'],
-                name='EMA 20',
-                line=dict(color='rgba(100, 255, 100, 0.8)', width=1.5)
-            ),
-            row=1, col=1
-        )
+    resilience = get_provider().stats()
+    events = {}
+    for c in data["counters"]:
+        if c["name"] == "dashboard_resilience_events_total":
+            events[c["labels"]["event"]] = events.get(c["labels"]["event"], 0) + c["value"]
+    st.markdown("**Upstream resilience**")
+    st.dataframe(pd.DataFrame(resilience["breakers"]), hide_index=True)
+    if events:
+        st.caption(" · ".join(f"{event}: {count}" for event, count in sorted(events.items())))
     
-    if 'BB' in selected_indicators:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['BB_Upper'],
-                name='BB Upper',
-                line=dict(color='rgba(150, 150, 150, 0.5)', width=1),
-                hoverinfo='skip'
-            ),
-            row=1, col=1
-        )
-        
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['BB_Lower'],
-                name='BB Lower',
-                line=dict(color='rgba(150, 150, 150, 0.5)', width=1),
-                fill='tonexty',
-                fillcolor='rgba(150, 150, 150, 0.1)',
-                hoverinfo='skip'
-            ),
-            row=1, col=1
-        )
+    memory = session_memory()
+    st.markdown(f"**Session memory** ({memory.total / 2**20:.2f} of {memory.budget / 2**20:.0f} MB)")
+    if memory.rows():
+        st.dataframe(pd.DataFrame(memory.rows()), hide_index=True)
     
-    if 'RSI' in selected_indicators:
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df['RSI'],
-                name='RSI',
-                line=dict(color='#9C27B0', width=1.5)
-            ),
-            row=2, col=1
-        )
-        
-        # Add RSI reference lines
-        fig.add_hline(y=70, line_width=1, line_dash="dash", line_color="red", row=2, col=1)
-        fig.add_hline(y=30, line_width=1, line_dash="dash", line_color="green", row=2, col=1)
+    st.markdown("**Latency (seconds, bucket upper bounds)**")
+    latency = [dict(h["labels"], metric=h["name"], count=h["count"], p50=h["p50"], p95=h["p95"], p99=h["p99"])
+               for h in data["histograms"]]
+    st.dataframe(pd.DataFrame(latency), hide_index=True)
     
-    # Update layout
-    fig.update_layout(
-        title=f'{ticker} {time_period} Chart',
-        xaxis_title='',
-        yaxis_title='Price (USD)',
-        xaxis_rangeslider_visible=False,
-        template='plotly_dark',
-        height=600,
-        hovermode='x unified',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        margin=dict(l=0, r=0, t=50, b=0)
-    )
+    gauges = [(f"dashboard_cache_{key}", {"cache": stats["name"]}, value)
+              for stats in cache_stats() for key, value in stats.items() if key != "name"]
+    gauges += [("dashboard_breaker_open", {"breaker": b["name"]}, int(b["state"] != "closed"))
+               for b in resilience["breakers"]]
+    gauges += [("dashboard_session_history_bytes", {}, sessions_bytes())]
+    text = prometheus_text(gauges)
+    with st.expander("Prometheus metrics"):
+        st.code(text, language="text")
+    st.download_button("Download metrics", text, file_name="metrics.prom", mime="text/plain")
+
+def render_comparison(benchmark, period, interval):
+    """Normalized prices, relative strength and correlation of several symbols on one chart"""
+    histories = pipeline.get("histories", params)
+    matrix = pipeline.get("comparison", params)
+    # The base bars the views were derived from stay cached too, so they count against the budget
+    session_memory().track({**base_frames(histories, period, interval),
+                            **{(symbol, period, interval): history for symbol, history in histories.items()}})
+    failed = [symbol for symbol in histories if symbol not in matrix]
+    if failed:
+        st.warning(f"No data available for {', '.join(failed)}")
+    if not len(matrix):
+        return
+    if benchmark not in matrix:
+        benchmark = matrix.tickers[0]
     
-    # Update y-axis labels
-    fig.update_yaxes(title_text="Price (USD)", row=1, col=1)
+    st.markdown(f"""
+    <div class="stock-header">
+        <div class="stock-symbol">{benchmark}</div>
+        <div style="font-size: 1.5rem; opacity: 0.7;">vs {len(matrix) - 1} symbols, {period} ({interval})</div>
+    </div>
+    """, unsafe_allow_html=True)
     
-    if 'RSI' in selected_indicators:
-        fig.update_yaxes(title_text="RSI", range=[0, 100], row=2, col=1)
-    else:
-        fig.update_yaxes(title_text="Volume", row=2, col=1)
+    fig = pipeline.get("comparison_figure", params)
+    with span("serialize", trace, tickers=len(matrix)):
+        st.plotly_chart(fig, use_container_width=True)
     
-    return fig
+    table = pipeline.get("summary", params)
+    st.dataframe(table.round(2), hide_index=True, use_container_width=True)
 
 # Get popular tickers data for quick view
-def get_popular_tickers_data():
-    popular_tickers = ["AAPL", "GOOGL", "AMZN", "META", "MSFT", "TSLA", "NVDA", "JPM"]
-    results = []
-    
-    for pticker in popular_tickers:
-        try:
-            pstock = yf.Ticker(pticker)
-            pinfo = pstock.info
-            pprice = pinfo.get('currentPrice', None)
-            pchange = pinfo.get('regularMarketChange', 0)
-            pchange_pct = pinfo.get('regularMarketChangePercent', 0) * 100
-            
-            results.append({
-                "ticker": pticker,
-                "price": pprice,
-                "change": pchange,
-                "change_pct": pchange_pct
-            })
-        except:
-            pass
-    
-    return results
+def get_popular_tickers_data(refresh_every=None):
+    if refresh_every:
+        # Failed symbols are skipped
+        return [quote for quote in get_quotes(POPULAR_TICKERS, refresh_every) if quote.error is None]
+    return pipeline.get("quotes", params)
 
 # Sidebar
 with st.sidebar:
@@ -401,6 +328,19 @@ with st.sidebar:
     st.subheader("Ticker")
     ticker = st.text_input("", value="AAPL", key="ticker_input").upper()
     
+    # Comparison mode: the ticker above is the benchmark for the symbols listed here
+    st.subheader("Compare")
+    compare_input = st.text_input("Compare with (comma separated)", value="", key="compare_input")
+    compare_tickers = [symbol for symbol in dict.fromkeys(part.strip().upper() for part in compare_input.split(","))
+                       if symbol and symbol != ticker]
+    correlation_window = st.slider(
+        "Correlation window (bars)",
+        min_value=5,
+        max_value=120,
+        value=CORRELATION_WINDOW,
+        disabled=not compare_tickers
+    )
+    
     # Time period selection
     st.subheader("Time Period")
     time_period = st.selectbox(
@@ -409,11 +349,23 @@ with st.sidebar:
         index=5
     )
     
+    # Bars are resampled locally from a cached base resolution; Auto sizes them to the period
+    st.subheader("Interval")
+    interval_choice = st.selectbox(
+        "",
+        options=["Auto"] + INTERVALS,
+        index=0,
+        key="interval"
+    )
+    interval, base_interval, _ = resolve(time_period, None if interval_choice == "Auto" else interval_choice)
+    if interval_choice not in ("Auto", interval):
+        st.caption(f"{interval_choice} bars only go back one month; showing {interval} bars")
+    
     # Chart type
     st.subheader("Chart Type")
     chart_type = st.selectbox(
         "",
-        options=["Candlestick", "Line", "OHLC"],
+        options=CHART_TYPES,
         index=0
     )
     
@@ -425,210 +377,393 @@ with st.sidebar:
         default=["SMA20", "EMA20"]
     )
     
+    # Live mode reruns only the price cards, key metrics and chart
+    st.subheader("Live Updates")
+    live = st.toggle("Auto-refresh prices", value=False)
+    refresh_interval = st.select_slider(
+        "Refresh every (seconds)",
+        options=REFRESH_INTERVALS,
+        value=5,
+        disabled=not live
+    )
+    refresh_every = refresh_interval if live else None
+    
+    # The alert engine runs in the background for the whole server once started
+    st.subheader("Alerts")
+    watch_alerts = st.toggle("Watch alert rules", value=False)
+    alerts_slot = st.container()
+    
     # Update button
     update = st.button("Update", type="primary")
+    
+    # Debug metrics are filled in once the page has rendered
+    st.subheader("Debug")
+    show_debug = st.checkbox("Show debug metrics", value=False)
+    debug_panel = st.container()
 
-# Main dashboard
-st.markdown("<h1 class=''>Real Time Stock Dashboard</h1>", unsafe_allow_html=True)
+# Update refetches what is on screen instead of serving it from the shared caches
+if update:
+    st.session_state.refresh = st.session_state.get("refresh", 0) + 1
+    invalidate_quotes(POPULAR_TICKERS + [ticker])
+    for symbol in [ticker] + compare_tickers:
+        refresh_stock_data(symbol, time_period, interval)
 
-# Display popular tickers at the top
-st.subheader("Market Overview")
-popular_data = get_popular_tickers_data()
-
-# Create columns for popular stocks
-if popular_data:
-    cols = st.columns(4)
-    for i, stock_data in enumerate(popular_data):
-        col_idx = i % 4
-        with cols[col_idx]:
-            price_color = "profit" if stock_data["change"] >= 0 else "loss"
-            change_sign = "+" if stock_data["change"] >= 0 else ""
-            
-            # Create clickable ticker containers
-            st.markdown(f"""
-            <div class="metric-container" onclick="document.querySelector('#ticker_input').value='{stock_data['ticker']}'; document.querySelector('button[type=primary]').click();" style="cursor:pointer;">
-                <div class="metric-title">{stock_data['ticker']}</div>
-                <div class="metric-value">${stock_data['price']:.2f}</div>
-                <div class="metric-label {price_color}">{change_sign}{stock_data['change']:.2f} ({change_sign}{stock_data['change_pct']:.2f}%)</div>
-            </div>
-            """, unsafe_allow_html=True)
+# Market Overview quotes load in the background while the main content renders; only
+# missing ones are fetched, after the Update above has dropped what it refetches
+if any(quote_cache.peek(symbol) is None for symbol in POPULAR_TICKERS):
+    prefetch_quotes(POPULAR_TICKERS)
+
+# The page as a DAG of stages; each is recomputed only when its inputs or an upstream stage changed
+pipeline = Pipeline(st.session_state.setdefault("pipeline", {}), trace)
+params = {
+    "tickers": POPULAR_TICKERS,
+    "ticker": ticker,
+    "compare_tickers": compare_tickers,
+    "period": time_period,
+    "interval": interval,
+    "chart_type": chart_type,
+    "selected_indicators": selected_indicators,
+    "correlation_window": correlation_window,
+    "refresh": st.session_state.get("refresh", 0),
+}
+
+@pipeline.stage("quotes", inputs=["tickers", "refresh"], max_age=QUOTES_MAX_AGE)
+def quotes_stage(tickers, refresh):
+    # One batched fetch for uncached tickers; failed symbols are skipped
+    return [quote for quote in cached_quotes(tickers) if quote.error is None]
+
+# History stages are lookups in the shared cache: what follows them is recomputed
+# when the cache serves new bars, and the memo never keeps a dropped frame alive
+@pipeline.stage("history", inputs=["ticker", "period", "interval"], shared=True)
+def history_stage(ticker, period, interval):
+    return get_stock_data(ticker, period=period, interval=interval)
+
+@pipeline.stage("indicators", inputs=["ticker", "period", "interval", "selected_indicators"], after=["history"],
+                shared=True)
+def indicators_stage(history, ticker, period, interval, selected_indicators):
+    # Only the selected indicators are computed; the extended frame replaces the cached one
+    return with_indicators(history, selected_indicators, (ticker, period, interval))
+
+@pipeline.stage("figure", inputs=["ticker", "period", "interval", "chart_type", "selected_indicators"],
+                after=["indicators"])
+def figure_stage(indicators, ticker, period, interval, chart_type, selected_indicators):
+    return create_candlestick_chart(indicators, ticker, f"{period} {interval}", selected_indicators, chart_type=chart_type)
+
+@pipeline.stage("cards", inputs=["ticker", "refresh"], max_age=QUOTES_MAX_AGE)
+def cards_stage(ticker, refresh):
+    # A light quote snapshot, not the full company info payload
+    quote = cached_quotes([ticker])[0]
+    if quote.error is not None or quote.day_high is None:
+        quote = QuoteSnapshot.from_bars(ticker, get_stock_data(ticker, period="5d", interval="1d"), source="history")
+    return quote
+
+@pipeline.stage("info", inputs=["ticker"])
+def info_stage(ticker):
+    return cached_info(ticker)
+
+@pipeline.stage("peers", inputs=["ticker", "refresh"], after=["info"], max_age=QUOTES_MAX_AGE)
+def peers_stage(info, ticker, refresh):
+    """Sector and quotes of related stocks from the symbol index (same industry first, then sector)"""
+    meta = get_index().get(ticker)
+    sector = meta["sector"] if meta else info.get('sector', None)
+    if not sector:
+        return None, []
+    related_tickers = get_index().peers(ticker, limit=5, sector=sector, industry=info.get('industry'))
+    return sector, cached_quotes(related_tickers) if related_tickers else []
+
+@pipeline.stage("histories", inputs=["ticker", "compare_tickers", "period", "interval"], shared=True)
+def histories_stage(ticker, compare_tickers, period, interval):
+    # One batched load for all compared symbols
+    return get_stocks_data([ticker] + compare_tickers, period=period, interval=interval)
+
+@pipeline.stage("comparison", inputs=["interval"], after=["histories"])
+def comparison_stage(histories, interval):
+    # The symbols are aligned into a single (tickers, bars) matrix
+    return PriceMatrix.from_histories(histories, interval)
+
+@pipeline.stage("comparison_figure", inputs=["ticker", "correlation_window"], after=["comparison"])
+def comparison_figure_stage(comparison, ticker, correlation_window):
+    return create_comparison_chart(comparison, ticker if ticker in comparison else comparison.tickers[0],
+                                   correlation_window)
+
+@pipeline.stage("summary", inputs=["ticker", "interval"], after=["comparison"])
+def summary_stage(comparison, ticker, interval):
+    return comparison.summary(ticker if ticker in comparison else comparison.tickers[0], interval)
+
+@st.fragment(run_every=refresh_every)
+def market_overview():
+    fragment = fragment_trace("market_overview")
+    with span("quotes", fragment):
+        popular_data = get_popular_tickers_data(refresh_every)
+    
+    # Create columns for popular stocks
+    if popular_data:
+        cols = st.columns(4)
+        for i, stock_data in enumerate(popular_data):
+            col_idx = i % 4
+            with cols[col_idx]:
+                price_color = "profit" if stock_data.change >= 0 else "loss"
+                change_sign = "+" if stock_data.change >= 0 else ""
+                
+                # Create clickable ticker containers
+                st.markdown(f"""
+                <div class="metric-container" onclick="document.querySelector('#ticker_input').value='{stock_data.ticker}'; document.querySelector('button[type=primary]').click();" style="cursor:pointer;">
+                    <div class="metric-title">{stock_data.ticker}</div>
+                    <div class="metric-value">${stock_data.price:.2f}</div>
+                    <div class="metric-label {price_color}">{change_sign}{stock_data.change:.2f} ({change_sign}{stock_data.change_pct:.2f}%)</div>
+                </div>
+                """, unsafe_allow_html=True)
+    finish_fragment(fragment)
+
+@st.fragment(run_every=ALERT_REFRESH)
+def alert_feed():
+    engine = get_engine()
+    engine.start()
+    last = engine.last_cycle
+    if last is None:
+        st.caption(f"Loading {len(engine.watchlist)} symbols for the first check...")
+    else:
+        st.caption(f"{last['symbols']} symbols, {len(engine.rules)} rules checked in {last['seconds'] * 1e3:.0f} ms")
+    recent = engine.recent_alerts(ALERTS_SHOWN)
+    if recent:
+        st.dataframe(pd.DataFrame(recent)[["bar", "ticker", "rule", "close"]], hide_index=True)
+    else:
+        st.caption("No alerts yet")
 
 # Main content
-if ticker:
+if ticker and compare_tickers:
+    render_comparison(ticker, time_period, interval)
+elif ticker:
     # Get stock data
-    stock, history = get_stock_data(ticker, period=time_period)
+    history = pipeline.get("history", params)
+    session_memory().track({**base_frames([ticker], time_period, interval), (ticker, time_period, interval): history})
     
     if not history.empty:
-        # Get basic info
-        info = stock.info
-        current_price = info.get('currentPrice', history['Close'].iloc[-1])
-        previous_close = info.get('previousClose', history['Close'].iloc[-2] if len(history) > 1 else None)
+        # Stock header; the name comes from the symbol index until company info is loaded
+        meta = get_index().get(ticker)
+        header = st.empty()
+        def render_header(company_name):
+            header.markdown(f"""
+            <div class="stock-header">
+                <div class="stock-symbol">{ticker}</div>
+                <div style="font-size: 1.5rem; opacity: 0.7;">{company_name}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        render_header(meta["name"] if meta else ticker)
         
-        # Calculate price change
-        if previous_close:
-            price_change = current_price - previous_close
-            price_change_pct = (price_change / previous_close) * 100
-        else:
-            price_change = 0
-            price_change_pct = 0
+        @st.fragment(run_every=refresh_every)
+        def key_metrics():
+            fragment = fragment_trace("key_metrics")
+            if refresh_every:
+                with span("quotes", fragment, ticker=ticker):
+                    quote = get_quotes([ticker], refresh_every)[0]
+                if quote.error is not None or quote.day_high is None:
+                    daily = history if interval == "1d" else get_stock_data(ticker, period="5d", interval="1d")
+                    quote = QuoteSnapshot.from_bars(ticker, daily, source="history")
+            else:
+                quote = pipeline.get("cards", params)
+            current_price, previous_close = quote.price, quote.previous_close
+            day_high, day_low, volume = quote.day_high, quote.day_low, quote.volume
+            
+            if refresh_every and interval == "1d":
+                # Day range and volume from the forming bar
+                with span("live_bars", fragment, ticker=ticker):
+                    bars = get_live_bars(history, ticker, refresh_every)
+                last_bar = history.iloc[-1] if bars is None else bars.iloc[-1]
+                day_high, day_low, volume = last_bar['High'], last_bar['Low'], last_bar['Volume']
+            
+            # Calculate price change
+            if previous_close:
+                price_change = current_price - previous_close
+                price_change_pct = (price_change / previous_close) * 100
+            else:
+                price_change = 0
+                price_change_pct = 0
+            
+            # Display key metrics
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                price_color = "profit" if price_change >= 0 else "loss"
+                change_sign = "+" if price_change >= 0 else ""
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">Last Price</div>
+                    <div class="metric-value">{current_price:.2f} USD</div>
+                    <div class="metric-label {price_color}">{change_sign}{price_change:.2f} ({change_sign}{price_change_pct:.2f}%)</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col2:
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">Day High</div>
+                    <div class="metric-value">{day_high:.2f} USD</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col3:
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">Day Low</div>
+                    <div class="metric-value">{day_low:.2f} USD</div>
+                </div>
+                """, unsafe_allow_html=True)
+            
+            with col4:
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">Volume</div>
+                    <div class="metric-value">{format_number(volume)}</div>
+                </div>
+                """, unsafe_allow_html=True)
+            finish_fragment(fragment)
         
-        # Stock header with company name
-        company_name = info.get('shortName', ticker)
-        st.markdown(f"""
-        <div class="stock-header">
-            <div class="stock-symbol">{ticker}</div>
-            <div style="font-size: 1.5rem; opacity: 0.7;">{company_name}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        key_metrics()
         
-        # Display key metrics
-        col1, col2, col3, col4 = st.columns(4)
+        # Fundamentals are filled in after the chart, so prices and the chart paint first
+        fundamentals = st.container()
+        overview = st.container()
         
-        with col1:
-            price_color = "profit" if price_change >= 0 else "loss"
-            change_sign = "+" if price_change >= 0 else ""
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Last Price</div>
-                <div class="metric-value">{current_price:.2f} USD</div>
-                <div class="metric-label {price_color}">{change_sign}{price_change:.2f} ({change_sign}{price_change_pct:.2f}%)</div>
-            </div>
-            """, unsafe_allow_html=True)
+        # Create and display chart inside container
+        @st.fragment(run_every=refresh_every)
+        def price_chart():
+            fragment = fragment_trace("price_chart")
+            st.markdown(f"<div class='chart-container'>", unsafe_allow_html=True)
+            chart_history = history
+            if refresh_every:
+                # Newest bars come from the poller; the cached history is not refetched
+                with span("indicators", fragment, ticker=ticker, bars=len(history)):
+                    # Computed once into the cache entry; later ticks find the columns there
+                    chart_history = with_indicators(get_stock_data(ticker, time_period, interval), selected_indicators,
+                                                    (ticker, time_period, interval))
+                with span("live_bars", fragment, ticker=ticker):
+                    chart_history = get_live_history(chart_history, ticker, refresh_every)
+                with span("figure", fragment, ticker=ticker):
+                    fig = create_candlestick_chart(chart_history, ticker, f"{time_period} {interval}", selected_indicators, chart_type=chart_type)
+            else:
+                fig = pipeline.get("figure", params)
+            # Streamlit serializes the figure to JSON inside plotly_chart
+            with span("serialize", fragment, ticker=ticker):
+                st.plotly_chart(fig, use_container_width=True)
+            if len(chart_history) > MAX_POINTS:
+                st.caption(f"{len(chart_history):,} bars downsampled to {MAX_POINTS:,} points per trace for display")
+            st.markdown("</div>", unsafe_allow_html=True)
+            finish_fragment(fragment)
         
-        with col2:
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Day High</div>
-                <div class="metric-value">{info.get('dayHigh', history['High'].max()):.2f} USD</div>
-            </div>
-            """, unsafe_allow_html=True)
+        price_chart()
         
-        with col3:
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Day Low</div>
-                <div class="metric-value">{info.get('dayLow', history['Low'].min()):.2f} USD</div>
-            </div>
-            """, unsafe_allow_html=True)
+        # Company info is only needed below the chart: the fundamentals row and overview
+        info = pipeline.get("info", params)
+        if meta is None and info.get('shortName'):
+            render_header(info['shortName'])
         
-        with col4:
-            volume = info.get('volume', history['Volume'].iloc[-1])
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Volume</div>
-                <div class="metric-value">{format_number(volume)}</div>
-            </div>
-            """, unsafe_allow_html=True)
+        with fundamentals:
+            col1, col2, col3, col4 = st.columns(4)
         
-        # Additional metrics row
-        col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">Market Cap</div>
+                    <div class="metric-value">{format_number(info.get('marketCap', 'N/A'))}</div>
+                </div>
+                """, unsafe_allow_html=True)
         
-        with col1:
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Market Cap</div>
-                <div class="metric-value">{format_number(info.get('marketCap', 'N/A'))}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            with col2:
+                pe_ratio = info.get('trailingPE', 'N/A')
+                pe_display = f"{pe_ratio:.2f}" if isinstance(pe_ratio, (int, float)) else pe_ratio
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">P/E Ratio</div>
+                    <div class="metric-value">{pe_display}</div>
+                </div>
+                """, unsafe_allow_html=True)
         
-        with col2:
-            pe_ratio = info.get('trailingPE', 'N/A')
-            pe_display = f"{pe_ratio:.2f}" if isinstance(pe_ratio, (int, float)) else pe_ratio
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">P/E Ratio</div>
-                <div class="metric-value">{pe_display}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            with col3:
+                div_yield = info.get('dividendYield', 0)
+                div_display = f"{div_yield * 100:.2f}%" if div_yield else "N/A"
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">Dividend Yield</div>
+                    <div class="metric-value">{div_display}</div>
+                </div>
+                """, unsafe_allow_html=True)
         
-        with col3:
-            div_yield = info.get('dividendYield', 0)
-            div_display = f"{div_yield * 100:.2f}%" if div_yield else "N/A"
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">Dividend Yield</div>
-                <div class="metric-value">{div_display}</div>
-            </div>
-            """, unsafe_allow_html=True)
+            with col4:
+                fifty_two_wk_high = info.get('fiftyTwoWeekHigh', 'N/A')
+                fifty_two_wk_low = info.get('fiftyTwoWeekLow', 'N/A')
+                st.markdown(f"""
+                <div class="metric-container">
+                    <div class="metric-title">52-Week Range</div>
+                    <div class="metric-value">{fifty_two_wk_low if isinstance(fifty_two_wk_low, str) else f"{fifty_two_wk_low:.2f}"} - {fifty_two_wk_high if isinstance(fifty_two_wk_high, str) else f"{fifty_two_wk_high:.2f}"}</div>
+                </div>
+                """, unsafe_allow_html=True)
         
-        with col4:
-            fifty_two_wk_high = info.get('fiftyTwoWeekHigh', 'N/A')
-            fifty_two_wk_low = info.get('fiftyTwoWeekLow', 'N/A')
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-title">52-Week Range</div>
-                <div class="metric-value">{fifty_two_wk_low if isinstance(fifty_two_wk_low, str) else f"{fifty_two_wk_low:.2f}"} - {fifty_two_wk_high if isinstance(fifty_two_wk_high, str) else f"{fifty_two_wk_high:.2f}"}</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-             # Show additional company information
-        if 'longBusinessSummary' in info:
-            with st.expander("Company Overview"):
-                st.write(info['longBusinessSummary'])
+        # Show additional company information
+        with overview:
+            if 'longBusinessSummary' in info:
+                with st.expander("Company Overview"):
+                    st.write(info['longBusinessSummary'])
                 
-                # Display additional company info in columns
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.markdown("**Sector:** " + info.get('sector', 'N/A'))
-                    st.markdown("**Industry:** " + info.get('industry', 'N/A'))
-                    st.markdown("**Country:** " + info.get('country', 'N/A'))
+                    # Display additional company info in columns
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("**Sector:** " + info.get('sector', 'N/A'))
+                        st.markdown("**Industry:** " + info.get('industry', 'N/A'))
+                        st.markdown("**Country:** " + info.get('country', 'N/A'))
                 
-                with col2:
-                    st.markdown("**Employees:** " + str(info.get('fullTimeEmployees', 'N/A')))
-                    st.markdown("**Website:** " + info.get('website', 'N/A'))
-                    st.markdown("**Exchange:** " + info.get('exchange', 'N/A'))
-        
-        # Create and display chart inside container
-        st.markdown(f"<div class='chart-container'>", unsafe_allow_html=True)
-        fig = create_candlestick_chart(history, ticker, time_period, selected_indicators)
-        st.plotly_chart(fig, use_container_width=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+                    with col2:
+                        st.markdown("**Employees:** " + str(info.get('fullTimeEmployees', 'N/A')))
+                        st.markdown("**Website:** " + info.get('website', 'N/A'))
+                        st.markdown("**Exchange:** " + info.get('exchange', 'N/A'))
         
        
         
-        # Display related stocks
-        sector = info.get('sector', None)
+        # Display related stocks from the symbol index (same industry first, then sector)
+        sector, related_quotes = pipeline.get("peers", params)
         if sector:
             st.subheader(f"***Other {sector} Stocks***")
-            # Get stocks in same sector
-            sector_tickers = {
-                "Technology": ["AAPL", "MSFT", "GOOGL", "META", "NVDA"],
-                "Healthcare": ["JNJ", "PFE", "UNH", "MRK", "ABBV"],
-                "Finance": ["JPM", "BAC", "WFC", "C", "GS"],
-                "Consumer": ["AMZN", "WMT", "PG", "KO", "MCD"],
-                "Energy": ["XOM", "CVX", "COP", "SLB", "EOG"],
-                "Industrial": ["CAT", "HON", "MMM", "GE", "BA"]
-            }
-            
-            related_tickers = sector_tickers.get(sector, [])[:5]
-            related_tickers = [t for t in related_tickers if t != ticker]
             
-            if related_tickers:
-                cols = st.columns(len(related_tickers))
+            if related_quotes:
+                cols = st.columns(len(related_quotes))
                 
-                for i, rel_ticker in enumerate(related_tickers):
-                    try:
-                        rel_stock = yf.Ticker(rel_ticker)
-                        rel_info = rel_stock.info
-                        rel_price = rel_info.get('currentPrice', None)
-                        rel_change = rel_info.get('regularMarketChange', 0)
-                        rel_change_pct = rel_info.get('regularMarketChangePercent', 0) * 100
-                        
-                        price_color = "profit" if rel_change >= 0 else "loss"
-                        change_sign = "+" if rel_change >= 0 else ""
-                        
-                        with cols[i]:
-                            st.markdown(f"""
-                            <div class="metric-container" onclick="document.querySelector('#ticker_input').value='{rel_ticker}'; document.querySelector('button[type=primary]').click();" style="cursor:pointer;">
-                                <div class="metric-title">{rel_ticker}</div>
-                                <div class="metric-value">${rel_price:.2f}</div>
-                                <div class="metric-label {price_color}">{change_sign}{rel_change:.2f} ({change_sign}{rel_change_pct:.2f}%)</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                    except Exception as e:
+                for i, rel_quote in enumerate(related_quotes):
+                    rel_ticker = rel_quote.ticker
+                    if rel_quote.error is not None:
                         with cols[i]:
                             st.error(f"Could not load data for {rel_ticker}")
+                        continue
+                    
+                    rel_price = rel_quote.price
+                    rel_change = rel_quote.change
+                    rel_change_pct = rel_quote.change_pct
+                    
+                    price_color = "profit" if rel_change >= 0 else "loss"
+                    change_sign = "+" if rel_change >= 0 else ""
+                    
+                    with cols[i]:
+                        st.markdown(f"""
+                        <div class="metric-container" onclick="document.querySelector('#ticker_input').value='{rel_ticker}'; document.querySelector('button[type=primary]').click();" style="cursor:pointer;">
+                            <div class="metric-title">{rel_ticker}</div>
+                            <div class="metric-value">${rel_price:.2f}</div>
+                            <div class="metric-label {price_color}">{change_sign}{rel_change:.2f} ({change_sign}{rel_change_pct:.2f}%)</div>
+                        </div>
+                        """, unsafe_allow_html=True)
     else:
         st.error(f"No data available for {ticker}")
 else:
     st.info("Please enter a stock ticker in the sidebar and click Update to view stock information.")
+
+# Market Overview goes into its slot under the title, from the prefetched quotes
+with overview_slot:
+    market_overview()
+
+if watch_alerts:
+    with alerts_slot:
+        alert_feed()
+
+# Record this rerun and show the debug panel in the sidebar
+rerun_seconds = trace.finish()
+if show_debug:
+    with debug_panel:
+        render_debug_panel(trace, rerun_seconds)
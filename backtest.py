@@ -0,0 +1,280 @@
+"""Vectorized parameter sweeps of the dashboard's indicator strategies.
+
+Every combination of a strategy's parameter grid is evaluated in one pass
+per symbol: the indicator is computed once per distinct window with the
+``kernels``, the long/flat positions of all combinations are broadcast into
+one (combinations, bars) matrix, and returns, drawdown and hit rate come out
+of array operations over that matrix. Symbols are sharded across worker
+processes like the screener.
+
+    python backtest.py universe.txt --strategy sma_cross
+    python backtest.py universe.txt --strategy rsi --grid window=7,14,21 lower=20:40:5 upper=60:80:5
+    STOCK_DATA_PROVIDER=fake python backtest.py universe.txt --source provider --cost 5 --output sweep.csv
+
+Strategies are long-only. ``sma_cross`` and ``ema_cross`` hold while the
+fast average is above the slow one, ``macd`` while the MACD line is above
+its signal line, and ``rsi`` buys when RSI falls below ``lower`` and sells
+when it rises above ``upper``. Positions are taken at a bar's close and held
+over the next bar.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import kernels
+from screener import CHUNK_SIZE, SOURCES, load_history, read_universe, write_result
+
+# Parameter grids swept when none is given; they include the dashboard's
+# own settings (SMA 20/50/200, RSI 14 at 30/70, MACD 12/26/9)
+DEFAULT_GRIDS = {
+    "sma_cross": {"fast": [5, 10, 20, 30, 40, 50], "slow": [50, 75, 100, 150, 200, 250]},
+    "ema_cross": {"fast": [5, 10, 20, 30, 40, 50], "slow": [50, 75, 100, 150, 200, 250]},
+    "rsi": {"window": [7, 10, 14, 21], "lower": [20, 25, 30, 35, 40], "upper": [60, 65, 70, 75, 80]},
+    "macd": {"fast": [8, 10, 12, 15], "slow": [20, 26, 30, 35], "signal": [5, 7, 9, 12]},
+}
+
+# Combinations are evaluated in blocks of about this many (combination, bar) cells
+BLOCK_CELLS = 2**22
+
+METRIC_COLUMNS = ["return_pct", "max_drawdown_pct", "hit_rate_pct", "trades", "exposure_pct"]
+
+
+def _cross_positions(close, grid, average):
+    fast = np.asarray(grid["fast"], dtype=np.int64)
+    slow = np.asarray(grid["slow"], dtype=np.int64)
+    fast_ma = np.stack([average(close, window) for window in fast])
+    slow_ma = np.stack([average(close, window) for window in slow])
+    pairs = np.nonzero(fast[:, None] < slow[None, :])
+    # (fast, slow, bars) broadcast, keeping the pairs whose fast window is shorter
+    above = fast_ma[:, None, :] > slow_ma[None, :, :]
+    return np.column_stack([fast[pairs[0]], slow[pairs[1]]]), above[pairs]
+
+
+def hold(entry, exit):
+    """Long from each ``entry`` bar until the next ``exit`` bar, along the last axis"""
+    bars = np.arange(entry.shape[-1], dtype=np.int32)
+    last_entry = np.maximum.accumulate(np.where(entry, bars, -1), axis=-1)
+    last_exit = np.maximum.accumulate(np.where(exit, bars, -1), axis=-1)
+    return last_entry > last_exit
+
+
+def _rsi_positions(close, grid):
+    windows = np.asarray(grid["window"], dtype=np.int64)
+    lower = np.asarray(grid["lower"], dtype=np.float64)
+    upper = np.asarray(grid["upper"], dtype=np.float64)
+    rsi = np.stack([kernels.rsi(close, window) for window in windows])
+    low, high = np.nonzero(lower[:, None] < upper[None, :])
+
+    # (threshold pairs, bars) per window: buy below the lower level, sell above the upper one
+    held = np.empty((len(windows), len(low), len(close)), dtype=bool)
+    for i, values in enumerate(rsi):
+        held[i] = hold(values[None, :] < lower[low][:, None], values[None, :] > upper[high][:, None])
+
+    params = np.column_stack([np.repeat(windows, len(low)), np.tile(lower[low], len(windows)),
+                              np.tile(upper[high], len(windows))])
+    return params, held.reshape(-1, len(close))
+
+
+def _macd_positions(close, grid):
+    fast = np.asarray(grid["fast"], dtype=np.int64)
+    slow = np.asarray(grid["slow"], dtype=np.int64)
+    signal = np.asarray(grid["signal"], dtype=np.int64)
+    fast_ema = np.stack([kernels.ema(close, window) for window in fast])
+
+    params, positions = [], []
+    for window in slow:
+        shorter = fast < window
+        if not shorter.any() or len(close) < window:
+            continue
+        # MACD lines of every shorter fast window against this slow one
+        line = fast_ema[shorter] - kernels.ema(close, window)
+        for span in signal:
+            # The signal EMA starts at the first defined MACD value, as in ``kernels.macd``
+            signal_line = np.full(line.shape, np.nan)
+            signal_line[:, window - 1:] = kernels.ema(line[:, window - 1:], span)
+            positions.append(line > signal_line)
+            params.extend((f, window, span) for f in fast[shorter])
+    if not positions:
+        return np.empty((0, 3), dtype=np.int64), np.empty((0, len(close)), dtype=bool)
+    return np.array(params), np.concatenate(positions)
+
+
+# Strategy name -> (parameter names, function(close, grid) -> (params, positions))
+STRATEGIES = {
+    "sma_cross": (["fast", "slow"], lambda close, grid: _cross_positions(close, grid, kernels.sma)),
+    "ema_cross": (["fast", "slow"], lambda close, grid: _cross_positions(close, grid, kernels.ema)),
+    "rsi": (["window", "lower", "upper"], _rsi_positions),
+    "macd": (["fast", "slow", "signal"], _macd_positions),
+}
+
+
+def evaluate(close, positions, cost=0.0):
+    """Return, drawdown, hit rate, trades and exposure for each row of ``positions``
+
+    ``positions`` is a (combinations, bars) boolean matrix of the bars at
+    whose close the strategy is long. ``cost`` is charged as a fraction of
+    equity on every entry and exit. Returns a dict of arrays, one value per
+    combination, with percentages for the ``_pct`` entries.
+    """
+    close = kernels.as_float_array(close)
+    combinations = positions.shape[0]
+    returns = close[1:] / close[:-1] - 1
+    # A position taken at one close earns the next bar's return
+    held = positions[:, :-1]
+    steps = held.shape[1]
+
+    # +1 where a run of held bars starts, -1 one past where it ends
+    padded = np.zeros((combinations, steps + 2), dtype=np.int8)
+    padded[:, 1:-1] = held
+    edges = np.diff(padded, axis=1)
+
+    # Log returns are taken once per symbol; only bars that pay a cost need their own
+    log_steps = np.where(held, np.log1p(returns), 0.0)
+    if cost:
+        charged = (edges[:, :-1] > 0).astype(np.int8) + (edges[:, 1:] < 0)
+        rows, bars = np.nonzero(charged)
+        log_steps[rows, bars] = np.log1p(returns[bars] - cost * charged[rows, bars])
+    log_equity = np.zeros((combinations, steps + 1))
+    np.cumsum(log_steps, axis=1, out=log_equity[:, 1:])
+    peak = np.maximum.accumulate(log_equity, axis=1)
+    drawdown = np.expm1(np.subtract(log_equity, peak, out=peak).min(axis=1))
+
+    # Trades pair up in row-major order: each start with the next end in its row
+    rows, bars = np.nonzero(edges)
+    opens = edges[rows, bars] > 0
+    rows, starts, ends = rows[opens], bars[opens], bars[~opens]
+    trade_returns = log_equity[rows, ends] - log_equity[rows, starts]
+    trades = np.bincount(rows, minlength=combinations)
+    wins = np.bincount(rows, weights=trade_returns > 0, minlength=combinations)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(trades > 0, wins / trades, np.nan)
+
+    return {
+        "return_pct": np.expm1(log_equity[:, -1]) * 100,
+        "max_drawdown_pct": drawdown * 100,
+        "hit_rate_pct": hit_rate * 100,
+        "trades": trades,
+        "exposure_pct": held.mean(axis=1) * 100 if steps else np.zeros(combinations),
+    }
+
+
+def sweep(close, strategy, grid=None, cost=0.0):
+    """Evaluate every combination of ``grid`` for one close series as a DataFrame"""
+    names, positions_of = STRATEGIES[strategy]
+    grid = {**DEFAULT_GRIDS[strategy], **(grid or {})}
+    close = kernels.as_float_array(close)
+    params, positions = positions_of(close, grid)
+    result = pd.DataFrame(params, columns=names)
+    for name in names:
+        if (result[name] % 1 == 0).all():
+            result[name] = result[name].astype(np.int64)
+    rows = max(1, BLOCK_CELLS // max(len(close), 1))
+    blocks = [evaluate(close, positions[i:i + rows], cost) for i in range(0, len(positions), rows)]
+    for column in METRIC_COLUMNS:
+        result[column] = np.concatenate([block[column] for block in blocks]) if blocks else []
+    return result
+
+
+def backtest_symbols(tickers, strategy, grid=None, cost=0.0, source="store", period="5y", interval="1d",
+                     data_dir=None):
+    """Sweep the grid on a chunk of symbols; runs inside a worker process"""
+    frames = []
+    for ticker in tickers:
+        try:
+            close = load_history(ticker, source, period, interval, data_dir)["Close"].dropna().to_numpy()
+            if len(close) < 2:
+                raise ValueError("not enough bars")
+            result = sweep(close, strategy, grid, cost)
+            result.insert(0, "ticker", ticker)
+            result["buy_hold_pct"] = (close[-1] / close[0] - 1) * 100
+            result["error"] = None
+        except Exception as e:
+            result = pd.DataFrame({"ticker": [ticker], "error": [f"{type(e).__name__}: {e}"]})
+        frames.append(result)
+    return frames
+
+
+def run_backtest(tickers, strategy, grid=None, workers=None, chunk_size=CHUNK_SIZE, **options):
+    """Sweep ``tickers`` across ``workers`` processes and return one row per symbol and combination"""
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        frames = [frame for chunk in chunks for frame in backtest_symbols(chunk, strategy, grid, **options)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(backtest_symbols, chunk, strategy, grid, **options) for chunk in chunks]
+            frames = [frame for future in futures for frame in future.result()]
+
+    columns = ["ticker"] + STRATEGIES[strategy][0] + METRIC_COLUMNS + ["buy_hold_pct", "error"]
+    return pd.concat(frames, ignore_index=True).reindex(columns=columns)
+
+
+def summarize(result, strategy):
+    """Mean metrics per combination across symbols, best mean return first"""
+    names = STRATEGIES[strategy][0]
+    ok = result[result["error"].isna()]
+    summary = ok.groupby(names)[METRIC_COLUMNS + ["buy_hold_pct"]].mean()
+    summary["symbols"] = ok.groupby(names).size()
+    return summary.sort_values("return_pct", ascending=False).reset_index()
+
+
+def parse_grid(items):
+    """``["fast=5,10,20", "slow=50:200:50"]`` -> ``{"fast": [5, 10, 20], "slow": [50, 100, 150, 200]}``"""
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition("=")
+        if ":" in values:
+            start, stop, step = (float(part) for part in values.split(":"))
+            numbers = list(np.arange(start, stop + step / 2, step))
+        else:
+            numbers = [float(part) for part in values.split(",") if part]
+        grid[name.strip()] = [int(n) if float(n).is_integer() else n for n in numbers]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("universe", help="file with one symbol per line, or a CSV with a Symbol column")
+    parser.add_argument("--strategy", choices=list(STRATEGIES), default="sma_cross")
+    parser.add_argument("--grid", nargs="*", metavar="NAME=VALUES",
+                        help="parameter values as a,b,c or start:stop:step (default: DEFAULT_GRIDS)")
+    parser.add_argument("--cost", type=float, default=0.0, help="cost per entry and exit in basis points")
+    parser.add_argument("--output", help="CSV or .parquet file for every symbol and combination")
+    parser.add_argument("--top", type=int, default=10, help="combinations to print, by mean return")
+    parser.add_argument("--source", choices=SOURCES, default="store",
+                        help="local bar store (default), CSV directory, or the configured data provider")
+    parser.add_argument("--data-dir", help="store root or CSV directory (one <SYMBOL>.csv per symbol)")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.source == "csv" and not args.data_dir:
+        parser.error("--source csv requires --data-dir")
+    grid = parse_grid(args.grid)
+    unknown = set(grid) - set(STRATEGIES[args.strategy][0])
+    if unknown:
+        parser.error(f"{args.strategy} has no parameter {', '.join(sorted(unknown))}")
+
+    tickers = read_universe(args.universe)
+    start = time.perf_counter()
+    result = run_backtest(tickers, args.strategy, grid, workers=args.workers, chunk_size=args.chunk_size,
+                          cost=args.cost / 1e4, source=args.source, period=args.period,
+                          interval=args.interval, data_dir=args.data_dir)
+    elapsed = time.perf_counter() - start
+    failed = result.loc[result["error"].notna(), "ticker"].nunique()
+
+    if args.output:
+        write_result(result, args.output)
+    evaluated = int(result["error"].isna().sum())
+    print(summarize(result, args.strategy).head(args.top).round(2).to_string(index=False))
+    print(f"Evaluated {evaluated:,} symbol/combination pairs for {len(tickers):,} symbols in {elapsed:.1f}s "
+          f"({evaluated / elapsed:,.0f}/s, {failed:,} symbols failed)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Time one alert engine cycle against recomputing indicators over full histories.
+
+    python benchmarks/bench_alerts.py --symbols 100 500 2000 --cycles 5
+
+For each watchlist size, seeds an ``AlertEngine`` from the fake provider and
+times ``--cycles`` cycles that each start a new bar for every symbol (quotes
+are made up locally, so only the evaluation is timed), then the same with a
+per-symbol loop that appends the bar and recomputes every indicator over the
+symbol's whole history, the way the screener does. Both must fire the same
+rules before anything is reported. The last column is one full ``cycle()``
+including the batched quote request to the fake provider.
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_STORE_DIR"] = "off"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from alerts import CYCLE_BUDGET, SEED_PERIOD, AlertEngine
+from data_provider import make_quote
+from helpers import load_stock_data
+from indicators import add_technical_indicators
+
+
+def fake_quotes(engine, rng):
+    """A new session for every symbol: the price moves up to 3% from the newest close"""
+    closes = engine._closes[:, -1]
+    prices = closes * (1 + rng.uniform(-0.03, 0.03, len(closes)))
+    return [make_quote(ticker, price, close) for ticker, price, close in zip(engine.tickers, prices, closes)]
+
+
+def engine_cycles(engine, quotes):
+    fired = []
+    start = time.perf_counter()
+    for batch in quotes:
+        engine.apply_quotes(batch)
+        fired.append({(alert["ticker"], alert["rule"]) for alert in engine.evaluate()})
+    return (time.perf_counter() - start) / len(quotes), fired
+
+
+def pandas_cycles(engine, histories, quotes):
+    fired = []
+    start = time.perf_counter()
+    for batch in quotes:
+        triggered = set()
+        for quote in batch:
+            df = histories[quote.ticker]
+            bar = pd.DataFrame({"Close": [quote.price]}, index=[df.index[-1] + pd.Timedelta(days=1)])
+            df = histories[quote.ticker] = pd.concat([df[["Close"]], bar])
+            df = add_technical_indicators(df)
+            tails = {column: df[column].to_numpy()[-2:][None, :] for column in engine.columns}
+            triggered.update((quote.ticker, rule.name) for rule in engine.rules if rule.check(tails)[0])
+        fired.append(triggered)
+    return (time.perf_counter() - start) / len(quotes), fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--cycles", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8}{'engine ms':>11}{'full history ms':>17}{'speedup':>9}{'cycle ms':>10}"
+          f"{'budget':>8}")
+    for symbols in args.symbols:
+        tickers = [f"S{i:04d}" for i in range(symbols)]
+        engine = AlertEngine(tickers, sink=None)
+        engine.seed(tickers)
+        histories = {ticker: load_stock_data(ticker, SEED_PERIOD, "1d")[["Close"]].astype("float64")
+                     for ticker in tickers}
+
+        rng = np.random.default_rng(0)
+        quotes = []
+        for _ in range(args.cycles):
+            batch = fake_quotes(engine, rng)
+            quotes.append(batch)
+            engine.apply_quotes(batch)
+
+        # Replay the same quotes on a fresh engine and on the full histories
+        engine = AlertEngine(tickers, sink=None)
+        engine.seed(tickers)
+        engine_time, ours = engine_cycles(engine, quotes)
+        pandas_time, theirs = pandas_cycles(engine, histories, quotes)
+        # Rules at their threshold may differ by rounding; count the disagreements
+        mismatched = sum(len(a ^ b) for a, b in zip(ours, theirs))
+        if mismatched > sum(len(b) for b in theirs) * 0.01:
+            sys.exit(f"{mismatched} alerts differ from the full-history indicators at {symbols} symbols")
+
+        start = time.perf_counter()
+        engine.cycle()
+        cycle_time = time.perf_counter() - start
+        print(f"{symbols:>8}{engine_time * 1e3:>11.2f}{pandas_time * 1e3:>17.1f}"
+              f"{pandas_time / engine_time:>8.0f}x{cycle_time * 1e3:>10.1f}{CYCLE_BUDGET:>7.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Parameter-sweep throughput: the broadcast backtester against a per-combination pandas loop.
+
+    python benchmarks/bench_backtest.py --bars 1260 5040 --symbols 16 --workers 1 4
+
+For each strategy and history length, sweeps the default grid and a dense
+one with ``backtest.sweep`` and reports combinations per second. The pandas
+loop (rolling/ewm indicators and a returns series per combination, the way
+the ad-hoc tuning scripts did it) is timed on a sample of combinations and
+checked against the sweep's returns. The last table runs ``run_backtest``
+over ``--symbols`` synthetic symbols with each ``--workers`` count.
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_STORE_DIR"] = "off"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import ta
+
+from backtest import DEFAULT_GRIDS, STRATEGIES, run_backtest, sweep
+from data_provider import synthetic_ohlcv
+
+DENSE_GRIDS = {
+    "sma_cross": {"fast": list(range(2, 62, 2)), "slow": list(range(50, 310, 10))},
+    "ema_cross": {"fast": list(range(2, 62, 2)), "slow": list(range(50, 310, 10))},
+    "rsi": {"window": list(range(5, 31)), "lower": list(range(15, 46)), "upper": list(range(55, 86))},
+    "macd": {"fast": list(range(5, 21)), "slow": list(range(20, 41, 2)), "signal": list(range(3, 16))},
+}
+
+# Combinations the pandas loop is timed on
+SAMPLE = 20
+
+
+def pandas_return(close, strategy, params):
+    """Total return (%) of one combination, computed one indicator at a time with pandas"""
+    if strategy in ("sma_cross", "ema_cross"):
+        fast, slow = int(params["fast"]), int(params["slow"])
+        if strategy == "sma_cross":
+            a, b = close.rolling(fast).mean(), close.rolling(slow).mean()
+        else:
+            a = close.ewm(span=fast, adjust=False, min_periods=fast).mean()
+            b = close.ewm(span=slow, adjust=False, min_periods=slow).mean()
+        position = a > b
+    elif strategy == "rsi":
+        rsi = ta.momentum.rsi(close, window=int(params["window"]))
+        signal = pd.Series(np.where(rsi < params["lower"], 1.0, np.where(rsi > params["upper"], 0.0, np.nan)))
+        position = signal.ffill().fillna(0) > 0
+    else:
+        fast, slow, span = int(params["fast"]), int(params["slow"]), int(params["signal"])
+        line = (close.ewm(span=fast, adjust=False, min_periods=fast).mean()
+                - close.ewm(span=slow, adjust=False, min_periods=slow).mean())
+        position = line > line.ewm(span=span, adjust=False, min_periods=span).mean()
+    returns = close.pct_change().fillna(0)
+    return ((1 + returns * position.shift(1, fill_value=False)).prod() - 1) * 100
+
+
+def bench_sweeps(bars_list):
+    print(f"{'strategy':>11}{'grid':>9}{'bars':>7}{'combos':>8}{'sweep ms':>10}{'combos/s':>11}"
+          f"{'loop combos/s':>15}{'speedup':>9}")
+    for bars in bars_list:
+        close = synthetic_ohlcv(bars, seed=1)["Close"].to_numpy()
+        series = pd.Series(close)
+        for strategy in STRATEGIES:
+            for label, grids in (("default", DEFAULT_GRIDS), ("dense", DENSE_GRIDS)):
+                start = time.perf_counter()
+                result = sweep(close, strategy, grids[strategy])
+                elapsed = time.perf_counter() - start
+
+                sample = result.iloc[np.linspace(0, len(result) - 1, SAMPLE).astype(int)]
+                start = time.perf_counter()
+                theirs = [pandas_return(series, strategy, row) for _, row in sample.iterrows()]
+                loop = (time.perf_counter() - start) / len(sample)
+                if not np.allclose(sample["return_pct"], theirs, rtol=1e-6, atol=1e-6):
+                    sys.exit(f"{strategy} returns differ from the pandas loop at {bars} bars")
+
+                print(f"{strategy:>11}{label:>9}{bars:>7}{len(result):>8}{elapsed * 1e3:>10.1f}"
+                      f"{len(result) / elapsed:>11,.0f}{1 / loop:>15,.0f}{loop * len(result) / elapsed:>8.0f}x")
+
+
+def bench_workers(symbols, workers_list, period):
+    tickers = [f"S{i:03d}" for i in range(symbols)]
+    combos = len(sweep(synthetic_ohlcv(300, seed=0)["Close"].to_numpy(), "sma_cross"))
+    print(f"\n{symbols} symbols x {combos} sma_cross combinations, {period} of daily bars from the fake provider")
+    print(f"{'workers':>8}{'seconds':>9}{'combos/s':>11}")
+    for workers in workers_list:
+        start = time.perf_counter()
+        result = run_backtest(tickers, "sma_cross", workers=workers, chunk_size=max(1, symbols // max(workers, 1)),
+                              source="provider", period=period)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>8}{elapsed:>9.2f}{result['error'].isna().sum() / elapsed:>11,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1260, 5040])
+    parser.add_argument("--symbols", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--period", default="5y")
+    args = parser.parse_args()
+    bench_sweeps(args.bars)
+    bench_workers(args.symbols, args.workers, args.period)
+
+
+if __name__ == "__main__":
+    main()
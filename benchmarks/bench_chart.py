@@ -0,0 +1,48 @@
+"""Measure chart build time and figure payload with and without downsampling.
+
+Builds reuse the cached figure skeleton; the cold column includes building
+the skeleton itself.
+
+    python benchmarks/bench_chart.py --bars 1000 20000 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import MAX_POINTS, create_candlestick_chart, figure_bytes, get_skeleton
+from data_provider import synthetic_ohlcv
+from indicators import ensure_indicators
+
+INDICATORS = ["SMA20", "SMA50", "EMA20", "BB", "RSI"]
+
+
+def build(df, max_points):
+    start = time.perf_counter()
+    fig = create_candlestick_chart(df, "BENCH", "max", INDICATORS, max_points=max_points)
+    elapsed = time.perf_counter() - start
+    return elapsed, figure_bytes(fig), max(len(trace.x) for trace in fig.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 20_000, 200_000])
+    parser.add_argument("--max-points", type=int, default=MAX_POINTS)
+    args = parser.parse_args()
+
+    print(f"{'bars':>9}{'cold ms':>10}{'full ms':>10}{'full KB':>11}"
+          f"{'sampled ms':>12}{'sampled KB':>12}{'points':>8}")
+    for n in args.bars:
+        df = ensure_indicators(synthetic_ohlcv(n, seed=n, interval="5m"), INDICATORS)
+        get_skeleton.cache_clear()
+        cold_time, _, _ = build(df, max_points=args.max_points)
+        full_time, full_bytes, _ = build(df, max_points=n)
+        sampled_time, sampled_bytes, points = build(df, max_points=args.max_points)
+        print(f"{n:>9,}{cold_time * 1e3:>10.1f}{full_time * 1e3:>10.1f}{full_bytes / 1024:>11,.0f}"
+              f"{sampled_time * 1e3:>12.1f}{sampled_bytes / 1024:>12,.0f}{points:>8,}")
+
+
+if __name__ == "__main__":
+    main()
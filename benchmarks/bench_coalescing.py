@@ -0,0 +1,70 @@
+"""Count upstream calls when many sessions load the same page at once.
+
+    python benchmarks/bench_coalescing.py --sessions 200 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache
+from data_provider import FakeProvider, set_provider
+
+POPULAR = ["AAPL", "GOOGL", "AMZN", "META", "MSFT", "TSLA", "NVDA", "JPM"]
+
+
+def page(provider, coalesced):
+    """The upstream requests one dashboard render makes for AAPL"""
+    if coalesced:
+        cache.cached_quotes(POPULAR)
+        cache.cached_info("AAPL")
+        cache.cached_history("AAPL", "1y", "1d")
+    else:
+        provider.get_quotes(POPULAR)
+        provider.get_info("AAPL")
+        provider.get_history("AAPL", "1y", "1d")
+
+
+def run(sessions, latency, coalesced):
+    provider = FakeProvider(latency=latency)
+    # Generating the synthetic bars is not what is being measured
+    for ticker in POPULAR:
+        provider._series(ticker, "1d")
+    set_provider(provider)
+    for c in (cache.quote_cache, cache.history_cache, cache.info_cache):
+        c.clear()
+
+    # Every session starts at the same instant, the worst case for a cold cache
+    barrier = threading.Barrier(sessions)
+
+    def session():
+        barrier.wait()
+        page(provider, coalesced)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return provider.calls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 20, 200])
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>9}{'direct calls':>14}{'coalesced calls':>17}{'direct s':>10}{'coalesced s':>13}")
+    for n in args.sessions:
+        direct_calls, direct_time = run(n, args.latency, coalesced=False)
+        shared_calls, shared_time = run(n, args.latency, coalesced=True)
+        print(f"{n:>9}{direct_calls:>14}{shared_calls:>17}{direct_time:>10.2f}{shared_time:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Time the comparison matrix against a per-ticker pandas loop.
+
+    python benchmarks/bench_compare.py --tickers 5 50 200 --bars 252 2520
+
+For each size, aligns synthetic histories into a ``PriceMatrix`` and computes
+normalized prices, relative strength, rolling correlation and the summary
+table, then does the same one ticker at a time with pandas. The rolling
+correlations of both are compared before anything is reported.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compare import CORRELATION_WINDOW, PriceMatrix
+from data_provider import synthetic_ohlcv
+
+
+def histories(tickers, bars):
+    frames = {}
+    for i in range(tickers):
+        df = synthetic_ohlcv(bars, seed=i)
+        # Drop a few dates per symbol so the calendars need aligning
+        frames[f"T{i:03d}"] = df.drop(df.index[np.random.default_rng(i).choice(bars, bars // 50)])
+    return frames
+
+
+def matrix_stats(frames, window):
+    matrix = PriceMatrix.from_histories(frames)
+    benchmark = matrix.tickers[0]
+    matrix.normalized()
+    matrix.relative_strength(benchmark)
+    correlation = matrix.rolling_correlation(benchmark, window)
+    matrix.summary(benchmark)
+    return correlation
+
+
+def pandas_stats(frames, window):
+    closes = pd.DataFrame({ticker: df["Close"] for ticker, df in frames.items()}).sort_index().ffill()
+    benchmark = closes.columns[0]
+    bench_returns = closes[benchmark].pct_change()
+    correlation = []
+    for ticker in closes.columns:
+        close = closes[ticker]
+        normalized = close / close.dropna().iloc[0] * 100
+        normalized / (closes[benchmark] / closes[benchmark].iloc[0] * 100) * 100
+        returns = close.pct_change()
+        correlation.append(returns.rolling(window).corr(bench_returns).to_numpy())
+        returns.std(), (normalized / normalized.cummax()).min(), returns.corr(bench_returns)
+    return np.array(correlation)
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[5, 50, 200])
+    parser.add_argument("--bars", type=int, nargs="+", default=[252, 2520])
+    parser.add_argument("--window", type=int, default=CORRELATION_WINDOW)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8}{'bars':>8}{'matrix ms':>11}{'pandas ms':>11}{'speedup':>9}")
+    for bars in args.bars:
+        for tickers in args.tickers:
+            frames = histories(tickers, bars)
+            matrix_time, ours = best_of(lambda: matrix_stats(frames, args.window), args.repeat)
+            pandas_time, theirs = best_of(lambda: pandas_stats(frames, args.window), args.repeat)
+            # pandas leaves tiny negative variances as numbers; compare where both are defined
+            both = np.isfinite(ours) & np.isfinite(theirs)
+            if not np.allclose(ours[both], theirs[both], atol=1e-6):
+                sys.exit(f"rolling correlation mismatch at {tickers} tickers x {bars} bars")
+            print(f"{tickers:>8}{bars:>8}{matrix_time * 1e3:>11.2f}{pandas_time * 1e3:>11.2f}"
+                  f"{pandas_time / matrix_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Time the NumPy indicator kernels against ``ta``.
+
+    python benchmarks/bench_kernels.py --bars 1000 100000 1000000
+    python benchmarks/bench_kernels.py --tickers 50 --bars 10000
+
+That the kernels match the ``ta`` columns they replace is checked by
+``test_kernels.py``.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kernels
+from data_provider import synthetic_ohlcv
+from kernel_cases import CASES
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--tickers", type=int, default=1, help="rows of the 2-D close array")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.bars:
+        frames = [synthetic_ohlcv(n, seed=seed, interval="1m") for seed in range(args.tickers)]
+        series = [frame["Close"].reset_index(drop=True) for frame in frames]
+        matrix = kernels.as_float_array(np.stack([s.to_numpy() for s in series]))
+        x = matrix[0] if args.tickers == 1 else matrix
+
+        print(f"\n{n:,} bars x {args.tickers} ticker(s)")
+        print(f"{'indicator':<10}{'ta (ms)':>12}{'numpy (ms)':>14}{'speedup':>10}")
+        for name, (ta_impl, kernel_impl) in CASES.items():
+            ta_time = best_of(lambda: [ta_impl(close) for close in series], args.repeat)
+            kernel_time = best_of(lambda: kernel_impl(x), args.repeat)
+            print(f"{name:<10}{ta_time * 1e3:>12.2f}{kernel_time * 1e3:>14.2f}{ta_time / kernel_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
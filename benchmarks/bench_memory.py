@@ -0,0 +1,52 @@
+"""Bytes per cached history frame: all-float64 with stored derived columns vs compact.
+
+    python benchmarks/bench_memory.py --periods 1y max --sessions 50
+
+The float64 layout is OHLCV plus the Date, Change and Range columns and
+every indicator, the way frames used to be cached. The compact layout is what
+``load_stock_data`` caches now (float32 where lossless enough) plus the
+dashboard's default indicators. ``--sessions`` scales both to that many
+sessions, each viewing a different ticker.
+"""
+import argparse
+import os
+import sys
+
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_STORE_DIR"] = "off"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from helpers import load_stock_data
+from indicators import INDICATOR_COLUMNS, ensure_indicators
+
+DEFAULT_INDICATORS = ["SMA20", "EMA20"]
+
+
+def float64_frame(history):
+    df = history.astype("float64")
+    df["Date"] = df.index
+    df["Change"] = df["Close"].pct_change() * 100
+    df["Range"] = df["High"] - df["Low"]
+    return ensure_indicators(df, INDICATOR_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--periods", nargs="+", default=["1y", "max"])
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'period':>7}{'rows':>8}{'float64 KB':>12}{'compact KB':>12}{'saved':>8}"
+          f"{f'x{args.sessions} float64 MB':>18}{f'x{args.sessions} compact MB':>18}")
+    for period in args.periods:
+        history = load_stock_data("AAPL", period)
+        before = metrics.payload_bytes(float64_frame(history))
+        after = metrics.payload_bytes(ensure_indicators(history, DEFAULT_INDICATORS))
+        print(f"{period:>7}{len(history):>8}{before / 1024:>12.1f}{after / 1024:>12.1f}{1 - after / before:>8.0%}"
+              f"{before * args.sessions / 2**20:>18.1f}{after * args.sessions / 2**20:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
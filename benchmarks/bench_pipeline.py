@@ -0,0 +1,84 @@
+"""Time reruns of the dashboard with and without the memoized render stages.
+
+    python benchmarks/bench_pipeline.py --repeat 3
+
+Drives ``app.py`` headless through a script of sidebar interactions (toggle
+an indicator, switch the chart type, change the period, ...) and reports,
+for each one, the stages recomputed and the rerun time, then the same
+interaction with the stage memo cleared first, which is how every rerun
+behaved before the pipeline. Times are the median of ``--repeat`` runs.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_STORE_DIR"] = "off"
+os.environ["STOCK_ALERT_SINK"] = "off"
+
+from streamlit.testing.v1 import AppTest
+
+
+def toggle_indicator(at):
+    widget = at.multiselect[0]
+    return widget.set_value(widget.value[:-1] if len(widget.value) > 1 else widget.options[:2])
+
+
+def cycle_option(widget):
+    return widget.set_value(widget.options[(widget.options.index(widget.value) + 1) % len(widget.options)])
+
+
+# (label, interaction); each returns the widget to run the app from
+INTERACTIONS = [
+    ("toggle indicator", toggle_indicator),
+    ("chart type", lambda at: cycle_option(at.selectbox[2])),
+    ("period", lambda at: cycle_option(at.selectbox[0])),
+    ("no change", lambda at: at),
+    ("update button", lambda at: at.button[0].click()),
+]
+
+
+def versions(at):
+    return {name: entry["version"] for name, entry in at.session_state["pipeline"].items()}
+
+
+def timed(at, interaction, memo):
+    if not memo:
+        at.session_state["pipeline"] = {}
+    before = versions(at)
+    start = time.perf_counter()
+    interaction(at).run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        sys.exit(f"app raised: {at.exception}")
+    computed = sorted(name for name, version in versions(at).items() if before.get(name) != version)
+    return elapsed, computed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120).run()
+    if at.exception:
+        sys.exit(f"app raised: {at.exception}")
+
+    print(f"{'interaction':<18}{'memo ms':>9}{'no memo ms':>12}  stages recomputed")
+    for label, interaction in INTERACTIONS:
+        results = {True: [], False: []}
+        for _ in range(args.repeat):
+            for memo in (True, False):
+                results[memo].append(timed(at, interaction, memo))
+        computed = results[True][0][1]
+        memo_ms = statistics.median(elapsed for elapsed, _ in results[True]) * 1e3
+        cold_ms = statistics.median(elapsed for elapsed, _ in results[False]) * 1e3
+        print(f"{label:<18}{memo_ms:>9.0f}{cold_ms:>12.0f}  {', '.join(computed) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Time the bar pyramid: local resampling vs pandas, and period switches vs downloads.
+
+    python benchmarks/bench_pyramid.py --latency 0.2
+
+First checks ``pyramid.resample`` against ``DataFrame.resample`` and times
+both. Then cycles through every period twice, once downloading each
+period/interval from a fake upstream with ``--latency`` seconds per request
+(as before the pyramid), once through ``helpers.get_stock_data``.
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_STORE_DIR"] = "off"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from cache import history_cache
+from data_provider import FakeProvider, set_provider
+from helpers import get_stock_data
+from pyramid import AUTO_INTERVALS, resample, resolve
+
+AGGREGATES = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+# (base interval, period, target interval, pandas rule); intraday rules match
+# the session-anchored buckets because the fake bars run around the clock
+CASES = [
+    ("5m", "1mo", "30m", "30min"),
+    ("5m", "1mo", "1h", "h"),
+    ("1d", "max", "1wk", "W-MON"),
+    ("1d", "max", "1mo", "MS"),
+]
+
+
+def best_of(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def bench_resample():
+    provider = FakeProvider()
+    print(f"{'base':>6}{'period':>8}{'target':>8}{'bars':>8}{'pyramid ms':>12}{'pandas ms':>11}")
+    for base, period, target, rule in CASES:
+        bars = provider.get_history("BENCH", period=period, interval=base)
+        # Start on a day boundary so the first intraday bucket is anchored like pandas
+        bars = bars[bars.index >= bars.index[0].normalize() + np.timedelta64(1, "D")]
+        ours_time, ours = best_of(lambda: resample(bars, target))
+        theirs_time, theirs = best_of(
+            lambda: bars.resample(rule, label="left", closed="left").agg(AGGREGATES).dropna())
+        if not np.allclose(ours.to_numpy(), theirs.to_numpy()):
+            sys.exit(f"resample mismatch for {base} -> {target}")
+        print(f"{base:>6}{period:>8}{target:>8}{len(bars):>8}{ours_time * 1e3:>12.2f}{theirs_time * 1e3:>11.2f}")
+
+
+def bench_switches(latency):
+    periods = list(AUTO_INTERVALS)
+    provider = FakeProvider(latency=latency)
+    set_provider(provider)
+    history_cache.clear()
+
+    start = time.perf_counter()
+    for period in periods:
+        provider.get_history("BENCH", period=period, interval=resolve(period)[0])
+    download = time.perf_counter() - start
+    download_calls = provider.calls
+
+    provider.calls = 0
+    start = time.perf_counter()
+    for period in periods:
+        get_stock_data("BENCH", period)
+    pyramid = time.perf_counter() - start
+
+    print(f"\n{len(periods)} period switches at {latency * 1e3:.0f} ms upstream latency")
+    print(f"{'per-view downloads':<20}{download * 1e3:>10.1f} ms{download_calls:>5} requests")
+    print(f"{'pyramid':<20}{pyramid * 1e3:>10.1f} ms{provider.calls:>5} requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    bench_resample()
+    bench_switches(args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Compare serial and batched quote fetching against the offline fake provider.
+
+    python benchmarks/bench_quotes.py --latency 0.2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_provider import FakeProvider, fetch_quotes
+
+POPULAR_TICKERS = ["AAPL", "GOOGL", "AMZN", "META", "MSFT", "TSLA", "NVDA", "JPM"]
+PEER_TICKERS = ["JNJ", "PFE", "UNH", "MRK", "ABBV"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated round-trip in seconds")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    tickers = POPULAR_TICKERS + PEER_TICKERS
+    provider = FakeProvider(latency=args.latency)
+
+    start = time.perf_counter()
+    serial = [provider.get_quote(t) for t in tickers]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = fetch_quotes(tickers, provider=provider, max_workers=args.workers)
+    batched_time = time.perf_counter() - start
+
+    assert [q.ticker for q in batched] == tickers
+    assert [q.price for q in batched] == [q.price for q in serial]
+
+    print(f"{len(tickers)} symbols, {args.latency * 1000:.0f} ms simulated latency")
+    print(f"serial:  {serial_time:.3f}s")
+    print(f"batched: {batched_time:.3f}s ({serial_time / batched_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare a raw and a resilient provider against a flaky fake upstream.
+
+Each run first loads every ticker once while the upstream is healthy, then
+makes ``--requests`` calls with errors injected at each ``--error-rates``
+value (1.0 is a full outage) and reports how many returned usable data.
+Every resilient breaker, quotes included, must trip during the full outage.
+
+    python benchmarks/bench_resilience.py --error-rates 0 0.1 0.3 1.0 --latency 0.002
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from data_provider import FakeProvider, ResilientProvider
+
+POPULAR = ["AAPL", "GOOGL", "AMZN", "META", "MSFT", "TSLA", "NVDA", "JPM"]
+
+
+def request(provider, i):
+    """One history, info or quotes call; True when it returned usable data"""
+    ticker = POPULAR[i % len(POPULAR)]
+    kind = i % 3
+    try:
+        if kind == 0:
+            return not provider.get_history(ticker, "1y", "1d").empty
+        if kind == 1:
+            return bool(provider.get_info(ticker))
+        return all(q.error is None for q in provider.get_quotes(POPULAR[:4]))
+    except Exception:
+        return False
+
+
+def events():
+    return {c["labels"]["event"]: c["value"] for c in metrics.snapshot()["counters"]
+            if c["name"] == "dashboard_resilience_events_total"}
+
+
+def run(resilient, error_rate, requests, latency):
+    fake = FakeProvider(latency=latency, seed=0)
+    provider = fake
+    if resilient:
+        # Short backoff and breaker reset keep the benchmark quick
+        provider = ResilientProvider(fake, timeout=1.0, backoff_base=0.005, backoff_cap=0.05,
+                                     breaker_reset=0.2)
+    for i in range(len(POPULAR) * 3):
+        request(provider, i)
+
+    metrics.registry.clear()
+    fake.error_rate = error_rate
+    fake.calls = 0
+    ok, times = 0, []
+    for i in range(requests):
+        start = time.perf_counter()
+        ok += request(provider, i)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    counts = events()
+    breakers = provider.stats()["breakers"] if resilient else []
+    return {
+        "ok": ok / requests,
+        "calls": fake.calls,
+        "retries": counts.get("retry", 0),
+        "stale": counts.get("stale_served", 0),
+        "trips": sum(b["trips"] for b in breakers),
+        "tripped": {b["name"] for b in breakers if b["trips"]},
+        "breakers": {b["name"] for b in breakers},
+        "p50": statistics.median(times),
+        "p95": times[int(0.95 * (len(times) - 1))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0, 0.1, 0.3, 1.0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    print(f"{'errors':>7}{'provider':>11}{'usable':>9}{'calls':>7}{'retries':>9}"
+          f"{'stale':>7}{'trips':>7}{'p50 ms':>9}{'p95 ms':>9}")
+    for error_rate in args.error_rates:
+        for resilient in (False, True):
+            r = run(resilient, error_rate, args.requests, args.latency)
+            print(f"{error_rate:>7.0%}{'resilient' if resilient else 'raw':>11}{r['ok']:>9.1%}"
+                  f"{r['calls']:>7}{r['retries']:>9}{r['stale']:>7}{r['trips']:>7}"
+                  f"{r['p50'] * 1e3:>9.2f}{r['p95'] * 1e3:>9.2f}")
+            if resilient and error_rate >= 1.0 and r["tripped"] != r["breakers"]:
+                sys.exit(f"breakers that never opened during the outage: {sorted(r['breakers'] - r['tripped'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Time the batch screener serially and across worker processes.
+
+    python benchmarks/bench_screener.py --symbols 2000 --workers 1 4 8
+
+Symbols come from the offline fake provider. Every parallel run must give
+the same table as the serial one.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+
+import pandas as pd
+
+from screener import run_screen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--period", default="1y")
+    args = parser.parse_args()
+
+    tickers = [f"SYM{i}" for i in range(args.symbols)]
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = run_screen(tickers, workers=workers, source="provider", period=args.period)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = result
+        else:
+            pd.testing.assert_frame_equal(result, baseline)
+        print(f"{workers:>3} workers  {elapsed:7.1f}s  {elapsed / args.symbols * 1e3:6.2f} ms/symbol  "
+              f"{args.symbols / elapsed * 3600:,.0f} symbols/hour")
+
+
+if __name__ == "__main__":
+    main()
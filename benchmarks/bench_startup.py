@@ -0,0 +1,94 @@
+"""Measure the dashboard's cold start: import cost and time to first paint.
+
+Lists the slowest imports of the app's own modules (``python -X importtime``,
+after Streamlit itself is loaded), then runs the app cold ``--runs`` times,
+each in a fresh interpreter, and reports the median time to first paint, to
+the end of the deferred imports and to the end of the first full rerun.
+
+    python benchmarks/bench_startup.py --runs 5 --target-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_MODULES = ["cache", "data_provider", "indicators", "helpers", "charts", "live", "symbols"]
+
+COLD_RUN = """
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+assert not at.exception, at.exception
+"""
+
+
+def import_times(top):
+    """(module, cumulative microseconds) for the slowest imports after Streamlit"""
+    code = "import streamlit, metrics\nimport sys; print('--', file=sys.stderr)\n" + "".join(
+        f"import {module}\n" for module in APP_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    lines = proc.stderr.split("--\n", 1)[1].splitlines()
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((module.rstrip(), int(cumulative)))
+    return sorted(rows, key=lambda row: -row[1])[:top]
+
+
+def cold_run():
+    """Milestone and span timings (ms) of one cold first rerun in a fresh process"""
+    env = dict(os.environ, STOCK_JSON_LOGS="1", STOCK_DATA_PROVIDER=os.environ.get("STOCK_DATA_PROVIDER", "fake"),
+               STOCK_STORE_DIR="off", STOCK_SYMBOL_INDEX="off")
+    proc = subprocess.run([sys.executable, "-c", COLD_RUN.format(app=os.path.join(ROOT, "app.py"))],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("{"):
+            continue
+        event = json.loads(line)
+        if event["event"] == "milestone":
+            timings.setdefault(event["milestone"], event["ms"])
+        elif event["event"] == "span" and event["stage"] == "imports":
+            timings.setdefault("imports", event["ms"])
+        elif event["event"] == "rerun" and event["kind"] == "rerun":
+            timings.setdefault("rerun", event["ms"])
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="slowest imports to list")
+    parser.add_argument("--target-ms", type=float, help="exit 1 if the median first paint is slower")
+    args = parser.parse_args()
+
+    print(f"{'import (after streamlit)':<44}{'cumulative ms':>14}")
+    for module, micros in import_times(args.top):
+        print(f"{module:<44}{micros / 1e3:>14.1f}")
+
+    runs = [cold_run() for _ in range(args.runs)]
+    print()
+    print(f"{'cold start (median of ' + str(args.runs) + ')':<44}{'ms':>14}")
+    medians = {}
+    for name in ("first_paint", "imports", "rerun"):
+        values = [run[name] for run in runs if name in run]
+        if values:
+            medians[name] = statistics.median(values)
+            print(f"{name:<44}{medians[name]:>14.1f}")
+
+    if args.target_ms is not None and medians.get("first_paint", float("inf")) > args.target_ms:
+        print(f"first paint over target of {args.target_ms:g} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Compare appending one bar with StreamingIndicators against a full recompute.
+
+    python benchmarks/bench_streaming.py --bars 1000 10000 100000
+
+Also times a live-mode tick: splicing polled bars, the newest one still
+forming, onto a cached history with ``LiveTail``.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_provider import synthetic_ohlcv
+from indicators import INDICATOR_COLUMNS, LiveTail, StreamingIndicators, add_technical_indicators
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--appends", type=int, default=200)
+    args = parser.parse_args()
+
+    for n in args.bars:
+        df = synthetic_ohlcv(n + args.appends, seed=n)
+        closes = df["Close"].to_numpy()
+
+        start = time.perf_counter()
+        add_technical_indicators(df.iloc[: n + 1].copy())
+        full_time = time.perf_counter() - start
+
+        engine = StreamingIndicators.from_closes(closes[:n])
+        start = time.perf_counter()
+        for close in closes[n:]:
+            values = engine.update(close)
+        append_time = (time.perf_counter() - start) / args.appends
+
+        # The incremental values must agree with the ta-based columns
+        expected = add_technical_indicators(df.copy()).iloc[-1][INDICATOR_COLUMNS].to_numpy(dtype=float)
+        got = np.array([values[c] for c in INDICATOR_COLUMNS])
+        assert np.allclose(expected, got, rtol=1e-9, equal_nan=True), (expected, got)
+
+        # A live tick re-polls the bars after the cached history and revises the forming one
+        history = add_technical_indicators(df.iloc[:n].copy())
+        tail = LiveTail(history)
+        start = time.perf_counter()
+        for end in range(n + 1, n + args.appends + 1):
+            live = tail.splice(df.iloc[n - 1:end])
+        tick_time = (time.perf_counter() - start) / args.appends
+        expected = add_technical_indicators(df.copy())[INDICATOR_COLUMNS].to_numpy(dtype=float)
+        assert np.allclose(expected, live[INDICATOR_COLUMNS].to_numpy(dtype=float), rtol=1e-9, equal_nan=True)
+
+        print(f"{n:>8} bars  full recompute {full_time * 1e3:8.2f} ms   "
+              f"streaming append {append_time * 1e6:7.1f} us   "
+              f"({full_time / append_time:,.0f}x)   live tick {tick_time * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Measure tick ingestion into the ring buffers and check bars against pandas.
+
+    python benchmarks/bench_ticks.py --ticks 100000 --symbols 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticks import BAR_INTERVALS, SymbolTicks, TickStore
+
+
+def synthetic_ticks(n, seed=0):
+    """Time-ordered ticks a few hundred milliseconds apart"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-12-31 14:30").value
+    times = start + np.cumsum(rng.integers(1, 800_000_000, n))
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 2e-4, n)))
+    sizes = rng.integers(1, 500, n).astype(np.float64)
+    return times, prices, sizes
+
+
+def resampled(times, prices, sizes, interval):
+    ticks = pd.DataFrame({"Price": prices, "Size": sizes}, index=pd.DatetimeIndex(times.view("M8[ns]")))
+    rule = interval.replace("m", "min")
+    bars = ticks["Price"].resample(rule).ohlc().dropna()
+    bars["Volume"] = ticks["Size"].resample(rule).sum()
+    return bars.to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=500)
+    args = parser.parse_args()
+
+    times, prices, sizes = synthetic_ticks(args.ticks)
+    capacity = args.ticks
+
+    # One tick at a time, as a live feed would deliver them
+    single = SymbolTicks(tick_capacity=capacity, bar_capacity=capacity)
+    start = time.perf_counter()
+    for ts, price, size in zip(times.tolist(), prices.tolist(), sizes.tolist()):
+        single.push(ts, price, size)
+    push_time = time.perf_counter() - start
+
+    # The same ticks in batches of 1000
+    batched = SymbolTicks(tick_capacity=capacity, bar_capacity=capacity)
+    start = time.perf_counter()
+    for i in range(0, args.ticks, 1000):
+        batched.extend(times[i:i + 1000], prices[i:i + 1000], sizes[i:i + 1000])
+    extend_time = time.perf_counter() - start
+
+    for interval in BAR_INTERVALS:
+        expected = resampled(times, prices, sizes, interval)
+        for buffer in (single, batched):
+            got = buffer.bars(interval).to_numpy()
+            assert got.shape == expected.shape, (got.shape, expected.shape)
+            assert np.allclose(got, expected, rtol=1e-12), interval
+
+    print(f"{args.ticks:,} ticks  push {push_time / args.ticks * 1e6:6.2f} us/tick   "
+          f"extend {extend_time / args.ticks * 1e9:6.1f} ns/tick")
+
+    # Memory stays fixed however many ticks arrive
+    store = TickStore()
+    for i in range(args.symbols):
+        store.extend(f"SYM{i}", times[:1000], prices[:1000], sizes[:1000])
+    print(f"{args.symbols} symbols  {store.nbytes() / 2**20:,.1f} MiB "
+          f"({store.nbytes() / args.symbols / 1024:,.0f} KiB each)")
+
+
+if __name__ == "__main__":
+    main()
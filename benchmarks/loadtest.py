@@ -0,0 +1,268 @@
+"""Load-test the dashboard with many concurrent sessions on replayed data.
+
+    python benchmarks/loadtest.py --sessions 1 4 16 32 --latency 0.05
+    python benchmarks/loadtest.py --replay ~/recorded --sessions 8 --rounds 5
+
+Each simulated session is a headless ``app.py`` (Streamlit's ``AppTest``)
+in its own thread, like a session's script thread on a real server, all
+sharing one process and its caches. Sessions follow scripted interaction
+sequences (``SCRIPTS``) with random think time in between. Every level of
+``--sessions`` runs in a fresh worker process and reports the p50/p95/p99
+rerun latency, the upstream calls the sessions caused, the process CPU use
+(100% is one core busy) and its peak RSS.
+
+Data comes from a ``ReplayProvider`` that sleeps ``--latency`` seconds per
+upstream request. Without ``--replay``, the ``--source`` provider (the
+offline fake by default) is recorded into a temporary directory first; a
+directory recorded from real dashboard sessions with ``STOCK_RECORD_DIR``
+can be given instead.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The popular tickers come first: every session shows their quote strip
+TICKERS = ["AAPL", "GOOGL", "AMZN", "META", "MSFT", "TSLA", "NVDA", "JPM", "V", "XOM", "KO", "PFE"]
+
+PERIODS = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "ytd", "max"]
+
+
+def open_page(at, rng):
+    return at
+
+
+def toggle_indicator(at, rng):
+    widget = at.multiselect[0]
+    return widget.select(rng.choice(widget.options)) if rng.random() < 0.5 or not widget.value \
+        else widget.unselect(rng.choice(widget.value))
+
+
+def change_chart_type(at, rng):
+    return at.selectbox[2].set_value(rng.choice(at.selectbox[2].options))
+
+
+def change_period(at, rng):
+    return at.selectbox[0].set_value(rng.choice(PERIODS))
+
+
+def change_ticker(at, rng):
+    return at.text_input(key="ticker_input").set_value(rng.choice(TICKERS))
+
+
+def compare(at, rng):
+    return at.text_input(key="compare_input").set_value(", ".join(rng.sample(TICKERS, 2)))
+
+
+def stop_comparing(at, rng):
+    return at.text_input(key="compare_input").set_value("")
+
+
+def click_update(at, rng):
+    return at.button[0].click()
+
+
+# Interaction sequences; sessions take them in turn
+SCRIPTS = {
+    "chart": [open_page, toggle_indicator, change_chart_type, toggle_indicator, change_period, toggle_indicator],
+    "browse": [open_page, change_ticker, change_period, change_ticker, toggle_indicator, click_update],
+    "compare": [open_page, compare, change_period, compare, stop_comparing, change_ticker],
+}
+
+
+def record(root, source):
+    """Fill ``root`` with every response the scripts can ask for, from the ``source`` provider"""
+    os.environ.update(STOCK_DATA_PROVIDER=source, STOCK_RECORD_DIR=root, STOCK_STORE_DIR="off",
+                      STOCK_SYMBOL_INDEX="off")
+    sys.path.insert(0, ROOT)
+    from cache import cached_info, cached_quotes
+    from helpers import get_stock_data
+    from symbols import get_index
+
+    # The related stocks row shows quotes of peers from the symbol index
+    cached_quotes(list(dict.fromkeys(TICKERS + get_index().symbols)))
+    for ticker in TICKERS:
+        cached_info(ticker)
+        for period in PERIODS:
+            get_stock_data(ticker, period)
+
+
+def share_runtime():
+    """Let ``AppTest`` sessions run side by side in one process
+
+    Every ``AppTest.run`` installs a mock Streamlit runtime and removes it
+    when its script ends, which would pull it from under the scripts of the
+    other sessions still running; they fall back to the last one installed.
+    The ``global.appTest`` option it patches per run is set once for all.
+    It also compiles ``app.py`` again on every run, and concurrent compiles
+    can fail on Python 3.11; like a real server, the sessions share one
+    compiled script.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    config.set_option("global.appTest", True)
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if not last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last[0]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(last))
+
+    shared, lock, get_bytecode = ScriptCache(), threading.Lock(), ScriptCache.get_bytecode
+
+    def shared_bytecode(self, script_path):
+        with lock:
+            return get_bytecode(shared, script_path)
+
+    ScriptCache.get_bytecode = shared_bytecode
+
+
+def run_session(index, script, rounds, think, results):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(index)
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+    for _ in range(rounds):
+        for step in SCRIPTS[script]:
+            start = time.perf_counter()
+            try:
+                failed = bool(step(at, rng).run().exception)
+            except Exception:
+                # A timeout or a widget missing from a failed page; the session goes on
+                failed = True
+            results.append((script, step.__name__, time.perf_counter() - start, failed))
+            time.sleep(rng.uniform(0, 2 * think))
+
+
+def worker(args):
+    """Run ``args.sessions[0]`` sessions in this process and print the results as JSON"""
+    sessions = args.sessions[0]
+    sys.path.insert(0, ROOT)
+    # The app's modules load before the baseline, so the RSS growth is the sessions' data
+    import charts  # noqa: F401
+    import helpers  # noqa: F401
+    import pipeline  # noqa: F401
+    from data_provider import get_provider
+    from metrics import snapshot
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+
+    share_runtime()
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    results = []
+    threads = []
+    start = time.perf_counter()
+    for index in range(sessions):
+        script = list(SCRIPTS)[index % len(SCRIPTS)]
+        thread = threading.Thread(target=run_session, args=(index, script, args.rounds, args.think, results),
+                                  name=f"session-{index}")
+        thread.start()
+        threads.append(thread)
+        # Sessions arrive spread over the ramp instead of all at once
+        time.sleep(args.ramp / sessions)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    upstream, missed = {}, 0
+    for counter in snapshot()["counters"]:
+        if counter["name"] == "dashboard_upstream_calls_total":
+            method = counter["labels"]["method"]
+            upstream[method] = upstream.get(method, 0) + counter["value"]
+        elif counter["name"] == "dashboard_upstream_errors_total":
+            # With the replay provider, the only upstream errors are requests that were not recorded
+            missed += counter["value"]
+    json.dump({
+        "sessions": sessions,
+        "reruns": [list(result) for result in results],
+        "requests": get_provider().calls,
+        "upstream": upstream,
+        "missed": missed,
+        "cpu": (after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime) / wall,
+        "wall": wall,
+        # ru_maxrss is in kilobytes on Linux
+        "baseline_mb": baseline_rss / 1024,
+        "peak_mb": after.ru_maxrss / 1024,
+    }, sys.stdout)
+    print()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q / 100 * len(values)), len(values) - 1)]
+
+
+def run_level(sessions, replay, args):
+    env = dict(os.environ, STOCK_DATA_PROVIDER="replay", STOCK_REPLAY_DIR=replay,
+               STOCK_REPLAY_LATENCY=str(args.latency), STOCK_STORE_DIR="off", STOCK_SYMBOL_INDEX="off",
+               STOCK_ALERT_SINK="off", STOCK_RECORD_DIR="", STOCK_JSON_LOGS="")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--sessions", str(sessions),
+               "--rounds", str(args.rounds), "--think", str(args.think), "--ramp", str(args.ramp)]
+    proc = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        sys.exit(f"worker with {sessions} sessions failed:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--rounds", type=int, default=2, help="times each session runs its script")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds between interactions")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which sessions arrive")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per replayed upstream request")
+    parser.add_argument("--replay", help="recorded responses to replay (default: record --source first)")
+    parser.add_argument("--source", default="fake", help="provider recorded when no --replay is given")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--record-into", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+    if args.record_into:
+        return record(args.record_into, args.source)
+
+    replay = args.replay
+    if replay is None:
+        replay = tempfile.mkdtemp(prefix="loadtest-replay-")
+        # In its own process, so the workers' caches and counters start empty
+        recorder = subprocess.run([sys.executable, os.path.abspath(__file__), "--record-into", replay,
+                                   "--source", args.source], cwd=ROOT, capture_output=True, text=True)
+        if recorder.returncode:
+            sys.exit(f"recording failed:\n{recorder.stderr[-4000:]}")
+
+    print(f"replaying {replay} at {args.latency * 1e3:.0f} ms per upstream request")
+    print(f"{'sessions':>8}{'reruns':>8}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'requests':>10}{'history':>9}{'info':>6}{'quotes':>8}{'CPU':>6}{'RSS MB':>8}{'+MB':>7}")
+    for sessions in args.sessions:
+        level = run_level(sessions, replay, args)
+        latencies = [seconds * 1e3 for _, _, seconds, _ in level["reruns"]]
+        errors = sum(error for _, _, _, error in level["reruns"])
+        upstream = level["upstream"]
+        print(f"{sessions:>8}{len(latencies):>8}{errors:>8}"
+              + "".join(f"{percentile(latencies, q):>9.0f}" for q in (50, 95, 99))
+              + f"{level['requests']:>10}{upstream.get('history', 0):>9}{upstream.get('info', 0):>6}"
+              f"{upstream.get('quotes', 0):>8}{level['cpu']:>5.0%}{level['peak_mb']:>8.0f}"
+              f"{level['peak_mb'] - level['baseline_mb']:>7.0f}")
+        if level["missed"]:
+            print(f"{level['missed']:>8} upstream calls asked for data missing from the recording", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
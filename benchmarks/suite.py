@@ -0,0 +1,216 @@
+"""Benchmark suite for the data -> indicators -> figure pipeline.
+
+Times each stage on deterministic synthetic data and a full headless render
+of ``app.py`` with the fake provider, then writes the results as JSON. Given
+a baseline file from an earlier run, stages whose median time grew by more
+than ``--tolerance`` are flagged and the exit status is 1.
+
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --baseline bench.json --output new.json
+    python benchmarks/suite.py --rows 100 10000 --stages indicators chart
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The suite must never reach the network or an existing on-disk store
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_STORE_DIR"] = "off"
+os.environ["STOCK_SYMBOL_INDEX"] = "off"
+
+import numpy as np
+import pandas as pd
+
+from cache import history_cache
+from charts import create_candlestick_chart, get_skeleton
+from data_provider import FakeProvider, set_provider, synthetic_ohlcv
+from helpers import compact_history, format_number, load_stock_data
+from indicators import add_technical_indicators, ensure_indicators
+
+DEFAULT_ROWS = [100, 10_000, 1_000_000]
+INTERVALS = ["1d", "1m"]
+STAGES = ["data", "derived", "indicators", "chart", "format", "render"]
+CHART_INDICATORS = ["SMA20", "SMA50", "EMA20", "BB", "RSI"]
+
+# (period, interval) requests served by the fake provider in the data stage
+DATA_REQUESTS = [("1y", "1d"), ("max", "1d"), ("5d", "1m")]
+
+
+def synthetic_frame(rows, interval):
+    """Deterministic OHLCV bars; the same (rows, interval) always gives the same frame"""
+    return synthetic_ohlcv(rows, seed=rows, interval=interval)
+
+
+def measure(func, repeats, setup=None):
+    """Run ``func`` ``repeats`` times and return per-run seconds
+
+    ``setup`` builds the argument for each run outside the timed region.
+    """
+    times = []
+    for _ in range(repeats):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(stage, case, rows, times):
+    return {
+        "stage": stage,
+        "case": case,
+        "rows": rows,
+        "repeats": len(times),
+        "min_ms": min(times) * 1e3,
+        "median_ms": statistics.median(times) * 1e3,
+    }
+
+
+def bench_data(repeats):
+    """Provider fetch plus compaction, as behind the history cache"""
+    set_provider(FakeProvider())
+    results = []
+    for period, interval in DATA_REQUESTS:
+        rows = len(load_stock_data("BENCH", period, interval))
+        times = measure(lambda: load_stock_data("BENCH", period, interval), repeats)
+        results.append(result("data", f"{period}/{interval}", rows, times))
+    return results
+
+
+def bench_frames(stage, rows_list, repeats):
+    """Stages that run on a synthetic frame of each size and interval"""
+    results = []
+    for interval in INTERVALS:
+        for rows in rows_list:
+            df = synthetic_frame(rows, interval)
+            if stage == "derived":
+                times = measure(lambda df: ensure_indicators(compact_history(df), ["Change", "Range"]), repeats,
+                                setup=df.copy)
+            elif stage == "indicators":
+                times = measure(add_technical_indicators, repeats, setup=df.copy)
+            else:
+                df = ensure_indicators(df, CHART_INDICATORS)
+                # Skeletons are cached per process: the first build is timed separately
+                get_skeleton.cache_clear()
+                cold = measure(lambda: create_candlestick_chart(df, "BENCH", "max", CHART_INDICATORS), 1)
+                results.append(result("chart_cold", interval, rows, cold))
+                times = measure(lambda: create_candlestick_chart(df, "BENCH", "max", CHART_INDICATORS), repeats)
+            results.append(result(stage, interval, rows, times))
+    return results
+
+
+def bench_format(repeats):
+    values = np.random.default_rng(0).lognormal(10, 6, 10_000).tolist()
+    times = measure(lambda: [format_number(v) for v in values], repeats)
+    return [result("format", "10k values", len(values), times)]
+
+
+def bench_render(repeats):
+    """Full headless script runs of app.py through Streamlit's testing harness"""
+    from streamlit.testing.v1 import AppTest
+
+    results = []
+    for period in ["1y", "max"]:
+        def run():
+            at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+            at.run()
+            if period != "1y":
+                at.selectbox[0].set_value(period).run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+
+        results.append(result("render", f"app.py period={period}", None, measure(run, repeats)))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return results whose median is more than ``tolerance`` slower than baseline"""
+    previous = {(r["stage"], r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = previous.get((r["stage"], r["case"], r["rows"]))
+        if before is None or not before["median_ms"]:
+            continue
+        ratio = r["median_ms"] / before["median_ms"]
+        r["baseline_median_ms"] = before["median_ms"]
+        r["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def environment():
+    import plotly
+    import streamlit
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed median slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = []
+    for stage in args.stages:
+        history_cache.clear()
+        if stage == "data":
+            stage_results = bench_data(args.repeats)
+        elif stage == "format":
+            stage_results = bench_format(args.repeats)
+        elif stage == "render":
+            stage_results = bench_render(max(1, args.repeats // 2))
+        else:
+            stage_results = bench_frames(stage, args.rows, args.repeats)
+        # Progress goes to stderr so stdout stays valid JSON
+        for r in stage_results:
+            rows = f"{r['rows']:,}" if r["rows"] is not None else "-"
+            print(f"{r['stage']:<11}{r['case']:<22}{rows:>11}{r['median_ms']:>12.2f} ms", file=sys.stderr)
+        results += stage_results
+
+    report = {"environment": environment(), "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report["baseline"] = args.baseline
+        report["tolerance"] = args.tolerance
+    report["regressions"] = [f"{r['stage']}:{r['case']}:{r['rows']}" for r in regressions]
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for r in regressions:
+        print(f"REGRESSION {r['stage']} {r['case']} rows={r['rows']}: "
+              f"{r['baseline_median_ms']:.2f} ms -> {r['median_ms']:.2f} ms ({r['ratio']:.2f}x)",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
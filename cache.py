@@ -0,0 +1,332 @@
+"""Process-wide TTL + LRU caches for provider data.
+
+Streamlit re-executes ``app.py`` on every interaction but imports this module
+only once per server process, so the caches below are shared by every
+session. Cached values must be treated as read-only by callers.
+
+Misses are coalesced (single-flight): when many sessions miss the same key at
+once, one of them calls upstream and the others wait for its result, so
+upstream traffic scales with distinct symbols rather than sessions.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+from data_provider import MAX_WORKERS, get_provider
+
+# Quotes go stale within seconds, bars within a minute, fundamentals in hours
+QUOTE_TTL = 15
+HISTORY_TTL = 60
+INFO_TTL = 6 * 60 * 60
+
+QUOTE_MAXSIZE = 1024
+HISTORY_MAXSIZE = 128
+INFO_MAXSIZE = 512
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.joined = 0
+
+    def do(self, key, func):
+        """Return ``func()``, or the result of an identical call already running"""
+        return self.do_many([key], lambda keys: {key: func()})[key]
+
+    def do_many(self, keys, func):
+        """Return ``{key: value}`` for ``keys``, loading at most once per key
+
+        ``func(keys)`` is called with only the keys no other caller is
+        already loading and must return a dict covering all of them; keys
+        in flight elsewhere are waited for instead.
+        """
+        own = {}
+        waits = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._calls.get(key)
+                if future is None:
+                    own[key] = self._calls[key] = Future()
+                else:
+                    waits[key] = future
+            if own:
+                self.leaders += 1
+            self.joined += len(waits)
+
+        results = {}
+        if own:
+            try:
+                values = func(list(own))
+                for key, future in own.items():
+                    future.set_result(values[key])
+                    results[key] = values[key]
+            except BaseException as e:
+                for future in own.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for key in own:
+                        self._calls.pop(key, None)
+
+        for key, future in waits.items():
+            results[key] = future.result()
+        return results
+
+    def stats(self):
+        return {"leaders": self.leaders, "joined": self.joined, "in_flight": len(self._calls)}
+
+
+class TTLCache:
+    """Thread-safe mapping with per-entry expiry, LRU eviction and coalesced loads"""
+
+    def __init__(self, ttl, maxsize, name="cache", clock=time.monotonic, sizeof=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.name = name
+        self.sizeof = sizeof
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        """Return a fresh cached value, counting the lookup as a hit or miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Store ``value``, evicting least recently used entries when full"""
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _peek(self, key):
+        """Return a fresh value without touching LRU order or counters"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > self._clock():
+                return entry[1]
+        return _MISSING
+
+    def peek(self, key, default=None):
+        """Return a fresh cached value without loading it or counting the lookup"""
+        value = self._peek(key)
+        return default if value is _MISSING else value
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Return the cached value for ``key`` or load, store and return it
+
+        Concurrent misses for the same key share a single ``loader()`` call.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.flights.do(key, lambda: self._load(key, loader, ttl))
+        return value
+
+    def _load(self, key, loader, ttl):
+        # Another caller may have stored the value between our miss and now
+        value = self._peek(key)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl=ttl)
+        return value
+
+    def replace(self, key, old, new):
+        """Swap the fresh value ``old`` stored at ``key`` for ``new``, keeping its expiry
+
+        Returns ``False`` without storing when ``key`` holds anything else.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] is not old or entry[0] <= self._clock():
+                return False
+            self._data[key] = (entry[0], new)
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def nbytes(self):
+        """Current size of the cached values according to ``sizeof``"""
+        with self._lock:
+            values = [value for _, value in self._data.values()]
+        return sum(self.sizeof(value) for value in values)
+
+    def stats(self):
+        """Return the cache counters as a plain dict"""
+        lookups = self.hits + self.misses
+        stats = {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "coalesced": self.flights.joined,
+        }
+        if self.sizeof is not None:
+            stats["bytes"] = self.nbytes()
+        return stats
+
+
+quote_cache = TTLCache(QUOTE_TTL, QUOTE_MAXSIZE, name="quotes")
+# Entries are swapped for wider frames as indicators are memoized, so their size is measured on demand
+history_cache = TTLCache(HISTORY_TTL, HISTORY_MAXSIZE, name="history", sizeof=metrics.payload_bytes)
+info_cache = TTLCache(INFO_TTL, INFO_MAXSIZE, name="info")
+
+
+def cached_history(ticker, period="1y", interval="1d", loader=None):
+    """Return history for (ticker, period, interval) from the shared cache
+
+    ``loader`` lets callers cache a post-processed frame (for example with
+    indicators attached) instead of the raw provider response.
+    """
+    if loader is None:
+        loader = lambda: get_provider().get_history(ticker, period=period, interval=interval)
+    return history_cache.get_or_set((ticker, period, interval), loader)
+
+
+def cached_histories(tickers, period="1y", interval="1d", loader=None, max_workers=MAX_WORKERS):
+    """Return ``{ticker: history}`` for many symbols, loading the uncached ones concurrently
+
+    ``loader(ticker)`` replaces the provider call as in ``cached_history``.
+    Symbols that fail to load map to None and are not cached.
+    """
+    if loader is None:
+        loader = lambda ticker: get_provider().get_history(ticker, period=period, interval=interval)
+    keys = [(ticker, period, interval) for ticker in dict.fromkeys(tickers)]
+    histories = {}
+    for key in keys:
+        history = history_cache.get(key)
+        if history is not None:
+            histories[key] = history
+
+    def load(ticker):
+        try:
+            return loader(ticker)
+        except Exception:
+            return None
+
+    def fetch(missing):
+        workers = max(1, min(max_workers, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="histories") as pool:
+            loaded = dict(zip(missing, pool.map(load, [key[0] for key in missing])))
+        for key, history in loaded.items():
+            if history is not None:
+                history_cache.set(key, history)
+        return loaded
+
+    missing = [key for key in keys if key not in histories]
+    if missing:
+        # Keys another session is already loading are waited for, the rest load together
+        histories.update(history_cache.flights.do_many(missing, fetch))
+    return {key[0]: histories[key] for key in keys}
+
+
+def cached_info(ticker):
+    """Return company info for ``ticker`` from the shared cache"""
+    return info_cache.get_or_set(ticker, lambda: get_provider().get_info(ticker))
+
+
+def cached_quotes(tickers):
+    """Return quotes in input order, fetching only the uncached symbols
+
+    Failed quotes are returned but not cached so they are retried next time.
+    """
+    tickers = list(tickers)
+    quotes = {}
+    for ticker in tickers:
+        quote = quote_cache.get(ticker)
+        if quote is not None:
+            quotes[ticker] = quote
+
+    missing = [t for t in tickers if t not in quotes]
+    if missing:
+        # Symbols another session is already fetching are waited for, the
+        # rest go out in one batch
+        quotes.update(quote_cache.flights.do_many(missing, _fetch_quotes))
+
+    return [quotes[t] for t in tickers]
+
+
+def prefetch_quotes(tickers):
+    """Start loading uncached quotes in a background thread
+
+    A later ``cached_quotes`` call finds them cached, or joins the fetch
+    that is still in flight.
+    """
+    thread = threading.Thread(target=cached_quotes, args=(list(tickers),), name="prefetch-quotes", daemon=True)
+    thread.start()
+    return thread
+
+
+def invalidate_quotes(tickers):
+    """Drop cached quotes so the next lookup fetches them again"""
+    for ticker in tickers:
+        quote_cache.invalidate(ticker)
+
+
+def refresh_quotes(tickers, provider=None):
+    """Fetch fresh quotes for ``tickers`` (bypassing cached values) and cache them
+
+    Concurrent fetches of the same symbol still share one upstream call.
+    """
+    tickers = list(tickers)
+    quotes = quote_cache.flights.do_many(tickers, lambda keys: _fetch_quotes(keys, provider))
+    return [quotes[t] for t in tickers]
+
+
+def _fetch_quotes(tickers, provider=None):
+    quotes = {}
+    for quote in (provider or get_provider()).get_quotes(tickers):
+        quotes[quote.ticker] = quote
+        if quote.error is None:
+            quote_cache.set(quote.ticker, quote)
+    return quotes
+
+
+def cache_stats():
+    """Return counters for all shared caches"""
+    return [cache.stats() for cache in (quote_cache, history_cache, info_cache)]
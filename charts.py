@@ -0,0 +1,366 @@
+"""Plotly chart construction for the dashboard.
+
+Figures are built from cached skeletons (layout plus styled, empty traces)
+keyed by chart type and selected indicators; each render only fills the
+data arrays into the skeleton.
+
+Long histories are downsampled before they reach Plotly: candles and volume
+are aggregated into OHLC buckets and indicator lines are reduced with
+Largest-Triangle-Three-Buckets (LTTB), so no trace carries more than
+``MAX_POINTS`` points. Past ``WEBGL_THRESHOLD`` source bars, line overlays
+are drawn with WebGL (``Scattergl``) traces.
+
+Plotly is imported when the first figure is built, not with this module,
+so importing the chart constants does not delay the page shell.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+# Upper bound on points sent to the browser per trace
+MAX_POINTS = 2000
+
+# Series longer than MINMAX_RATIO * max_points are pre-reduced to extremes
+MINMAX_RATIO = 4
+
+# Source bar count above which line traces switch to WebGL
+WEBGL_THRESHOLD = 5000
+
+# Chart types offered in the sidebar
+CHART_TYPES = ["Candlestick", "Line", "OHLC"]
+
+# Line overlays on the price panel: (column, legend name, color)
+LINE_OVERLAYS = [
+    ('SMA20', 'SMA 20', 'rgba(255, 255, 100, 0.8)'),
+    ('SMA50', 'SMA 50', 'rgba(255, 100, 100, 0.8)'),
+    ('EMA20', 'EMA 20', 'rgba(100, 255, 100, 0.8)'),
+]
+
+# Indicators that change the figure's traces, in trace order
+CHART_INDICATORS = ['SMA20', 'SMA50', 'EMA20', 'BB', 'RSI']
+
+# Line colors for compared symbols, reused in order
+COMPARISON_COLORS = [
+    '#3a7bd5', '#20ce99', '#ff5252', '#ffb300', '#9C27B0', '#00d2ff', '#ff7043', '#8bc34a',
+    '#f06292', '#90a4ae', '#ffee58', '#26a69a', '#7e57c2', '#d4e157', '#ef5350', '#29b6f6',
+]
+
+
+def downsample_ohlc(df, max_points=MAX_POINTS):
+    """Aggregate bars into at most ``max_points`` OHLCV buckets
+
+    Each bucket keeps the first open, highest high, lowest low, last close
+    and summed volume, labelled with the timestamp of its first bar.
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+
+    return pd.DataFrame(
+        {
+            'Open': df['Open'].to_numpy()[starts],
+            'High': np.fmax.reduceat(high, starts),
+            'Low': np.fmin.reduceat(low, starts),
+            'Close': df['Close'].to_numpy()[ends],
+            'Volume': np.add.reduceat(np.nan_to_num(df['Volume'].to_numpy(dtype=np.float64)), starts),
+        },
+        index=df.index[starts],
+    )
+
+
+def _minmax_candidates(values, buckets):
+    """Positions of the min and max of ``values`` in each of ``buckets`` chunks"""
+    n = len(values)
+    size = -(-n // buckets)
+    padded_max = np.full(buckets * size, -np.inf)
+    padded_min = np.full(buckets * size, np.inf)
+    padded_max[:n] = values
+    padded_min[:n] = values
+    offsets = np.arange(buckets) * size
+    highs = offsets + padded_max.reshape(buckets, size).argmax(axis=1)
+    lows = offsets + padded_min.reshape(buckets, size).argmin(axis=1)
+    return np.unique(np.concatenate(([0], lows, highs, [n - 1])).clip(0, n - 1))
+
+
+def lttb(y, max_points=MAX_POINTS):
+    """Return the positions of ``y`` kept by Largest-Triangle-Three-Buckets
+
+    Points are evenly spaced on the x axis, so positions stand in for x.
+    NaN values (indicator warm-up) are dropped before sampling. Very long
+    series are first reduced to per-chunk minima and maxima (MinMaxLTTB),
+    which preserves extremes and leaves the sequential LTTB pass only a few
+    candidates per bucket.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    positions = np.flatnonzero(~np.isnan(y))
+    if len(positions) <= max_points or max_points < 3:
+        return positions
+
+    if len(positions) > MINMAX_RATIO * max_points:
+        keep = _minmax_candidates(y[positions], MINMAX_RATIO * max_points // 2)
+        positions = positions[keep]
+
+    n = len(positions)
+    x = positions.astype(np.float64)
+    values = y[positions]
+
+    # Interior points are split into max_points - 2 buckets; the first and
+    # last points are always kept
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    counts = np.diff(edges)
+    means_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1]).tolist()
+    means_y = np.append(np.add.reduceat(values[1:n - 1], edges[:-1] - 1) / counts, values[-1]).tolist()
+    xs = x.tolist()
+    ys = values.tolist()
+    bounds = edges.tolist()
+
+    selected = [0]
+    a = 0
+    for i in range(max_points - 2):
+        ax, ay = xs[a], ys[a]
+        cx, cy = means_x[i + 1], means_y[i + 1]
+        best, best_area = bounds[i], -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            # Twice the triangle area with the next bucket's average
+            area = abs((ax - cx) * (ys[j] - ay) - (ax - xs[j]) * (cy - ay))
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        selected.append(a)
+    selected.append(n - 1)
+    return positions[selected]
+
+
+def figure_bytes(fig):
+    """Size in bytes of the JSON payload Streamlit sends for ``fig``"""
+    return len(fig.to_json().encode())
+
+
+def _line_points(df, column, max_points):
+    keep = lttb(df[column].to_numpy(dtype=np.float64), max_points)
+    return dict(x=df.index[keep], y=df[column].to_numpy()[keep])
+
+
+def _price_points(chart_type):
+    if chart_type == 'Line':
+        return lambda df, bars, max_points: _line_points(df, 'Close', max_points)
+    return lambda df, bars, max_points: dict(
+        x=bars.index,
+        open=bars['Open'].to_numpy(),
+        high=bars['High'].to_numpy(),
+        low=bars['Low'].to_numpy(),
+        close=bars['Close'].to_numpy(),
+    )
+
+
+def _bollinger_points(column):
+    def points(df, bars, max_points):
+        # Both bands share the upper band's sample points so the fill lines up
+        keep = lttb(df['BB_Upper'].to_numpy(dtype=np.float64), max_points)
+        return dict(x=df.index[keep], y=df[column].to_numpy()[keep])
+    return points
+
+
+class ChartSkeleton:
+    """Figure layout and styled, empty traces for one chart configuration
+
+    Building the subplot grid, layout, axes and shapes (and validating all of
+    it) is the expensive part of a Plotly figure. A skeleton does it once per
+    (chart type, indicators, WebGL) combination and keeps the result as plain
+    dicts; ``render`` only fills in the data arrays and the title, then wraps
+    them in a figure without re-validating. Skeletons are never mutated, so
+    one instance is shared by every session.
+    """
+
+    def __init__(self, chart_type, selected_indicators, webgl=False):
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        Line = go.Scattergl if webgl else go.Scatter
+        fig = make_subplots(
+            rows=2,
+            cols=1,
+            shared_xaxes=True,
+            vertical_spacing=0.1,
+            row_heights=[0.8, 0.2],
+            specs=[[{"secondary_y": True}],
+                   [{"secondary_y": False}]]
+        )
+        # One data function per trace, in trace order
+        points = []
+
+        def add(trace, data, row=1):
+            fig.add_trace(trace, row=row, col=1)
+            points.append(data)
+
+        # Add price trace
+        if chart_type == 'Line':
+            price = Line(name="Price", line=dict(color='#3a7bd5', width=1.5))
+        elif chart_type == 'OHLC':
+            price = go.Ohlc(name="Price", increasing_line_color='#26a69a', decreasing_line_color='#ef5350')
+        else:
+            price = go.Candlestick(name="Price", increasing_line_color='#26a69a', decreasing_line_color='#ef5350')
+        add(price, _price_points(chart_type))
+
+        # Add volume bar chart
+        add(
+            go.Bar(
+                name='Volume',
+                marker=dict(
+                    color='rgba(100, 100, 255, 0.5)',
+                )
+            ),
+            lambda df, bars, max_points: dict(x=bars.index, y=bars['Volume'].to_numpy()),
+            row=2,
+        )
+
+        # Add selected technical indicators
+        for column, name, color in LINE_OVERLAYS:
+            if column in selected_indicators:
+                add(
+                    Line(name=name, line=dict(color=color, width=1.5)),
+                    lambda df, bars, max_points, column=column: _line_points(df, column, max_points),
+                )
+
+        if 'BB' in selected_indicators:
+            add(
+                Line(
+                    name='BB Upper',
+                    line=dict(color='rgba(150, 150, 150, 0.5)', width=1),
+                    hoverinfo='skip'
+                ),
+                _bollinger_points('BB_Upper'),
+            )
+            add(
+                Line(
+                    name='BB Lower',
+                    line=dict(color='rgba(150, 150, 150, 0.5)', width=1),
+                    fill='tonexty',
+                    fillcolor='rgba(150, 150, 150, 0.1)',
+                    hoverinfo='skip'
+                ),
+                _bollinger_points('BB_Lower'),
+            )
+
+        if 'RSI' in selected_indicators:
+            add(
+                Line(name='RSI', line=dict(color='#9C27B0', width=1.5)),
+                lambda df, bars, max_points: _line_points(df, 'RSI', max_points),
+                row=2,
+            )
+
+            # Add RSI reference lines
+            fig.add_hline(y=70, line_width=1, line_dash="dash", line_color="red", row=2, col=1)
+            fig.add_hline(y=30, line_width=1, line_dash="dash", line_color="green", row=2, col=1)
+
+        # Update layout
+        fig.update_layout(
+            xaxis_title='',
+            yaxis_title='Price (USD)',
+            xaxis_rangeslider_visible=False,
+            template='plotly_dark',
+            height=600,
+            hovermode='x unified',
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1
+            ),
+            margin=dict(l=0, r=0, t=50, b=0)
+        )
+
+        # Update y-axis labels
+        fig.update_yaxes(title_text="Price (USD)", row=1, col=1)
+
+        if 'RSI' in selected_indicators:
+            fig.update_yaxes(title_text="RSI", range=[0, 100], row=2, col=1)
+        else:
+            fig.update_yaxes(title_text="Volume", row=2, col=1)
+
+        skeleton = fig.to_dict()
+        self.layout = skeleton["layout"]
+        self.traces = list(zip(skeleton["data"], points))
+
+    def render(self, df, ticker, time_period, max_points=MAX_POINTS):
+        """Return a figure of ``df`` built on this skeleton"""
+        # Heavy histories are reduced to at most max_points per trace
+        bars = downsample_ohlc(df, max_points)
+        data = [dict(trace, **points(df, bars, max_points)) for trace, points in self.traces]
+        layout = dict(self.layout, title=dict(text=f'{ticker} {time_period} Chart'))
+        import plotly.graph_objects as go
+
+        # Everything but the arrays was validated when the skeleton was built
+        return go.Figure(dict(data=data, layout=layout), _validate=False)
+
+
+@functools.lru_cache(maxsize=64)
+def get_skeleton(chart_type, indicators, webgl):
+    """Return the shared skeleton for a chart configuration"""
+    return ChartSkeleton(chart_type, indicators, webgl)
+
+
+def create_candlestick_chart(df, ticker, time_period, selected_indicators,
+                             chart_type='Candlestick', max_points=MAX_POINTS):
+    """Create an interactive price chart with technical indicators"""
+    indicators = tuple(name for name in CHART_INDICATORS if name in selected_indicators)
+    skeleton = get_skeleton(chart_type, indicators, len(df) > WEBGL_THRESHOLD)
+    return skeleton.render(df, ticker, time_period, max_points)
+
+
+def create_comparison_chart(matrix, benchmark, window, max_points=MAX_POINTS):
+    """Normalized prices, relative strength and rolling correlation of a ``PriceMatrix``"""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    # All symbols share the date axis, so one set of sample columns serves every trace
+    columns = np.arange(len(matrix.dates))
+    if len(columns) > max_points:
+        columns = np.unique(np.linspace(0, len(columns) - 1, max_points).astype(int))
+    x = matrix.dates[columns]
+    panels = [
+        (matrix.normalized(), "Normalized (start = 100)"),
+        (matrix.relative_strength(benchmark), f"Relative to {benchmark}"),
+        (matrix.rolling_correlation(benchmark, window), f"{window}-bar correlation"),
+    ]
+    line_type = "scattergl" if len(matrix) * len(columns) > WEBGL_THRESHOLD else "scatter"
+
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.06,
+                        row_heights=[0.5, 0.25, 0.25])
+    for row, (_, title) in enumerate(panels, start=1):
+        fig.update_yaxes(title_text=title, row=row, col=1)
+    fig.update_yaxes(range=[-1, 1], row=3, col=1)
+    fig.update_layout(
+        template='plotly_dark',
+        height=750,
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+
+    # Traces are plain dicts: validating one per symbol and panel would dominate the cost
+    data = []
+    for row, (values, _) in enumerate(panels, start=1):
+        axis = "" if row == 1 else str(row)
+        for i, ticker in enumerate(matrix.tickers):
+            data.append(dict(
+                type=line_type, mode="lines", x=x, y=values[i, columns], name=ticker,
+                legendgroup=ticker, showlegend=row == 1, xaxis=f"x{axis}", yaxis=f"y{axis}",
+                line=dict(color=COMPARISON_COLORS[i % len(COMPARISON_COLORS)],
+                          width=2.5 if ticker == benchmark else 1.5),
+            ))
+    return go.Figure(dict(data=data, layout=fig.to_dict()["layout"]), _validate=False)
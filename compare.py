@@ -0,0 +1,165 @@
+"""Multi-ticker comparison over one aligned 2-D price matrix.
+
+``PriceMatrix`` puts the closes of N symbols on a shared calendar in a single
+``(tickers, bars)`` float array. Every statistic below works along the bar
+axis with whole-array NumPy operations, so comparing 50 symbols costs one
+pass over a bigger array rather than 50 passes over small ones.
+
+Dates missing for a symbol (exchange holidays, a later listing) are forward
+filled from its previous close; bars before its first close stay NaN and
+are skipped by every statistic.
+"""
+import numpy as np
+import pandas as pd
+
+from data_provider import BARS_PER_DAY
+
+# Default window, in bars, for the rolling correlation
+CORRELATION_WINDOW = 20
+
+# Trading days per year, for annualized volatility
+TRADING_DAYS = 252
+
+DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def _timestamps(index, interval):
+    """``index`` as naive int64 nanoseconds; daily and longer bars keep the date only"""
+    index = pd.DatetimeIndex(index)
+    daily = BARS_PER_DAY.get(interval, 1) <= 1
+    if index.tz is not None:
+        # Daily bars keep their exchange-local date, intraday bars are compared in UTC
+        index = index.tz_localize(None) if daily else index.tz_convert(None)
+    stamps = index.as_unit("ns").asi8
+    if daily:
+        stamps = stamps - stamps % DAY_NS
+    return stamps
+
+
+def forward_fill(values):
+    """Forward-fill NaNs along the last axis of a 2-D array"""
+    positions = np.where(np.isnan(values), 0, np.arange(values.shape[-1]))
+    np.maximum.accumulate(positions, axis=-1, out=positions)
+    return np.take_along_axis(values, positions, axis=-1)
+
+
+def rolling_sums(values, valid, window):
+    """Rolling sums along the last axis, NaN unless all ``window`` values are ``valid``
+
+    ``values`` must already be zero where not ``valid``; any leading axes are
+    summed independently, so several series can share one cumulative pass.
+    """
+    n = values.shape[-1]
+    if n < window:
+        return np.full(values.shape, np.nan)
+    sums = np.cumsum(values, axis=-1)
+    counts = np.cumsum(valid, axis=-1, dtype=np.int32)
+    # NumPy buffers the overlapping operands, so the sums become the output in place
+    out = sums
+    np.subtract(sums[..., window:], sums[..., :n - window], out=out[..., window:])
+    full = counts[..., window - 1:].copy()
+    full[..., 1:] -= counts[..., :n - window]
+    np.copyto(out[..., window - 1:], np.nan, where=full != window)
+    out[..., :window - 1] = np.nan
+    return out
+
+
+def _correlation(sx, sy, sxx, syy, sxy, n):
+    """Pearson correlation from sums (all broadcastable arrays)"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var = (sxx - sx * sx / n) * (syy - sy * sy / n)
+        return np.where(var > 0, cov / np.sqrt(np.where(var > 0, var, 1.0)), np.nan)
+
+
+class PriceMatrix:
+    """Closes aligned on one calendar: ``closes[i, j]`` is ``tickers[i]`` at ``dates[j]``"""
+
+    def __init__(self, tickers, dates, closes):
+        self.tickers = list(tickers)
+        self.dates = dates
+        self.closes = closes
+        self._rows = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    @classmethod
+    def from_histories(cls, histories, interval="1d", column="Close"):
+        """Align ``{ticker: history}`` frames; empty or missing frames are dropped"""
+        series = {ticker: (_timestamps(df.index, interval), df[column].to_numpy(dtype=np.float64))
+                  for ticker, df in histories.items() if df is not None and not df.empty}
+        if not series:
+            return cls([], pd.DatetimeIndex([]), np.empty((0, 0)))
+
+        calendar = np.unique(np.concatenate([stamps for stamps, _ in series.values()]))
+        closes = np.full((len(series), len(calendar)), np.nan)
+        for row, (stamps, values) in enumerate(series.values()):
+            closes[row, np.searchsorted(calendar, stamps)] = values
+        return cls(series, pd.DatetimeIndex(calendar), forward_fill(closes))
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __contains__(self, ticker):
+        return ticker in self._rows
+
+    def row(self, ticker):
+        return self.closes[self._rows[ticker]]
+
+    def normalized(self, base=100.0):
+        """Each close relative to the symbol's first close, scaled to ``base``"""
+        first = np.argmax(~np.isnan(self.closes), axis=-1)
+        start = self.closes[np.arange(len(self)), first]
+        return self.closes / start[:, None] * base
+
+    def returns(self):
+        """Simple bar-over-bar returns; the first bar is NaN"""
+        out = np.full(self.closes.shape, np.nan)
+        np.divide(self.closes[:, 1:], self.closes[:, :-1], out=out[:, 1:])
+        out[:, 1:] -= 1
+        return out
+
+    def relative_strength(self, benchmark):
+        """Normalized price over the benchmark's, scaled to 100 (above 100 is outperforming)"""
+        normalized = self.normalized()
+        return normalized / normalized[self._rows[benchmark]] * 100
+
+    def rolling_correlation(self, benchmark, window=CORRELATION_WINDOW):
+        """Rolling correlation of every symbol's returns with the benchmark's"""
+        returns = self.returns()
+        y = returns[self._rows[benchmark]][None, :]
+        # Only bars where both returns exist count toward the window
+        both = np.isfinite(returns) & np.isfinite(y)
+        x, y = np.where(both, returns, 0.0), np.where(both, y, 0.0)
+        sx, sy, sxx, syy, sxy = rolling_sums(np.stack([x, y, x * x, y * y, x * y]), both, window)
+        return _correlation(sx, sy, sxx, syy, sxy, window)
+
+    def summary(self, benchmark, interval="1d"):
+        """One row per symbol: total return, volatility, drawdown and fit against the benchmark"""
+        returns = self.returns()
+        bench = returns[self._rows[benchmark]][None, :]
+        both = np.isfinite(returns) & np.isfinite(bench)
+        x, y = np.where(both, returns, 0.0), np.where(both, bench, 0.0)
+        n = both.sum(axis=-1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normalized = self.normalized(base=1.0)
+            peaks = np.fmax.accumulate(normalized, axis=-1)
+            drawdown = np.nanmin(normalized / peaks, axis=-1) - 1
+            # Beta is the slope of the symbol's returns on the benchmark's
+            var_y = (y * y).sum(-1) - y.sum(-1) ** 2 / n
+            beta = np.where(var_y > 0, ((x * y).sum(-1) - x.sum(-1) * y.sum(-1) / n) / var_y, np.nan)
+            correlation = _correlation(x.sum(-1), y.sum(-1), (x * x).sum(-1), (y * y).sum(-1),
+                                       (x * y).sum(-1), n)
+            relative = self.relative_strength(benchmark)[:, -1] - 100
+        volatility = np.nanstd(returns, axis=-1) * np.sqrt(TRADING_DAYS * BARS_PER_DAY.get(interval, 1))
+
+        return pd.DataFrame({
+            "Ticker": self.tickers,
+            "Last": self.closes[:, -1],
+            "Return %": (normalized[:, -1] - 1) * 100,
+            "Volatility %": volatility * 100,
+            "Max drawdown %": drawdown * 100,
+            f"vs {benchmark} %": relative,
+            "Correlation": correlation,
+            "Beta": beta,
+        })
+
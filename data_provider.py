@@ -0,0 +1,913 @@
+"""Market data providers and batched quote fetching.
+
+Every upstream call made by the dashboard goes through a ``DataProvider`` so
+the data source can be swapped (Yahoo Finance in production, an offline fake
+or a replay of recorded responses for development and benchmarking) without
+touching the page code.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from resilience import (CircuitBreaker, CircuitOpenError, RateLimited, TokenBucket,
+                        UpstreamTimeout, backoff_delays, call_with_timeout, record)
+
+# Default upper bound for concurrent upstream requests
+MAX_WORKERS = 8
+
+# Resilience defaults for ResilientProvider
+UPSTREAM_TIMEOUT = 10.0
+UPSTREAM_RETRIES = 2
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 4.0
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+
+# Last good responses kept to serve while upstream is failing
+STALE_MAXSIZE = 2048
+
+# Where RecordingProvider writes responses and ReplayProvider serves them from
+DEFAULT_REPLAY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "real-time-stock", "replay")
+
+# "Now" for synthetic data unless another end is given
+FAKE_END = pd.Timestamp("2024-12-31 16:00")
+
+# Approximate number of trading days per period string accepted by yfinance
+PERIOD_DAYS = {
+    "1d": 1,
+    "5d": 5,
+    "1mo": 21,
+    "3mo": 63,
+    "6mo": 126,
+    "1y": 252,
+    "2y": 504,
+    "5y": 1260,
+    "10y": 2520,
+    "ytd": None,
+    "max": 10080,
+}
+
+# Bars per trading day for the intervals accepted by yfinance
+BARS_PER_DAY = {
+    "1m": 390,
+    "2m": 195,
+    "5m": 78,
+    "15m": 26,
+    "30m": 13,
+    "60m": 7,
+    "90m": 5,
+    "1h": 7,
+    "1d": 1,
+    "5d": 0.2,
+    "1wk": 0.2,
+    "1mo": 1 / 21,
+    "3mo": 1 / 63,
+}
+
+# Longest history (in trading days) Yahoo serves for intraday intervals
+INTRADAY_MAX_DAYS = {
+    "1m": 7,
+    "2m": 60,
+    "5m": 60,
+    "15m": 60,
+    "30m": 60,
+    "60m": 730,
+    "90m": 60,
+    "1h": 730,
+}
+
+# Trailing window covered by each period, relative to the latest bar
+PERIOD_OFFSETS = {
+    "1d": pd.offsets.BDay(0),
+    "5d": pd.offsets.BDay(4),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+# pandas frequency used to build a synthetic index for each interval
+INTERVAL_FREQ = {
+    "1m": "min",
+    "2m": "2min",
+    "5m": "5min",
+    "15m": "15min",
+    "30m": "30min",
+    "60m": "h",
+    "90m": "90min",
+    "1h": "h",
+    "1d": "B",
+    "5d": "W-FRI",
+    "1wk": "W-MON",
+    "1mo": "MS",
+    "3mo": "QS",
+}
+
+
+class QuoteSnapshot:
+    """Latest price of one symbol with the few fields the price cards show
+
+    A fixed set of slots instead of the full ``Ticker.info`` payload; the
+    change fields are derived from the price and previous close.
+    """
+
+    __slots__ = ("ticker", "price", "previous_close", "day_high", "day_low", "volume", "source", "error")
+
+    def __init__(self, ticker, price=None, previous_close=None, day_high=None, day_low=None,
+                 volume=None, source=None, error=None):
+        self.ticker = ticker
+        self.price = price
+        self.previous_close = previous_close
+        self.day_high = day_high
+        self.day_low = day_low
+        self.volume = volume
+        self.source = source
+        self.error = error
+
+    @property
+    def change(self):
+        if self.price is None or not self.previous_close:
+            return 0.0
+        return self.price - self.previous_close
+
+    @property
+    def change_pct(self):
+        return self.change / self.previous_close * 100 if self.change else 0.0
+
+    @classmethod
+    def from_bars(cls, ticker, history, source="bars"):
+        """Quote from the last bar of ``history`` and the close before it"""
+        closes = history["Close"].dropna() if not history.empty else history
+        if not len(closes):
+            return make_quote(ticker, error="No price available")
+        last = history.loc[closes.index[-1]]
+        return make_quote(
+            ticker, closes.iloc[-1], closes.iloc[-2] if len(closes) > 1 else None,
+            day_high=last["High"], day_low=last["Low"], volume=last["Volume"], source=source,
+        )
+
+    def to_dict(self):
+        return dict({slot: getattr(self, slot) for slot in self.__slots__},
+                    change=self.change, change_pct=self.change_pct)
+
+    def __repr__(self):
+        return f"QuoteSnapshot({self.ticker!r}, price={self.price!r}, error={self.error!r})"
+
+
+def _float(value):
+    return float(value) if value is not None and value == value else None
+
+
+def make_quote(ticker, price=None, previous_close=None, error=None, day_high=None, day_low=None,
+               volume=None, source=None):
+    """Build a ``QuoteSnapshot``; quotes without a price carry an error"""
+    if error is not None or price is None:
+        return QuoteSnapshot(ticker, source=source, error=error or "No price available")
+    return QuoteSnapshot(ticker, float(price), _float(previous_close), _float(day_high), _float(day_low),
+                         _float(volume), source)
+
+
+def period_to_bars(period, interval="1d"):
+    """Estimate how many bars yfinance returns for a period/interval pair"""
+    days = PERIOD_DAYS.get(period, 252)
+    if days is None:
+        today = pd.Timestamp.today()
+        days = max(int(np.busday_count(f"{today.year}-01-01", today.date())), 1)
+    days = min(days, INTRADAY_MAX_DAYS.get(interval, days))
+    return max(int(round(days * BARS_PER_DAY.get(interval, 1))), 1)
+
+
+def period_start(period, last):
+    """Return the first timestamp covered by ``period`` ending at ``last``"""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return last.normalize().replace(month=1, day=1)
+    offset = PERIOD_OFFSETS.get(period, PERIOD_OFFSETS["1y"])
+    if period in ("1d", "5d"):
+        # Day periods count whole trading sessions, like yfinance
+        return last.normalize() - offset
+    return last - offset
+
+
+def slice_period(history, period):
+    """Return the trailing ``period`` of ``history`` as a view"""
+    if history.empty:
+        return history
+    start = period_start(period, history.index[-1])
+    if start is None:
+        return history
+    return history.iloc[history.index.searchsorted(start):]
+
+
+def business_days(end, n):
+    """The ``n`` business days ending at ``end``, at ``end``'s time of day
+
+    Same as ``pd.date_range(end=end, periods=n, freq="B")``, which steps
+    through the offset one day at a time and takes ~150 ms for a long history.
+    """
+    day = np.datetime64(end.normalize().asm8, "D")
+    days = np.busday_offset(day, np.arange(-(n - 1), 1), roll="backward")
+    return pd.DatetimeIndex(days.astype("M8[ns]") + (end - end.normalize()).to_timedelta64(), name="Date")
+
+
+def synthetic_ohlcv(n, seed=0, start_price=100.0, end=None, interval="1d"):
+    """Generate a deterministic random-walk OHLCV frame with ``n`` bars"""
+    rng = np.random.default_rng(seed)
+    freq = INTERVAL_FREQ.get(interval, "B")
+    end = pd.Timestamp(end) if end is not None else FAKE_END
+    if freq == "B" and end.tz is None:
+        index = business_days(end, n)
+    else:
+        index = pd.date_range(end=end, periods=n, freq=freq, name="Date")
+
+    # Daily drift and volatility scaled to the bar size keep long series realistic
+    bars_per_day = BARS_PER_DAY.get(interval, 1)
+    returns = rng.normal(0.0003 / bars_per_day, 0.015 / np.sqrt(bars_per_day), n)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.empty(n)
+    open_[0] = start_price
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.normal(0, 0.008, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(1_000_000, 50_000_000, n).astype(np.float64)
+
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+class DataProvider:
+    """Interface for the market data sources used by the dashboard"""
+
+    name = "base"
+
+    # Upstream requests per second allowed by default (None = unlimited)
+    rate_limit = None
+
+    @classmethod
+    def from_env(cls):
+        """Build the provider from environment settings"""
+        return cls()
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        """Return an OHLCV DataFrame indexed by timestamp
+
+        When ``start`` is given, bars from ``start`` onwards are returned
+        instead of the trailing ``period``.
+        """
+        raise NotImplementedError
+
+    def get_info(self, ticker):
+        """Return the company info dict (yfinance ``Ticker.info`` shape)"""
+        raise NotImplementedError
+
+    def get_quote(self, ticker):
+        """Return a ``QuoteSnapshot`` for a single symbol from its last daily bars"""
+        return QuoteSnapshot.from_bars(ticker, self.get_history(ticker, period="5d", interval="1d"))
+
+    def get_quotes(self, tickers, max_workers=MAX_WORKERS, fallback=True):
+        """Fetch quotes for many symbols concurrently, in input order
+
+        Providers with a bulk request fetch symbols missing from it one by
+        one; ``fallback=False`` returns an error quote for them instead.
+        """
+        tickers = list(tickers)
+        if not tickers:
+            return []
+
+        def fetch(ticker):
+            try:
+                return self.get_quote(ticker)
+            except Exception as e:
+                return make_quote(ticker, error=str(e) or type(e).__name__)
+
+        workers = max(1, min(max_workers, len(tickers)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quotes") as pool:
+            return list(pool.map(fetch, tickers))
+
+
+class YahooProvider(DataProvider):
+    """Yahoo Finance provider backed by ``yfinance``
+
+    yfinance keeps a single shared HTTP session for all ``Ticker`` objects, so
+    concurrent requests from the thread pool reuse pooled connections.
+    """
+
+    name = "yahoo"
+    rate_limit = 5.0
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        import yfinance as yf
+
+        if start is not None:
+            return yf.Ticker(ticker).history(start=start, interval=interval)
+        return yf.Ticker(ticker).history(period=period, interval=interval)
+
+    def get_info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+    def get_quote(self, ticker):
+        """Quote from ``fast_info``, which skips the full quoteSummary request behind ``info``"""
+        import yfinance as yf
+
+        fast = yf.Ticker(ticker).fast_info
+        return make_quote(ticker, fast["lastPrice"], fast["previousClose"], day_high=fast["dayHigh"],
+                          day_low=fast["dayLow"], volume=fast["lastVolume"], source="fast_info")
+
+    def get_quotes(self, tickers, max_workers=MAX_WORKERS, fallback=True):
+        """Fetch quotes with one bulk download, falling back per symbol"""
+        import yfinance as yf
+
+        tickers = list(tickers)
+        if not tickers:
+            return []
+
+        quotes = {}
+        try:
+            bulk = yf.download(
+                tickers,
+                period="5d",
+                interval="1d",
+                group_by="ticker",
+                threads=min(max_workers, len(tickers)),
+                progress=False,
+                auto_adjust=False,
+            )
+        except Exception:
+            bulk = pd.DataFrame()
+
+        if not bulk.empty:
+            for ticker in tickers:
+                try:
+                    bars = bulk[ticker]
+                except KeyError:
+                    continue
+                quote = QuoteSnapshot.from_bars(ticker, bars, source="download")
+                if quote.error is None:
+                    quotes[ticker] = quote
+
+        # Symbols missing from the bulk result are retried individually
+        missing = [t for t in tickers if t not in quotes]
+        if not fallback:
+            quotes.update((t, make_quote(t, error="Missing from bulk download")) for t in missing)
+        elif missing:
+            for quote in super().get_quotes(missing, max_workers=max_workers):
+                quotes[quote.ticker] = quote
+
+        return [quotes[t] for t in tickers]
+
+
+class FakeProvider(DataProvider):
+    """Offline provider returning deterministic synthetic data
+
+    ``latency`` (seconds) is slept on every call to emulate a network
+    round-trip, which makes wall-clock comparisons between serial and batched
+    fetching meaningful without touching the network. ``error_rate`` is the
+    probability that a call raises ``ConnectionError`` instead, for exercising
+    the resilience layer. ``end`` plays the role of "now": bars are fixed per
+    ticker and date, so moving ``end`` forward (up to about a month past
+    ``FAKE_END``) only appends new bars.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, end=None, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.end = pd.Timestamp(end) if end is not None else FAKE_END
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        # Calls arrive from the quote thread pool and concurrent sessions
+        self._lock = threading.Lock()
+        # (ticker, interval) -> generated series; building business-day
+        # indexes is slow in pandas, and the bars never change
+        self._generated = {}
+
+    def _seed(self, ticker):
+        return zlib.crc32(ticker.upper().encode())
+
+    @classmethod
+    def from_env(cls):
+        """Honor ``STOCK_FAKE_LATENCY`` and ``STOCK_FAKE_ERROR_RATE``"""
+        return cls(
+            latency=float(os.environ.get("STOCK_FAKE_LATENCY", 0) or 0),
+            error_rate=float(os.environ.get("STOCK_FAKE_ERROR_RATE", 0) or 0),
+        )
+
+    def _wait(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate:
+            with self._lock:
+                failed = self._rng.random() < self.error_rate
+                self.errors += failed
+            if failed:
+                raise ConnectionError("Injected upstream error")
+
+    def _series(self, ticker, interval):
+        key = (ticker.upper(), interval)
+        history = self._generated.get(key)
+        if history is None:
+            history = self._generated[key] = self._generate(ticker, interval)
+        return history[history.index <= self.end]
+
+    def _generate(self, ticker, interval):
+        # Always generate the same longest series and slice it, so every
+        # request for a ticker sees the same bars, like a real upstream would
+        seed = self._seed(ticker)
+        past = period_to_bars("max", interval)
+        future = period_to_bars("1mo", interval)
+        freq = INTERVAL_FREQ.get(interval, "B")
+        horizon = pd.date_range(start=FAKE_END, periods=future + 1, freq=freq)[-1]
+        history = synthetic_ohlcv(past + future, seed=seed, end=horizon, interval=interval)
+
+        # Rescale so the price at FAKE_END lands in a plausible per-ticker range
+        scale = (20 + seed % 480) / history["Close"].asof(FAKE_END)
+        history[["Open", "High", "Low", "Close"]] *= scale
+        return history
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        self._wait()
+        history = self._series(ticker, interval)
+        if start is not None:
+            start = pd.Timestamp(start)
+            if history.index.tz is None and start.tz is not None:
+                start = start.tz_localize(None)
+            return history[history.index >= start]
+        return slice_period(history, period)
+
+    def get_info(self, ticker):
+        self._wait()
+        rng = np.random.default_rng(self._seed(ticker))
+        closes = self._series(ticker, "1d")["Close"]
+        price, previous_close = float(closes.iloc[-1]), float(closes.iloc[-2])
+        change = price - previous_close
+        return {
+            "symbol": ticker,
+            "shortName": f"{ticker} Corp.",
+            "currentPrice": price,
+            "previousClose": previous_close,
+            "regularMarketChange": change,
+            "regularMarketChangePercent": change / previous_close,
+            "dayHigh": price * 1.01,
+            "dayLow": price * 0.99,
+            "volume": int(rng.integers(1_000_000, 50_000_000)),
+            "marketCap": int(price * rng.integers(10_000_000, 5_000_000_000)),
+            "trailingPE": float(rng.uniform(8, 60)),
+            "dividendYield": float(rng.uniform(0, 0.04)),
+            "fiftyTwoWeekHigh": price * 1.3,
+            "fiftyTwoWeekLow": price * 0.7,
+            "longBusinessSummary": f"{ticker} is a synthetic company used for offline testing.",
+            "sector": "Technology",
+            "industry": "Software",
+            "country": "United States",
+            "fullTimeEmployees": int(rng.integers(100, 200_000)),
+            "website": f"https://example.com/{ticker.lower()}",
+            "exchange": "NMS",
+        }
+
+
+def _recording_paths(root, kind, ticker, interval=None):
+    directory = os.path.join(root, kind, interval) if interval else os.path.join(root, kind)
+    return os.path.join(directory, ticker.upper() + (".pkl" if kind == "history" else ".json"))
+
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class RecordingProvider(DataProvider):
+    """Wraps a provider and writes every response under ``root`` for ``ReplayProvider``
+
+    Bars are kept per ticker and interval, merged with what was recorded
+    before, so a recording covers every period any session asked for.
+    """
+
+    def __init__(self, inner, root=DEFAULT_REPLAY_DIR):
+        self.inner = inner
+        self.name = inner.name
+        self.root = root
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        return getattr(self.inner, attr)
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        history = self.inner.get_history(ticker, period=period, interval=interval, start=start)
+        if not history.empty:
+            path = _recording_paths(self.root, "history", ticker, interval)
+            with self._lock:
+                recorded = history
+                if os.path.exists(path):
+                    recorded = pd.read_pickle(path).combine_first(history)
+                _write_atomic(path, lambda f: recorded.to_pickle(f))
+        # The caller gets exactly what upstream returned, not the whole recording
+        return history
+
+    def get_info(self, ticker):
+        info = self.inner.get_info(ticker)
+        _write_atomic(_recording_paths(self.root, "info", ticker),
+                      lambda f: f.write(json.dumps(info, default=str).encode()))
+        return info
+
+    def get_quote(self, ticker):
+        return self.get_quotes([ticker])[0]
+
+    def get_quotes(self, tickers, max_workers=MAX_WORKERS, fallback=True):
+        quotes = self.inner.get_quotes(tickers, max_workers=max_workers, fallback=fallback)
+        for quote in quotes:
+            if quote.error is None:
+                fields = {slot: getattr(quote, slot) for slot in QuoteSnapshot.__slots__}
+                _write_atomic(_recording_paths(self.root, "quotes", quote.ticker),
+                              lambda f: f.write(json.dumps(fields).encode()))
+        return quotes
+
+
+class ReplayProvider(DataProvider):
+    """Offline provider serving the responses written by ``RecordingProvider``
+
+    Like ``FakeProvider``, ``latency`` (seconds) is slept on every call and
+    ``calls`` counts them; a batch of quotes is one call, as it is one bulk
+    request upstream. Requests that were never recorded raise ``LookupError``.
+    """
+
+    name = "replay"
+
+    def __init__(self, root=DEFAULT_REPLAY_DIR, latency=0.0):
+        self.root = root
+        self.latency = latency
+        self.calls = 0
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Honor ``STOCK_REPLAY_DIR`` and ``STOCK_REPLAY_LATENCY``"""
+        return cls(
+            root=os.environ.get("STOCK_REPLAY_DIR") or DEFAULT_REPLAY_DIR,
+            latency=float(os.environ.get("STOCK_REPLAY_LATENCY", 0) or 0),
+        )
+
+    def _wait(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _load(self, kind, ticker, interval=None):
+        path = _recording_paths(self.root, kind, ticker, interval)
+        value = self._loaded.get(path)
+        if value is None:
+            if not os.path.exists(path):
+                raise LookupError(f"No recorded {kind} for {ticker} {interval or ''}".rstrip())
+            if kind == "history":
+                value = pd.read_pickle(path)
+            else:
+                with open(path) as f:
+                    value = json.load(f)
+            self._loaded[path] = value
+        return value
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        self._wait()
+        history = self._load("history", ticker, interval)
+        if start is not None:
+            start = pd.Timestamp(start)
+            if history.index.tz is None and start.tz is not None:
+                start = start.tz_localize(None)
+            elif history.index.tz is not None and start.tz is None:
+                start = start.tz_localize(history.index.tz)
+            return history[history.index >= start]
+        return slice_period(history, period)
+
+    def get_info(self, ticker):
+        self._wait()
+        return dict(self._load("info", ticker))
+
+    def get_quote(self, ticker):
+        return self.get_quotes([ticker])[0]
+
+    def get_quotes(self, tickers, max_workers=MAX_WORKERS, fallback=True):
+        tickers = list(tickers)
+        if not tickers:
+            return []
+        self._wait()
+        quotes = []
+        for ticker in tickers:
+            try:
+                quotes.append(QuoteSnapshot(**self._load("quotes", ticker)))
+            except LookupError:
+                # Sessions that only loaded bars still get a quote from the last two daily bars
+                try:
+                    quotes.append(QuoteSnapshot.from_bars(ticker, slice_period(
+                        self._load("history", ticker, "1d"), "5d"), source="replay"))
+                except LookupError as e:
+                    quotes.append(make_quote(ticker, error=str(e)))
+        return quotes
+
+
+class InstrumentedProvider(DataProvider):
+    """Wraps a provider and records every upstream call in ``metrics``"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+
+    def __getattr__(self, attr):
+        # Anything not instrumented (counters, settings) comes from the inner provider
+        return getattr(self.inner, attr)
+
+    def _call(self, method, ticker, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            metrics.record_upstream(self.name, method, ticker, time.perf_counter() - start,
+                                    error=type(e).__name__)
+            raise
+        metrics.record_upstream(self.name, method, ticker, time.perf_counter() - start, result=result)
+        return result
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        return self._call("history", ticker, self.inner.get_history, ticker,
+                          period=period, interval=interval, start=start)
+
+    def get_info(self, ticker):
+        return self._call("info", ticker, self.inner.get_info, ticker)
+
+    def get_quote(self, ticker):
+        return self._call("quote", ticker, self.inner.get_quote, ticker)
+
+    def get_quotes(self, tickers, max_workers=MAX_WORKERS, fallback=True):
+        tickers = list(tickers)
+        start = time.perf_counter()
+        quotes = self.inner.get_quotes(tickers, max_workers=max_workers, fallback=fallback)
+        # One batched request: its time is split evenly across the symbols
+        share = (time.perf_counter() - start) / max(len(quotes), 1)
+        for quote in quotes:
+            metrics.record_upstream(self.name, "quotes", quote.ticker, share,
+                                    result=quote, error=quote.error)
+        return quotes
+
+
+class ResilientProvider(DataProvider):
+    """Wraps a provider with rate limiting, retries, timeouts and circuit breakers
+
+    Every call waits for a rate-limit token, runs under ``timeout`` and is
+    retried with jittered exponential backoff. Each method (history, info,
+    quotes) has its own circuit breaker; while one is open, or once retries
+    are exhausted, the last good response for the same request is served
+    instead. Failed quotes are filled in per symbol the same way.
+    """
+
+    def __init__(self, inner, rate=None, burst=None, timeout=UPSTREAM_TIMEOUT,
+                 retries=UPSTREAM_RETRIES, backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP,
+                 breaker_threshold=BREAKER_THRESHOLD, breaker_reset=BREAKER_RESET, sleep=time.sleep):
+        self.inner = inner
+        self.name = inner.name
+        self.limiter = TokenBucket(rate, burst, sleep=sleep) if rate else None
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = (backoff_base, backoff_cap)
+        self._sleep = sleep
+        self.breakers = {
+            method: CircuitBreaker(f"{self.name}.{method}", breaker_threshold, breaker_reset)
+            for method in ("history", "info", "quotes")
+        }
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, inner):
+        """Wrap ``inner`` using ``STOCK_RATE_LIMIT`` ("rate[/burst]" or "off") and ``STOCK_UPSTREAM_TIMEOUT``"""
+        rate, burst = inner.rate_limit, None
+        setting = os.environ.get("STOCK_RATE_LIMIT")
+        if setting is not None:
+            if setting.lower() in ("", "0", "off", "none"):
+                rate = None
+            else:
+                rate, _, burst = setting.partition("/")
+                rate, burst = float(rate), float(burst) if burst else None
+        timeout = float(os.environ.get("STOCK_UPSTREAM_TIMEOUT", UPSTREAM_TIMEOUT))
+        return cls(inner, rate=rate, burst=burst, timeout=timeout)
+
+    def __getattr__(self, attr):
+        return getattr(self.inner, attr)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._last_good[key] = value
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > STALE_MAXSIZE:
+                self._last_good.popitem(last=False)
+
+    def last_good(self, key):
+        with self._lock:
+            return self._last_good.get(key)
+
+    def _stale(self, method, key, error):
+        """Serve the last good value for ``key`` or re-raise ``error``"""
+        value = self.last_good(key) if key is not None else None
+        if value is None:
+            raise error
+        record("stale_served", method=method)
+        return value
+
+    def _call(self, method, key, func, healthy=None):
+        """``func()`` with retries; ``healthy(result)`` False leaves the breaker to the caller"""
+        breaker = self.breakers[method]
+        if not breaker.allow():
+            record("short_circuit", method=method)
+            return self._stale(method, key, CircuitOpenError(f"{breaker.name} circuit is open"))
+
+        error = None
+        delays = backoff_delays(self.retries, *self.backoff)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                record("retry", method=method)
+                self._sleep(delays[attempt - 1])
+            if self.limiter is not None and not self.limiter.acquire(max_wait=self.timeout):
+                record("rate_limited", method=method)
+                error = RateLimited(f"No upstream capacity within {self.timeout:g}s")
+                continue
+            try:
+                result = call_with_timeout(func, self.timeout)
+            except UpstreamTimeout as e:
+                record("timeout", method=method)
+                error = e
+                continue
+            except Exception as e:
+                record("error", method=method)
+                error = e
+                continue
+            if healthy is None or healthy(result):
+                breaker.success()
+            if key is not None:
+                self._remember(key, result)
+            return result
+
+        breaker.failure()
+        return self._stale(method, key, error)
+
+    def get_history(self, ticker, period="1y", interval="1d", start=None):
+        key = ("history", ticker, period, interval, start)
+        return self._call("history", key, lambda: self.inner.get_history(
+            ticker, period=period, interval=interval, start=start))
+
+    def get_info(self, ticker):
+        return self._call("info", ("info", ticker), lambda: self.inner.get_info(ticker))
+
+    def get_quote(self, ticker):
+        return self.get_quotes([ticker])[0]
+
+    def get_quotes(self, tickers, max_workers=MAX_WORKERS, fallback=True):
+        tickers = list(tickers)
+        if not tickers:
+            return []
+
+        def batch():
+            # Symbols missing from a bulk request are fetched below, one call (and token) each
+            quotes = self.inner.get_quotes(tickers, max_workers=max_workers, fallback=False)
+            # Per-symbol errors come back inside the quotes; a batch without a
+            # single price is a failed call, retried and counted by the breaker
+            if all(quote.error is not None for quote in quotes):
+                raise ConnectionError(quotes[0].error)
+            return quotes
+
+        def single(ticker):
+            quote = self.inner.get_quote(ticker)
+            if quote.error is not None:
+                raise ConnectionError(quote.error)
+            return quote
+
+        def fetch_one(ticker):
+            try:
+                return self._call("quotes", None, lambda: single(ticker), healthy=lambda quote: False)
+            except Exception as e:
+                return make_quote(ticker, error=str(e) or type(e).__name__)
+
+        try:
+            # A partial batch leaves the breaker alone until its failed symbols are settled
+            batched = self._call("quotes", None, batch,
+                                 healthy=lambda quotes: all(quote.error is None for quote in quotes))
+        except Exception as e:
+            batched = [make_quote(t, error=str(e) or type(e).__name__) for t in tickers]
+        quotes = {quote.ticker: quote for quote in batched}
+
+        # Symbols that failed inside an otherwise good batch are fetched one by
+        # one, so each request is rate limited and timed out on its own
+        failed = [t for t in tickers if quotes[t].error is not None]
+        if failed and fallback and len(failed) < len(tickers):
+            record("retry", method="quotes")
+            workers = max(1, min(max_workers, len(failed)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quotes") as pool:
+                quotes.update(zip(failed, pool.map(fetch_one, failed)))
+            # Symbols still failing were counted by the breaker; a clean pass closes it
+            failed = [t for t in failed if quotes[t].error is not None]
+            if not failed:
+                self.breakers["quotes"].success()
+        if failed and self.breakers["quotes"].state == CircuitBreaker.HALF_OPEN:
+            # A trial batch that left symbols without a price opens the breaker again
+            self.breakers["quotes"].failure()
+
+        results = []
+        for ticker in tickers:
+            quote = quotes[ticker]
+            if quote.error is None:
+                self._remember(("quote", ticker), quote)
+            else:
+                stale = self.last_good(("quote", ticker))
+                if stale is not None:
+                    record("stale_served", method="quotes")
+                    quote = stale
+            results.append(quote)
+        return results
+
+    def stats(self):
+        return {
+            "breakers": [breaker.stats() for breaker in self.breakers.values()],
+            "rate_limit_waits": self.limiter.waits if self.limiter is not None else 0,
+            "last_good": len(self._last_good),
+        }
+
+
+PROVIDERS = {
+    "yahoo": YahooProvider,
+    "fake": FakeProvider,
+    "replay": ReplayProvider,
+}
+
+_provider = None
+
+
+def get_provider():
+    """Return the process-wide provider selected by ``STOCK_DATA_PROVIDER``"""
+    global _provider
+    if _provider is None:
+        name = os.environ.get("STOCK_DATA_PROVIDER", "yahoo").lower()
+        if name not in PROVIDERS:
+            raise ValueError(f"Unknown data provider: {name!r}")
+        provider = PROVIDERS[name].from_env()
+        # STOCK_RECORD_DIR writes every response for a later replay
+        if os.environ.get("STOCK_RECORD_DIR"):
+            provider = RecordingProvider(provider, os.environ["STOCK_RECORD_DIR"])
+        _provider = wrap_provider(provider)
+    return _provider
+
+
+def wrap_provider(provider):
+    """Add the resilience layer and instrumentation around a raw provider
+
+    Instrumentation sits inside, so every attempt (including retries) is
+    counted as an upstream call.
+    """
+    if isinstance(provider, ResilientProvider):
+        return provider
+    if not isinstance(provider, InstrumentedProvider):
+        provider = InstrumentedProvider(provider)
+    return ResilientProvider.from_env(provider)
+
+
+def set_provider(provider):
+    """Replace the process-wide provider (used by tests and benchmarks)"""
+    global _provider
+    _provider = wrap_provider(provider) if provider is not None else None
+
+
+def fetch_quotes(tickers, provider=None, max_workers=MAX_WORKERS):
+    """Fetch quotes for ``tickers`` in one batch, preserving input order
+
+    Each ``QuoteSnapshot`` has an ``error`` attribute that is ``None`` on
+    success, so one failing symbol never hides the others.
+    """
+    provider = provider or get_provider()
+    return provider.get_quotes(tickers, max_workers=max_workers)
@@ -0,0 +1,131 @@
+"""Data loading and formatting helpers used by the dashboard page.
+
+Kept out of ``app.py`` (which renders the page when imported) so they can be
+reused and benchmarked on their own.
+"""
+import numpy as np
+import pandas as pd
+
+from cache import cached_histories, cached_history, history_cache
+from data_provider import get_provider, slice_period
+from indicators import ensure_indicators
+from pyramid import resample, resolve
+from store import get_store
+
+# Largest absolute error accepted when a column is narrowed to float32 (a tenth of a cent)
+FLOAT32_TOLERANCE = 1e-3
+
+
+def format_number(num):
+    """Format numbers with suffixes like K, M, B, T for better readability"""
+    if num is None:
+        return "N/A"
+
+    magnitude = 0
+    suffixes = ["", "K", "M", "B", "T"]
+    while abs(num) >= 1000 and magnitude < len(suffixes) - 1:
+        magnitude += 1
+        num /= 1000.0
+
+    if magnitude > 0:
+        return f"{num:.2f}{suffixes[magnitude]}"
+    else:
+        return f"{num:.2f}"
+
+
+def get_stock_data(ticker, period="1y", interval=None):
+    """Fetch stock data, shared across sessions through the history cache
+
+    Bars are derived from a cached base resolution (see ``pyramid``), so
+    another period or interval of a loaded ticker needs no upstream request.
+    ``interval=None`` picks the interval for the period.
+    """
+    interval, _, _ = resolve(period, interval)
+    return cached_history(ticker, period, interval, loader=lambda: load_view(ticker, period, interval))
+
+
+def get_stocks_data(tickers, period="1y", interval=None):
+    """Fetch several symbols at once through the same cache entries as ``get_stock_data``"""
+    interval, _, _ = resolve(period, interval)
+    return cached_histories(tickers, period, interval, loader=lambda ticker: load_view(ticker, period, interval))
+
+
+def get_base_data(ticker, period="1y", interval=None):
+    """The cached base-resolution bars that the ``period``/``interval`` view is derived from"""
+    _, base, base_period = resolve(period, interval)
+    return cached_history(ticker, base_period, base, loader=lambda: load_stock_data(ticker, base_period, base))
+
+
+def with_indicators(history, names, key):
+    """``history`` with the indicators ``names``, memoized in its history cache entry ``key``
+
+    The frame is extended by copy and the copy replaces it in the cache, so
+    sessions still reading the old frame never see columns appear under them.
+    """
+    enriched = ensure_indicators(history, names)
+    if enriched is not history:
+        history_cache.replace(key, history, enriched)
+    return enriched
+
+
+def base_frames(tickers, period="1y", interval=None):
+    """``{key: frame}`` of the cached base bars behind the views of ``tickers``; nothing is loaded"""
+    _, base, base_period = resolve(period, interval)
+    frames = {}
+    for ticker in tickers:
+        frame = history_cache.peek((ticker, base_period, base))
+        if frame is not None:
+            frames[(ticker, base_period, base)] = frame
+    return frames
+
+
+def refresh_stock_data(ticker, period="1y", interval=None):
+    """Drop the cached view and the base bars behind it, so the next load fetches new bars"""
+    interval, base, base_period = resolve(period, interval)
+    history_cache.invalidate((ticker, period, interval))
+    history_cache.invalidate((ticker, base_period, base))
+
+
+def load_view(ticker, period, interval):
+    """Slice and resample the base bars for one view"""
+    _, base, base_period = resolve(period, interval)
+    if (period, interval) == (base_period, base):
+        return load_stock_data(ticker, period, interval)
+    bars = slice_period(get_base_data(ticker, period, interval), period)
+    return bars if interval == base else resample(bars, interval)
+
+
+def load_stock_data(ticker, period="1y", interval="1d"):
+    """Fetch stock data through the local bar store, which downloads only new bars
+
+    The frame is shared by every session through the history cache, so it is
+    kept compact: float32 columns where precision permits and no derived
+    columns until an indicator asks for them.
+    """
+    store = get_store()
+    if store is not None:
+        history = store.get_history(ticker, period=period, interval=interval)
+    else:
+        history = get_provider().get_history(ticker, period=period, interval=interval)
+
+    if not history.empty:
+        history = compact_history(history)
+
+    return history
+
+
+def compact_history(history):
+    """Return ``history`` with float64 columns narrowed to float32 where that is lossless enough
+
+    Prices below about $16,000 keep sub-cent precision in float32; volumes
+    stay float64 unless every value is an exact float32 integer.
+    """
+    columns = {}
+    for column in history.columns:
+        values = history[column].to_numpy()
+        if values.dtype == np.float64:
+            narrow = values.astype(np.float32)
+            if np.nanmax(np.abs(narrow - values), initial=0) <= FLOAT32_TOLERANCE:
+                values = narrow
+        columns[column] = values
+    return pd.DataFrame(columns, index=history.index)
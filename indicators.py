@@ -0,0 +1,471 @@
+"""Technical indicators: lazy full-history computation and an incremental engine.
+
+Indicator columns are registered with their dependencies and computed only
+when requested, then memoized on the DataFrame. Full-history columns come
+from the NumPy kernels in ``kernels``; series with NaN gaps fall back to the
+``ta`` library, whose NaN handling the kernels do not reproduce.
+``StreamingIndicators`` keeps running state per series so that a new bar
+costs O(1) per indicator instead of a full recomputation, while producing the
+same values as the ``ta`` columns; ``LiveTail`` uses it to extend a cached
+history with the bars polled in live mode.
+"""
+import math
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import kernels
+
+# Columns produced by add_technical_indicators and StreamingIndicators
+INDICATOR_COLUMNS = [
+    "SMA20", "SMA50", "SMA200", "EMA20", "EMA50", "RSI",
+    "MACD", "MACD_Signal", "MACD_Hist", "BB_Upper", "BB_Lower", "BB_Mid",
+]
+
+# Running sums are rebuilt from the window this often to bound float drift
+RESYNC_EVERY = 1024
+
+# Indicator registry: column name -> (required columns, function(df) -> Series)
+INDICATORS = {}
+
+# Sidebar selections that expand to several columns
+SELECTION_COLUMNS = {
+    "BB": ["BB_Upper", "BB_Lower", "BB_Mid"],
+    "MACD": ["MACD", "MACD_Signal", "MACD_Hist"],
+}
+
+
+def _ta():
+    """The ``ta`` library, imported on first use: only series with NaN gaps need it"""
+    import ta
+    return ta
+
+
+def register(name, func, requires=()):
+    """Register an indicator column computed by ``func(df)`` from ``requires``"""
+    INDICATORS[name] = (tuple(requires), func)
+
+
+def _on_close(kernel, fallback):
+    """Run ``kernel`` on the close array, or ``fallback`` when it has NaN gaps"""
+    def compute(df):
+        close = kernels.as_float_array(df['Close'])
+        if np.isfinite(close).all():
+            return pd.Series(kernel(close), index=df.index)
+        return fallback(df['Close'])
+    return compute
+
+
+# Moving Averages
+for _window in (20, 50, 200):
+    register(f"SMA{_window}", _on_close(
+        lambda close, w=_window: kernels.sma(close, w),
+        lambda close, w=_window: _ta().trend.sma_indicator(close, window=w),
+    ))
+for _window in (20, 50):
+    register(f"EMA{_window}", _on_close(
+        lambda close, w=_window: kernels.ema(close, w),
+        lambda close, w=_window: _ta().trend.ema_indicator(close, window=w),
+    ))
+
+# RSI
+register("RSI", _on_close(
+    lambda close: kernels.rsi(close, 14),
+    lambda close: _ta().momentum.rsi(close, window=14),
+))
+
+# MACD: the signal line is an EMA of the MACD line, the histogram their difference
+register("MACD", _on_close(
+    lambda close: kernels.ema(close, 12) - kernels.ema(close, 26),
+    lambda close: _ta().trend.macd(close),
+))
+
+
+def _macd_signal(df):
+    line = kernels.as_float_array(df['MACD'])
+    valid = np.flatnonzero(~np.isnan(line))
+    if len(valid) and np.isfinite(line[valid[0]:]).all():
+        # The signal EMA starts at the first defined MACD value
+        signal = np.full(line.shape, np.nan)
+        signal[valid[0]:] = kernels.ema(line[valid[0]:], 9)
+        return pd.Series(signal, index=df.index)
+    return _ta().trend.ema_indicator(df['MACD'], window=9)
+
+
+register("MACD_Signal", _macd_signal, requires=["MACD"])
+register("MACD_Hist", lambda df: df['MACD'] - df['MACD_Signal'], requires=["MACD", "MACD_Signal"])
+
+# Bollinger Bands share one rolling mean and standard deviation
+register("BB_Mid", _on_close(
+    lambda close: kernels.sma(close, 20),
+    lambda close: _ta().volatility.bollinger_mavg(close),
+))
+register("BB_Std", _on_close(
+    lambda close: kernels.rolling_std(close, 20),
+    lambda close: close.rolling(20, min_periods=20).std(ddof=0),
+))
+register("BB_Upper", lambda df: df['BB_Mid'] + 2 * df['BB_Std'], requires=["BB_Mid", "BB_Std"])
+register("BB_Lower", lambda df: df['BB_Mid'] - 2 * df['BB_Std'], requires=["BB_Mid", "BB_Std"])
+
+# Bar-over-bar change (%) and high-low range
+register("Change", lambda df: df['Close'].pct_change() * 100)
+register("Range", lambda df: df['High'] - df['Low'])
+
+
+def resolve_indicators(names):
+    """Expand selections and return the columns to compute in dependency order"""
+    order = []
+
+    def visit(name):
+        if name in order:
+            return
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator: {name!r}")
+        for dependency in INDICATORS[name][0]:
+            visit(dependency)
+        order.append(name)
+
+    for name in names:
+        for column in SELECTION_COLUMNS.get(name, [name]):
+            visit(column)
+    return order
+
+
+def ensure_indicators(df, names):
+    """Return ``df`` with the requested indicators that are not yet columns of it
+
+    ``df`` itself is never modified: frames are shared read-only through the
+    history cache, so missing columns are added to a shallow copy (the
+    existing columns are not copied). Callers memoize by keeping the result,
+    e.g. ``helpers.with_indicators`` swaps it into the cache. Columns are
+    computed in float64 and stored in float32 when ``Close`` is.
+    """
+    if df.empty:
+        return df
+
+    columns = resolve_indicators(names)
+    if all(column in df.columns for column in columns):
+        return df
+
+    dtype = np.float32 if df['Close'].dtype == np.float32 else None
+    df = df.copy(deep=False)
+    for column in columns:
+        if column not in df.columns:
+            values = INDICATORS[column][1](df)
+            df[column] = values if dtype is None else values.astype(dtype)
+    return df
+
+
+def add_technical_indicators(df):
+    """Add all technical indicators to the dataframe"""
+    return ensure_indicators(df, INDICATOR_COLUMNS)
+
+
+class RollingWindow:
+    """Fixed-size window with a running mean and population variance
+
+    Matches ``Series.rolling(window).mean()`` and ``.std(ddof=0)``: the value
+    is NaN until the window is full or while it contains a NaN.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._buf = np.zeros(window)
+        self._pos = 0
+        self._count = 0
+        self._nans = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._pushes = 0
+        self._undo = None
+
+    def push(self, x):
+        self._undo = (self._pos, self._count, self._nans, self._mean, self._m2,
+                      self._pushes, self._buf[self._pos])
+        full = self._count == self.window
+        old = self._buf[self._pos] if full else 0.0
+        self._buf[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        self._pushes += 1
+        if not full:
+            self._count += 1
+
+        old_nan = full and math.isnan(old)
+        new_nan = math.isnan(x)
+        self._nans += new_nan - old_nan
+
+        if self._nans or old_nan or self._pushes % RESYNC_EVERY == 0:
+            # Rebuild the sums once the window is NaN-free again or on schedule
+            self._resync()
+        elif not full:
+            # Welford update while the window is filling up
+            delta = x - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (x - self._mean)
+        else:
+            # Replace the oldest value in O(1)
+            new_mean = self._mean + (x - old) / self.window
+            self._m2 += (x - old) * (x - new_mean + old - self._mean)
+            self._mean = new_mean
+
+    def undo(self):
+        """Revert the most recent push"""
+        pos, self._count, self._nans, self._mean, self._m2, self._pushes, old = self._undo
+        self._buf[pos] = old
+        self._pos = pos
+        self._undo = None
+
+    def _resync(self):
+        if self._nans:
+            return
+        values = self._buf[:self._count] if self._count < self.window else self._buf
+        self._mean = float(values.mean())
+        self._m2 = float(((values - self._mean) ** 2).sum())
+
+    @property
+    def ready(self):
+        return self._count == self.window and not self._nans
+
+    @property
+    def mean(self):
+        return self._mean if self.ready else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(max(self._m2, 0.0) / self.window) if self.ready else math.nan
+
+
+class EMAState:
+    """Exponential moving average matching ``ewm(adjust=False, min_periods=n)``"""
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self._value = math.nan
+        self._old_wt = 1.0
+        self._count = 0
+        self._undo = None
+
+    @classmethod
+    def from_span(cls, span):
+        return cls(2.0 / (span + 1), span)
+
+    def push(self, x):
+        self._undo = (self._value, self._old_wt, self._count)
+        if self._count == 0:
+            # Leading NaNs are skipped until the first observation
+            if not math.isnan(x):
+                self._value = x
+                self._count = 1
+            return
+
+        # Same operation order as pandas' ewm kernel, including the weight
+        # decay across NaN gaps, for bit-level agreement
+        self._old_wt *= 1.0 - self.alpha
+        if math.isnan(x):
+            return
+        if self._value != x:
+            self._value = (self._old_wt * self._value + self.alpha * x) / (self._old_wt + self.alpha)
+        self._old_wt = 1.0
+        self._count += 1
+
+    def undo(self):
+        self._value, self._old_wt, self._count = self._undo
+        self._undo = None
+
+    @property
+    def value(self):
+        return self._value if self._count >= self.min_periods else math.nan
+
+
+class RSIState:
+    """Wilder RSI with the same seeding as ``ta.momentum.rsi``"""
+
+    def __init__(self, window=14):
+        self._up = EMAState(1.0 / window, window)
+        self._down = EMAState(1.0 / window, window)
+        self._prev = math.nan
+        self._undo = None
+
+    def push(self, close):
+        self._undo = self._prev
+        # The first diff is NaN, which ta turns into a zero move
+        diff = close - self._prev
+        self._up.push(diff if diff > 0 else 0.0)
+        self._down.push(-diff if diff < 0 else 0.0)
+        self._prev = close
+
+    def undo(self):
+        self._up.undo()
+        self._down.undo()
+        self._prev = self._undo
+        self._undo = None
+
+    @property
+    def value(self):
+        up, down = self._up.value, self._down.value
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+
+class MACDState:
+    """MACD line, signal and histogram with ``ta.trend.MACD`` defaults"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self._fast = EMAState.from_span(fast)
+        self._slow = EMAState.from_span(slow)
+        self._signal = EMAState.from_span(signal)
+
+    def push(self, close):
+        self._fast.push(close)
+        self._slow.push(close)
+        # NaN MACD values are skipped, like leading NaNs in ewm
+        self._signal.push(self.macd)
+
+    def undo(self):
+        self._fast.undo()
+        self._slow.undo()
+        self._signal.undo()
+
+    @property
+    def macd(self):
+        return self._fast.value - self._slow.value
+
+    @property
+    def signal(self):
+        return self._signal.value
+
+
+class StreamingIndicators:
+    """Incremental indicator engine for a single close-price series
+
+    ``update`` appends a bar and ``revise`` replaces the most recent one (an
+    intraday bar whose close is still moving); both run in O(1) per indicator.
+    """
+
+    def __init__(self):
+        self._sma20 = RollingWindow(20)
+        self._sma50 = RollingWindow(50)
+        self._sma200 = RollingWindow(200)
+        self._ema20 = EMAState.from_span(20)
+        self._ema50 = EMAState.from_span(50)
+        self._rsi = RSIState(14)
+        self._macd = MACDState(12, 26, 9)
+        self._states = (self._sma20, self._sma50, self._sma200, self._ema20,
+                        self._ema50, self._rsi, self._macd)
+        self.bars = 0
+
+    @classmethod
+    def from_closes(cls, closes):
+        """Build an engine by replaying an existing close series"""
+        engine = cls()
+        for close in np.asarray(closes, dtype=np.float64):
+            engine.update(close)
+        return engine
+
+    def update(self, close):
+        """Append a new bar and return the indicator values for it"""
+        close = float(close)
+        for state in self._states:
+            state.push(close)
+        self.bars += 1
+        return self.values()
+
+    def revise(self, close):
+        """Replace the close of the most recent bar and return new values"""
+        if not self.bars:
+            raise ValueError("No bar to revise")
+        for state in self._states:
+            state.undo()
+        self.bars -= 1
+        return self.update(close)
+
+    def values(self):
+        """Return the indicator values for the most recent bar"""
+        macd = self._macd.macd
+        signal = self._macd.signal
+        mid = self._sma20.mean
+        band = 2 * self._sma20.std
+        return {
+            "SMA20": mid,
+            "SMA50": self._sma50.mean,
+            "SMA200": self._sma200.mean,
+            "EMA20": self._ema20.value,
+            "EMA50": self._ema50.value,
+            "RSI": self._rsi.value,
+            "MACD": macd,
+            "MACD_Signal": signal,
+            "MACD_Hist": macd - signal,
+            "BB_Upper": mid + band,
+            "BB_Lower": mid - band,
+            "BB_Mid": mid,
+        }
+
+
+class LiveTail:
+    """Indicators for polled bars spliced onto the end of a cached history
+
+    The engine replays the history once; after that a splice only pays for
+    the polled bars. Bars before the newest are committed as they complete,
+    and the newest, whose close is still moving, is revised in place. Only a
+    weak reference to the history is kept, so live state held by a session
+    never pins a frame the shared cache has dropped.
+    """
+
+    def __init__(self, history):
+        self._history = weakref.ref(history)
+        self._engine = StreamingIndicators.from_closes(history["Close"].to_numpy(dtype=np.float64))
+        # The history's last bar may still be forming, so it stays revisable
+        self._forming = history.index[-1]
+        self._values = self._engine.values()
+        self._committed = {}
+
+    def matches(self, history):
+        return self._history() is history
+
+    def _rows(self, bars):
+        # Bars older than the first polled one are never spliced again
+        first = bars.index[0]
+        while self._committed:
+            oldest = next(iter(self._committed))
+            if oldest >= first:
+                break
+            del self._committed[oldest]
+        rows = []
+        for ts, close in zip(bars.index, bars["Close"].to_numpy(dtype=np.float64)):
+            if ts in self._committed:
+                rows.append(self._committed[ts])
+                continue
+            if ts == self._forming:
+                self._values = self._engine.revise(close)
+            else:
+                # A newer bar has started, so the previous one is complete
+                self._committed[self._forming] = self._values
+                self._values = self._engine.update(close)
+                self._forming = ts
+            rows.append(self._values)
+        return rows
+
+    def splice(self, bars):
+        """Return the history with ``bars`` replacing its overlapping tail
+
+        Spliced rows get the history's columns and dtypes; derived columns
+        the engine does not produce (``BB_Std``, ``Change``, ...) are NaN.
+        """
+        history = self._history()
+        if bars is None or bars.empty:
+            return history
+        start = history.index.searchsorted(bars.index[0])
+        rows = self._rows(bars)
+        # Plain array concatenation: a few pandas calls per column would cost more than the copy
+        columns = {}
+        for column in history.columns:
+            values = history[column].to_numpy()
+            if column in bars.columns:
+                tail = bars[column].to_numpy()
+            else:
+                tail = np.array([row.get(column, math.nan) for row in rows])
+            columns[column] = np.concatenate((values[:start], tail.astype(values.dtype, copy=False)))
+        return pd.DataFrame(columns, index=history.index[:start].append(bars.index))
@@ -0,0 +1,38 @@
+"""The ``ta`` implementation each NumPy kernel replaces, paired with the kernel.
+
+Shared by ``test_kernels.py``, which checks that they agree, and
+``benchmarks/bench_kernels.py``, which times them.
+"""
+import ta
+
+import kernels
+
+# Indicator name -> (ta implementation, kernel implementation), both returning a tuple
+CASES = {
+    "SMA20": (
+        lambda close: (ta.trend.sma_indicator(close, window=20),),
+        lambda x: (kernels.sma(x, 20),),
+    ),
+    "SMA200": (
+        lambda close: (ta.trend.sma_indicator(close, window=200),),
+        lambda x: (kernels.sma(x, 200),),
+    ),
+    "EMA20": (
+        lambda close: (ta.trend.ema_indicator(close, window=20),),
+        lambda x: (kernels.ema(x, 20),),
+    ),
+    "RSI14": (
+        lambda close: (ta.momentum.rsi(close, window=14),),
+        lambda x: (kernels.rsi(x, 14),),
+    ),
+    "MACD": (
+        lambda close: (lambda m: (m.macd(), m.macd_signal(), m.macd_diff()))(ta.trend.MACD(close)),
+        lambda x: kernels.macd(x),
+    ),
+    "BB20": (
+        lambda close: (lambda b: (b.bollinger_hband(), b.bollinger_mavg(), b.bollinger_lband()))(
+            ta.volatility.BollingerBands(close)
+        ),
+        lambda x: kernels.bollinger(x),
+    ),
+}
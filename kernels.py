@@ -0,0 +1,202 @@
+"""Vectorized NumPy kernels for the dashboard's technical indicators.
+
+Every kernel takes a contiguous float array of closes and works along the
+last axis, so a 2-D ``(tickers, bars)`` array computes many symbols at once.
+Outputs follow the ``ta`` conventions used by the dashboard (``min_periods``
+equal to the window, population standard deviation, EMAs seeded with the
+first value) and are NaN where ``ta`` would be NaN. Inputs are expected to be
+finite; NaN gaps are handled by the pandas-based fallback in ``indicators``.
+"""
+import math
+
+import numpy as np
+
+# Largest growth factor allowed inside one EMA block before precision suffers
+_EMA_BLOCK_RANGE = 1e8
+_EMA_MAX_BLOCK = 4096
+
+# Carry terms smaller than this (relative) are below float64 resolution
+_EMA_CARRY_EPS = 1e-17
+
+# Outputs per segment when computing rolling variance from local sums
+_ROLLING_SEGMENT = 4096
+
+
+def as_float_array(x):
+    """Return ``x`` as a C-contiguous float64 array without copying if possible"""
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def _mask_head(out, count):
+    """Set the first ``count`` values along the last axis to NaN"""
+    out[..., :count] = np.nan
+    return out
+
+
+def sma(x, window):
+    """Simple moving average from a cumulative sum"""
+    x = as_float_array(x)
+    n = x.shape[-1]
+    out = np.empty(x.shape)
+    if n < window:
+        out.fill(np.nan)
+        return out
+
+    # Centering on the first value keeps the running sum small and precise;
+    # the work happens in place to avoid touching fresh memory
+    base = x[..., :1]
+    csum = np.subtract(x, base)
+    np.cumsum(csum, axis=-1, out=csum)
+    body = out[..., window - 1:]
+    body[...] = csum[..., window - 1:]
+    np.subtract(body[..., 1:], csum[..., :n - window], out=body[..., 1:])
+    body *= 1.0 / window
+    body += base
+    return _mask_head(out, window - 1)
+
+
+def rolling_std(x, window):
+    """Population rolling standard deviation from segment-local cumulative sums
+
+    The series is cut into overlapping segments (strided views, no copy) and
+    each segment is centered on its own first value before summing, which
+    keeps the sum-of-squares formula free of catastrophic cancellation.
+    """
+    x = as_float_array(x)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if n < window:
+        return out
+
+    outputs = n - window + 1
+    segment = min(_ROLLING_SEGMENT, outputs)
+    segments = -(-outputs // segment)
+    length = segment + window - 1
+    padded = np.empty(x.shape[:-1] + (segments * segment + window - 1,))
+    padded[..., :n] = x
+    padded[..., n:] = x[..., -1:]
+
+    views = np.lib.stride_tricks.sliding_window_view(padded, length, axis=-1)[..., ::segment, :]
+    sum1 = np.subtract(views, views[..., :1])
+    sum2 = np.multiply(sum1, sum1)
+    np.cumsum(sum1, axis=-1, out=sum1)
+    np.cumsum(sum2, axis=-1, out=sum2)
+
+    # Window sums from differences of the running sums, written into fresh buffers
+    shape = sum1.shape[:-1] + (segment,)
+    s1 = np.empty(shape)
+    var = np.empty(shape)
+    s1[..., 0] = sum1[..., window - 1]
+    var[..., 0] = sum2[..., window - 1]
+    np.subtract(sum1[..., window:], sum1[..., :segment - 1], out=s1[..., 1:])
+    np.subtract(sum2[..., window:], sum2[..., :segment - 1], out=var[..., 1:])
+
+    # var = (s2 - s1**2 / window) / window
+    np.multiply(s1, s1, out=s1)
+    s1 *= 1.0 / window
+    var -= s1
+    var *= 1.0 / window
+    np.maximum(var, 0.0, out=var)
+    np.sqrt(var, out=var)
+    out[..., window - 1:] = var.reshape(x.shape[:-1] + (segments * segment,))[..., :outputs]
+    return out
+
+
+def ewm(x, alpha):
+    """Recursive ``y[t] = (1 - alpha) * y[t-1] + alpha * x[t]`` seeded with ``x[0]``
+
+    The recursion is solved in closed form inside fixed-size blocks with a
+    cumulative sum of rescaled inputs. The carry between blocks decays by
+    ``(1 - alpha) ** block`` per block, so it is a short weighted sum of
+    previous block ends, truncated once the weights drop below float64
+    resolution. Nothing loops over bars in Python.
+    """
+    x = as_float_array(x)
+    out = np.empty(x.shape)
+    n = x.shape[-1]
+    if n == 0:
+        return out
+    out[..., 0] = x[..., 0]
+    if n == 1:
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[...] = x
+        return out
+
+    rest = x[..., 1:]
+    m = rest.shape[-1]
+    block = int(min(_EMA_MAX_BLOCK, m, max(1, math.log(_EMA_BLOCK_RANGE) / -math.log(decay))))
+    blocks = -(-m // block)
+    local = np.zeros(rest.shape[:-1] + (blocks * block,))
+    local[..., :m] = rest
+    local = local.reshape(rest.shape[:-1] + (blocks, block))
+
+    # Zero-carry solution inside each block, kept scaled by growth = decay**-(j+1):
+    # local[j] * decay**(j+1) = alpha * sum_{i<=j} decay**(j-i) * x[i]
+    steps = np.arange(1, block + 1)
+    growth = decay ** -steps
+    local *= growth
+    np.cumsum(local, axis=-1, out=local)
+    local *= alpha
+
+    # carry[b] = y at the end of block b-1 = ends[b-1] + W * carry[b-1], W = decay**block
+    ends = local[..., -1] / growth[-1]
+    block_decay = decay ** block
+    carry = np.empty(ends.shape)
+    carry[..., 0] = x[..., 0]
+    if blocks > 1:
+        carry[..., 1:] = x[..., :1] * block_decay ** np.arange(1, blocks)
+        terms = blocks - 1
+        if block_decay > 0:
+            terms = min(terms, int(math.ceil(math.log(_EMA_CARRY_EPS) / math.log(block_decay))) + 1)
+        weight = 1.0
+        for k in range(terms):
+            carry[..., k + 1:] += weight * ends[..., :blocks - 1 - k]
+            weight *= block_decay
+
+    # y[j] = (scaled local[j] + carry) * decay**(j+1)
+    local += carry[..., None]
+    local *= decay ** steps
+    out[..., 1:] = local.reshape(rest.shape[:-1] + (blocks * block,))[..., :m]
+    return out
+
+
+def ema(x, window):
+    """Exponential moving average with ``span=window`` (``adjust=False``)"""
+    out = ewm(x, 2.0 / (window + 1))
+    return _mask_head(out, window - 1)
+
+
+def rsi(x, window=14):
+    """Wilder relative strength index"""
+    x = as_float_array(x)
+    diff = np.zeros(x.shape)
+    diff[..., 1:] = np.diff(x, axis=-1)
+    up = ewm(np.maximum(diff, 0.0), 1.0 / window)
+    down = ewm(np.maximum(-diff, 0.0), 1.0 / window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(down == 0, 100.0, 100.0 - 100.0 / (1.0 + up / down))
+    return _mask_head(out, window - 1)
+
+
+def macd(x, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    x = as_float_array(x)
+    line = ema(x, fast) - ema(x, slow)
+
+    # The signal EMA starts at the first defined MACD value
+    signal_line = np.full(x.shape, np.nan)
+    if x.shape[-1] >= slow:
+        signal_line[..., slow - 1:] = ema(line[..., slow - 1:], signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(x, window=20, num_std=2):
+    """Bollinger Bands as (upper, middle, lower)"""
+    x = as_float_array(x)
+    mid = sma(x, window)
+    band = num_std * rolling_std(x, window)
+    return mid + band, mid, mid - band
@@ -0,0 +1,261 @@
+"""Background polling for the dashboard's live auto-refresh mode.
+
+A single ``LivePoller`` thread per server process keeps the quotes and the
+newest bars of the symbols on screen fresh. Sessions only read what the
+poller last fetched, so a Streamlit fragment that reruns every few seconds
+costs a dictionary lookup instead of an upstream request, and many sessions
+watching the same symbol share one poll. Polled quotes are also recorded as
+ticks in a ``TickStore``, which keeps the forming bar current between bar
+polls. Code that wants to react to new
+prices can ``subscribe`` and gets every polled quote fanned out to it.
+Symbols nobody has read or subscribed to for ``WATCH_TIMEOUT`` seconds stop
+being polled, and the thread exits once nothing is watched.
+"""
+import threading
+import time
+
+from cache import cached_quotes, refresh_quotes
+from data_provider import get_provider
+from ticks import TickStore
+
+# Refresh intervals (seconds) offered in the sidebar
+REFRESH_INTERVALS = [2, 5, 10, 30, 60]
+
+# Seconds without a reader after which a symbol is no longer polled
+WATCH_TIMEOUT = 60
+
+# Longest the poller thread sleeps before re-checking its watch list
+MAX_SLEEP = 1.0
+
+
+class LivePoller:
+    """Polls quotes and the newest bars for watched symbols on a schedule"""
+
+    def __init__(self, provider=None, clock=time.monotonic):
+        self._provider = provider
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # key -> {"every", "seen", "due"}; bar watches also map each
+        # requested anchor timestamp to when it was last requested
+        self._watches = {}
+        self._quotes = {}
+        # key -> (bars, wall-clock nanoseconds when they were fetched)
+        self._bars = {}
+        # Every polled quote is a tick; sizes are the growth of the day's volume
+        self.ticks = TickStore()
+        self._volumes = {}
+        # ticker -> {token: callback} for pushed quote updates
+        self._subscribers = {}
+        self._tokens = 0
+        self.polls = 0
+
+    @property
+    def provider(self):
+        return self._provider or get_provider()
+
+    def _watch(self, key, every):
+        now = self._clock()
+        watch = self._watches.get(key)
+        if watch is None:
+            watch = self._watches[key] = {"every": every, "seen": now, "due": now + every}
+        else:
+            watch["seen"] = now
+            if every < watch["every"]:
+                watch["every"] = every
+                watch["due"] = min(watch["due"], now + every)
+        return watch
+
+    def quotes(self, tickers, every):
+        """Return the latest quotes for ``tickers`` and keep polling them
+
+        Symbols the poller has not fetched yet are read through the shared
+        quote cache, so the first paint does not wait for a poll.
+        """
+        tickers = list(tickers)
+        with self._lock:
+            for ticker in tickers:
+                self._watch(("quote", ticker), every)
+            latest = {t: self._quotes[t] for t in tickers if t in self._quotes}
+        self._start()
+
+        missing = [t for t in tickers if t not in latest]
+        if missing:
+            for quote in cached_quotes(missing):
+                latest[quote.ticker] = quote
+        return [latest[t] for t in tickers]
+
+    def subscribe(self, tickers, callback, every):
+        """Call ``callback(quote)`` with every polled quote for ``tickers``
+
+        Subscribed symbols keep being polled every ``every`` seconds until
+        the returned function is called to unsubscribe.
+        """
+        tickers = list(tickers)
+        with self._lock:
+            self._tokens += 1
+            token = self._tokens
+            for ticker in tickers:
+                self._watch(("quote", ticker), every)
+                self._subscribers.setdefault(ticker, {})[token] = callback
+        self._start()
+
+        def unsubscribe():
+            with self._lock:
+                for ticker in tickers:
+                    callbacks = self._subscribers.get(ticker, {})
+                    callbacks.pop(token, None)
+                    if not callbacks:
+                        self._subscribers.pop(ticker, None)
+
+        return unsubscribe
+
+    def bars(self, ticker, interval, since, every):
+        """Return bars from ``since`` onwards as of the last poll, or ``None``
+
+        ``since`` is normally the last bar of the caller's cached history; the
+        poller fetches from the earliest anchor still in use so every reader
+        can splice the result onto its own frame. Ticks of the symbol polled
+        after the bars were fetched are folded into the last (forming) bar.
+        """
+        key = ("bars", ticker, interval)
+        with self._lock:
+            watch = self._watch(key, every)
+            anchors = watch.setdefault("anchors", {})
+            anchors[since] = self._clock()
+            latest, fetched = self._bars.get(key, (None, None))
+        self._start()
+
+        if latest is None or latest.empty or latest.index[0] > since:
+            return None
+        return self._with_ticks(ticker, latest[latest.index >= since], fetched)
+
+    def _with_ticks(self, ticker, bars, fetched):
+        if ticker not in self.ticks:
+            return bars
+        moved = self.ticks.symbol(ticker).since(fetched)
+        if moved is None:
+            return bars
+        high, low, last, size = moved
+        bars = bars.copy()
+        row = len(bars) - 1
+        columns = bars.columns.get_indexer(["High", "Low", "Close", "Volume"])
+        forming = bars.iloc[row, columns].to_numpy(dtype=float)
+        bars.iloc[row, columns] = [max(forming[0], high), min(forming[1], low), last, forming[3] + size]
+        return bars
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._wake.set()
+                return
+            self._thread = threading.Thread(target=self._run, name="live-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            wait = self.poll_once()
+            if wait is None:
+                return
+            self._wake.wait(min(wait, MAX_SLEEP))
+            self._wake.clear()
+
+    def _due(self):
+        """Drop idle watches and return (due keys, seconds until the next one)"""
+        now = self._clock()
+        due = []
+        with self._lock:
+            for key, watch in list(self._watches.items()):
+                if key[0] == "quote" and key[1] in self._subscribers:
+                    watch["seen"] = now
+                if now - watch["seen"] > WATCH_TIMEOUT:
+                    del self._watches[key]
+                    if key[0] == "quote":
+                        self._quotes.pop(key[1], None)
+                        self._volumes.pop(key[1], None)
+                        self.ticks.drop(key[1])
+                    else:
+                        self._bars.pop(key, None)
+                    continue
+                anchors = watch.get("anchors", {})
+                for anchor, seen in list(anchors.items()):
+                    if now - seen > WATCH_TIMEOUT:
+                        del anchors[anchor]
+                if watch["due"] <= now:
+                    due.append((key, min(anchors) if anchors else None))
+                    watch["due"] = now + watch["every"]
+            if not self._watches:
+                self._thread = None
+                return due, None
+            wait = max(0.0, min(w["due"] for w in self._watches.values()) - now)
+        return due, wait
+
+    def poll_once(self):
+        """Fetch everything that is due; return seconds until the next poll
+
+        Returns ``None`` when nothing is watched any more.
+        """
+        due, wait = self._due()
+        tickers = [key[1] for key, _ in due if key[0] == "quote"]
+        if tickers:
+            # All due symbols share one batched request, which also refreshes
+            # the shared quote cache
+            now = time.time_ns()
+            for quote in refresh_quotes(tickers, provider=self._provider):
+                if quote.error is not None:
+                    continue
+                self._record_tick(quote, now)
+                with self._lock:
+                    self._quotes[quote.ticker] = quote
+                    callbacks = list(self._subscribers.get(quote.ticker, {}).values())
+                for callback in callbacks:
+                    try:
+                        callback(quote)
+                    except Exception:
+                        # One failing subscriber must not stop the fan-out
+                        pass
+
+        for key, since in due:
+            if key[0] != "bars" or since is None:
+                continue
+            _, ticker, interval = key
+            try:
+                bars = self.provider.get_history(ticker, interval=interval, start=since)
+            except Exception:
+                # Keep serving the previous bars; the next poll retries
+                continue
+            with self._lock:
+                self._bars[key] = (bars, time.time_ns())
+
+        if due:
+            self.polls += 1
+        return wait
+
+    def _record_tick(self, quote, now):
+        if quote.price is None:
+            return
+        volume = quote.volume
+        previous = self._volumes.get(quote.ticker)
+        if volume is not None:
+            self._volumes[quote.ticker] = volume
+        # The first quote and a day rollover carry no traded size
+        size = volume - previous if volume is not None and previous is not None and volume > previous else 0.0
+        self.ticks.push(quote.ticker, now, quote.price, size)
+
+    def stats(self):
+        with self._lock:
+            return {"watched": len(self._watches), "subscribed": len(self._subscribers), "polls": self.polls}
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_poller():
+    """Return the process-wide poller"""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = LivePoller()
+        return _poller
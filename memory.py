@@ -0,0 +1,116 @@
+"""Per-session accounting and budget for the history frames a session uses.
+
+History frames live once in the process-wide ``cache.history_cache`` and are
+shared read-only by every session that asks for the same (ticker, period,
+interval). Each session keeps a ``SessionMemory`` in its session state that
+records which of those frames it has loaded and how many bytes they hold.
+When a session goes over its budget its least recently used frames are
+released: they are dropped from the shared cache unless another live
+session still uses them, instead of waiting for the cache TTL.
+"""
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import metrics
+from cache import history_cache
+
+# Default per-session budget for loaded history frames (STOCK_SESSION_MEMORY_MB)
+SESSION_BUDGET_MB = 256
+
+metrics.registry.describe("dashboard_memory_releases_total",
+                          "History frames released because a session went over its memory budget")
+
+# Every live session's accounting; entries vanish with their session state
+_sessions = weakref.WeakSet()
+_lock = threading.Lock()
+
+
+def session_budget():
+    """Per-session budget in bytes from ``STOCK_SESSION_MEMORY_MB``"""
+    value = os.environ.get("STOCK_SESSION_MEMORY_MB")
+    return int(float(value) * 2**20) if value else SESSION_BUDGET_MB * 2**20
+
+
+class SessionMemory:
+    """The history frames one session has loaded, least recently used first"""
+
+    def __init__(self, budget=None):
+        self.budget = session_budget() if budget is None else budget
+        # (ticker, period, interval) -> weak reference to the shared frame
+        self._frames = OrderedDict()
+        self.releases = 0
+        with _lock:
+            _sessions.add(self)
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    def _bytes(self, key):
+        # Measured on each read: the cache swaps in wider frames as indicators are memoized
+        frame = self._frames[key]()
+        return metrics.payload_bytes(frame) if frame is not None else 0
+
+    @property
+    def total(self):
+        return sum(self._bytes(key) for key in list(self._frames))
+
+    def track(self, frames):
+        """Record ``{key: frame}`` as used by this rerun and enforce the budget
+
+        Frames in ``frames`` are never released by this call, so a single
+        request larger than the budget still renders.
+        """
+        # Frames the shared cache has dropped since are gone already
+        for key in [key for key, ref in self._frames.items() if ref() is None]:
+            del self._frames[key]
+        for key, frame in frames.items():
+            if frame is None or frame.empty:
+                continue
+            self._frames[key] = weakref.ref(frame)
+            self._frames.move_to_end(key)
+
+        total = self.total
+        for key in list(self._frames):
+            if total <= self.budget:
+                break
+            if key not in frames:
+                total -= self._bytes(key)
+                self.release(key)
+        return total
+
+    def release(self, key):
+        """Forget ``key``, dropping it from the shared cache if no other session uses it"""
+        self._frames.pop(key, None)
+        self.releases += 1
+        metrics.registry.inc("dashboard_memory_releases_total")
+        with _lock:
+            shared = any(key in session for session in _sessions if session is not self)
+        if not shared:
+            history_cache.invalidate(key)
+
+    def rows(self):
+        """One row per loaded frame for the debug panel, most recent first"""
+        rows = []
+        for key in reversed(list(self._frames)):
+            frame = self._frames[key]()
+            if frame is None:
+                continue
+            ticker, period, interval = key
+            rows.append({"ticker": ticker, "period": period, "interval": interval, "rows": len(frame),
+                         "columns": frame.shape[1], "bytes": metrics.payload_bytes(frame)})
+        return rows
+
+
+def sessions_bytes():
+    """Bytes of history held across live sessions, each shared frame counted once"""
+    with _lock:
+        sessions = list(_sessions)
+    frames = {}
+    for session in sessions:
+        for key, ref in list(session._frames.items()):
+            frame = ref()
+            if frame is not None:
+                frames[id(frame)] = frame
+    return sum(metrics.payload_bytes(frame) for frame in frames.values())
@@ -0,0 +1,278 @@
+"""Timing spans, counters and latency histograms for the dashboard.
+
+Everything is recorded in a process-wide ``Registry`` shared by all sessions.
+It can be read three ways: ``prometheus_text`` renders the Prometheus text
+exposition format, ``snapshot`` returns a plain dict for the debug panel, and
+each span or upstream call is logged as a one-line JSON object on the
+``stock_dashboard`` logger (set ``STOCK_JSON_LOGS=1`` to print them to
+stderr).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("stock_dashboard")
+
+if os.environ.get("STOCK_JSON_LOGS", "").lower() in ("1", "true", "yes"):
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+def log_event(event, **fields):
+    """Log one structured event as a single JSON line"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(dict(event=event, ts=round(time.time(), 3), **fields), default=str))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q):
+        """Upper bucket bound containing quantile ``q`` (coarse, like Prometheus)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Registry:
+    """Thread-safe store of labelled counters and histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Return counters and histogram summaries as plain data"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": h.sum,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus_text(self, gauges=()):
+        """Render all metrics in the Prometheus text exposition format
+
+        ``gauges`` adds point-in-time values as ``(name, labels, value)``.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (h.cumulative(), h.sum, h.count))
+                                for key, h in self._histograms.items())
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), (buckets, total, count) in histograms:
+            if name not in seen:
+                seen.add(name)
+                header(name, "histogram")
+            for bound, cumulative in buckets:
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for name, labels, value in gauges:
+            if name not in seen:
+                seen.add(name)
+                header(name, "gauge")
+            lines.append(f"{name}{_format_labels(_labels_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+registry.describe("dashboard_stage_seconds", "Time spent in each render stage")
+registry.describe("dashboard_rerun_seconds", "Wall time of a full script or fragment rerun")
+registry.describe("dashboard_milestone_seconds", "Time from the start of a rerun until a milestone such as first paint")
+registry.describe("dashboard_upstream_calls_total", "Upstream data provider calls")
+registry.describe("dashboard_upstream_errors_total", "Upstream data provider calls that failed")
+registry.describe("dashboard_upstream_bytes_total", "Approximate in-memory size of upstream responses")
+
+
+class Trace:
+    """Spans recorded during one rerun, for the debug panel"""
+
+    def __init__(self, name="rerun"):
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans = []
+        self.finished = False
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def mark(self, milestone):
+        """Record how long after the start of the rerun ``milestone`` was reached"""
+        elapsed = self.elapsed
+        registry.observe("dashboard_milestone_seconds", elapsed, milestone=milestone)
+        self.spans.append({"stage": milestone, "ms": elapsed * 1e3})
+        log_event("milestone", milestone=milestone, ms=round(elapsed * 1e3, 3))
+        return elapsed
+
+    def finish(self, **labels):
+        """Record the rerun latency and return it in seconds"""
+        elapsed = self.elapsed
+        self.finished = True
+        registry.observe("dashboard_rerun_seconds", elapsed, kind=self.name, **labels)
+        log_event("rerun", kind=self.name, ms=round(elapsed * 1e3, 3), spans=len(self.spans), **labels)
+        return elapsed
+
+
+@contextmanager
+def span(stage, trace=None, **fields):
+    """Time a block as ``stage`` in the stage histogram (and ``trace``, if given)
+
+    ``fields`` (for example the ticker) go to the JSON log and trace only, so
+    the histogram's label set stays small.
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("dashboard_stage_seconds", elapsed, stage=stage)
+        if trace is not None:
+            trace.spans.append({"stage": stage, "ms": elapsed * 1e3, **fields})
+        log_event("span", stage=stage, ms=round(elapsed * 1e3, 3), error=error, **fields)
+
+
+def payload_bytes(result):
+    """Approximate size of an upstream response
+
+    yfinance does not expose the HTTP payload, so frames count their array
+    memory and everything else its JSON length.
+    """
+    if hasattr(result, "memory_usage"):
+        return int(result.memory_usage(index=True).sum())
+    if hasattr(result, "to_dict"):
+        result = result.to_dict()
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def record_upstream(provider, method, ticker, seconds, result=None, error=None):
+    """Count one upstream call for ``ticker`` and log it"""
+    labels = {"provider": provider, "method": method, "ticker": ticker}
+    registry.inc("dashboard_upstream_calls_total", **labels)
+    if error is not None:
+        registry.inc("dashboard_upstream_errors_total", **labels)
+    elif result is not None:
+        registry.inc("dashboard_upstream_bytes_total", payload_bytes(result), **labels)
+    log_event("upstream", ms=round(seconds * 1e3, 3), error=error, **labels)
+
+
+def prometheus_text(gauges=()):
+    return registry.prometheus_text(gauges)
+
+
+def snapshot():
+    return registry.snapshot()
@@ -0,0 +1,134 @@
+"""Memoized render stages for one session.
+
+Streamlit reruns ``app.py`` from the top on every widget change. The page is
+therefore declared as a small DAG of stages (quotes, history, indicators,
+figure, cards, ...), each with the widget values it reads (``inputs``) and
+the stages it builds on (``after``). Outputs are memoized in the session
+state under the values that produced them, so a rerun only recomputes a
+stage when one of its inputs changed or an upstream stage was recomputed:
+toggling an indicator rebuilds the figure but reuses the history and the
+quotes, and changing the period never touches the quote strip.
+
+Only the latest output of each stage is kept. Stages returning frames from
+the shared history cache are declared ``shared``: they run on every rerun
+(a cache lookup), the memo holds only weak references to their frames, and
+the stages after them are recomputed once the cache serves other frames
+(after its TTL, an Update or a release by the session's memory budget), so
+the memo never keeps a dropped frame alive.
+"""
+import time
+import weakref
+
+import metrics
+
+metrics.registry.describe("dashboard_pipeline_stages_total",
+                          "Render stage lookups by whether the memoized output was reused")
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _refs(value):
+    """Weak references to a frame or to the frames of a ``{key: frame}`` dict"""
+    return [weakref.ref(frame) for frame in (value.values() if isinstance(value, dict) else [value])]
+
+
+def _same(refs, value):
+    frames = list(value.values()) if isinstance(value, dict) else [value]
+    return len(refs) == len(frames) and all(ref() is frame for ref, frame in zip(refs, frames))
+
+
+class Stage:
+    """``func(**upstream outputs, **inputs)`` plus what its output depends on"""
+
+    def __init__(self, name, func, inputs=(), after=(), max_age=None, shared=False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.after = tuple(after)
+        self.max_age = max_age
+        self.shared = shared
+
+
+class Pipeline:
+    """Stages declared for this rerun, with outputs memoized across reruns in ``memo``
+
+    ``memo`` is a dict kept in the session state; stage functions are
+    declared again on every rerun and looked up by name.
+    """
+
+    def __init__(self, memo=None, trace=None, clock=time.monotonic):
+        self.memo = {} if memo is None else memo
+        self.trace = trace
+        self._clock = clock
+        self._stages = {}
+        # Stages resolved during this rerun, in order, with whether they were computed
+        self.runs = []
+        self._resolved = {}
+
+    def stage(self, name, inputs=(), after=(), max_age=None, shared=False):
+        """Decorator declaring ``func`` as stage ``name``
+
+        ``max_age`` (seconds) recomputes the output once it is that old even
+        if nothing changed, for stages that show live data. ``shared`` stages
+        return frames (or a dict of frames) held by the shared cache.
+        """
+        for upstream in after:
+            if upstream not in self._stages:
+                raise KeyError(f"Stage {name!r} is declared before its upstream stage {upstream!r}")
+
+        def declare(func):
+            self._stages[name] = Stage(name, func, inputs, after, max_age, shared)
+            return func
+
+        return declare
+
+    def get(self, name, params):
+        """Output of stage ``name`` for the widget values in ``params``"""
+        if name in self._resolved:
+            return self._resolved[name]
+        stage = self._stages[name]
+        upstream = {dependency: self.get(dependency, params) for dependency in stage.after}
+        inputs = {key: params[key] for key in stage.inputs}
+        key = (_freeze(inputs), tuple(self.memo[dependency]["version"] for dependency in stage.after))
+
+        entry = self.memo.get(name)
+        now = self._clock()
+        if stage.shared:
+            return self._shared(stage, upstream, inputs, key, entry, now)
+        if entry is not None and entry["key"] == key and (
+                stage.max_age is None or now - entry["at"] <= stage.max_age):
+            return self._resolved_as(name, entry["value"], computed=False)
+
+        fields = {"ticker": inputs["ticker"]} if "ticker" in inputs else {}
+        with metrics.span(name, self.trace, **fields):
+            value = stage.func(**upstream, **inputs)
+        version = entry["version"] + 1 if entry is not None else 1
+        self.memo[name] = {"key": key, "value": value, "at": now, "version": version}
+        return self._resolved_as(name, value, computed=True)
+
+    def _shared(self, stage, upstream, inputs, key, entry, now):
+        """Run a shared stage; its version only moves when its inputs change or it returns other frames
+
+        Upstream versions are left out: frames are never modified in place,
+        so the same frames for the same inputs are the same output.
+        """
+        fields = {"ticker": inputs["ticker"]} if "ticker" in inputs else {}
+        with metrics.span(stage.name, self.trace, **fields):
+            value = stage.func(**upstream, **inputs)
+        same = entry is not None and entry["key"][0] == key[0] and _same(entry["refs"], value)
+        version = entry["version"] if same else entry["version"] + 1 if entry is not None else 1
+        self.memo[stage.name] = {"key": key, "refs": _refs(value), "at": now, "version": version}
+        return self._resolved_as(stage.name, value, computed=not same)
+
+    def _resolved_as(self, name, value, computed):
+        self._resolved[name] = value
+        self.runs.append({"stage": name, "computed": computed})
+        metrics.registry.inc("dashboard_pipeline_stages_total", stage=name,
+                             result="computed" if computed else "reused")
+        return value
@@ -0,0 +1,114 @@
+"""Multi-resolution bar pyramid.
+
+Only two base resolutions are downloaded per ticker: 5 minute bars for the
+last month and daily bars for the whole history (``BASES``). Every view is
+derived from one of them locally, so switching between periods or intervals
+costs a slice and a resample of cached bars instead of an upstream request.
+
+``resolve`` picks the display interval for a period (``AUTO_INTERVALS`` keeps
+each view at a few dozen to a few thousand bars) and the finest base that
+covers the period. ``resample`` aggregates bars into coarser buckets with one
+``reduceat`` pass per column.
+"""
+import numpy as np
+import pandas as pd
+
+from data_provider import BARS_PER_DAY, INTERVAL_FREQ, PERIOD_DAYS
+
+# Downloaded base resolutions, finest first: (interval, period fetched)
+BASES = [("5m", "1mo"), ("1d", "max")]
+
+# Interval shown for each period when none is chosen
+AUTO_INTERVALS = {
+    "1d": "5m",
+    "5d": "30m",
+    "1mo": "1h",
+    "3mo": "1d",
+    "6mo": "1d",
+    "ytd": "1d",
+    "1y": "1d",
+    "2y": "1d",
+    "5y": "1wk",
+    "max": "1mo",
+}
+
+# Intervals offered besides automatic selection
+INTERVALS = ["5m", "15m", "30m", "1h", "1d", "1wk", "1mo"]
+
+DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def _days(period):
+    days = PERIOD_DAYS.get(period, 252)
+    # Year to date is at most a year
+    return 252 if days is None else days
+
+
+def _finer_or_equal(interval, other):
+    return BARS_PER_DAY.get(interval, 1) >= BARS_PER_DAY.get(other, 1)
+
+
+def resolve(period, interval=None):
+    """Return ``(interval, base interval, base period)`` for a view of ``period``
+
+    ``interval=None`` uses ``AUTO_INTERVALS``. An interval finer than any base
+    covering the period is coarsened to that base's interval.
+    """
+    interval = interval or AUTO_INTERVALS.get(period, "1d")
+    covering = [(base, base_period) for base, base_period in BASES
+                if base_period == "max" or _days(base_period) >= _days(period)]
+    for base, base_period in covering:
+        if _finer_or_equal(base, interval):
+            return interval, base, base_period
+    base, base_period = covering[0]
+    return base, base, base_period
+
+
+def _bucket_keys(index, interval):
+    """One int64 key per bar; bars sharing a key fall in the same ``interval`` bucket"""
+    if index.tz is not None:
+        # Buckets follow the exchange's wall clock
+        index = index.tz_localize(None)
+    stamps = index.as_unit("ns").asi8
+    if interval == "1mo":
+        return stamps.view("M8[ns]").astype("M8[M]").view(np.int64)
+    days = stamps // DAY_NS
+    if interval == "1d":
+        return days
+    if interval == "1wk":
+        # Day 0 (1970-01-01) is a Thursday; weeks start on Monday
+        return (days + 3) // 7
+
+    # Intraday buckets are counted from each session's first bar
+    size = pd.tseries.frequencies.to_offset(INTERVAL_FREQ[interval]).nanos
+    session = np.flatnonzero(np.diff(days)) + 1
+    session_starts = np.concatenate(([0], session))
+    first = np.repeat(stamps[session_starts], np.diff(np.append(session_starts, len(stamps))))
+    return first + (stamps - first) // size * size
+
+
+def resample(df, interval):
+    """Aggregate OHLCV bars into ``interval`` buckets
+
+    Each bucket keeps the first open, highest high, lowest low, last close
+    and summed volume, labelled with the timestamp of its first bar, like
+    ``charts.downsample_ohlc``. Other columns are dropped.
+    """
+    if df.empty:
+        return df[["Open", "High", "Low", "Close", "Volume"]]
+    keys = _bucket_keys(df.index, interval)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    if len(starts) == len(df):
+        return df[["Open", "High", "Low", "Close", "Volume"]]
+    ends = np.append(starts[1:], len(df)) - 1
+
+    return pd.DataFrame(
+        {
+            "Open": df["Open"].to_numpy()[starts],
+            "High": np.fmax.reduceat(df["High"].to_numpy(), starts),
+            "Low": np.fmin.reduceat(df["Low"].to_numpy(), starts),
+            "Close": df["Close"].to_numpy()[ends],
+            "Volume": np.add.reduceat(np.nan_to_num(df["Volume"].to_numpy()), starts),
+        },
+        index=df.index[starts],
+    )
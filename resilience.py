@@ -0,0 +1,163 @@
+"""Rate limiting, retries, timeouts and circuit breaking for upstream calls.
+
+These are the building blocks of ``data_provider.ResilientProvider``, which
+wraps every provider call:
+
+- a ``TokenBucket`` caps the request rate to what Yahoo tolerates,
+- ``call_with_timeout`` bounds how long a single attempt may take,
+- failed attempts are retried after ``backoff_delays`` (exponential backoff
+  with full jitter, so throttled sessions do not retry in lockstep),
+- a ``CircuitBreaker`` stops calling an upstream that keeps failing and lets
+  the caller serve the last good value until a trial call succeeds.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import metrics
+
+metrics.registry.describe("dashboard_resilience_events_total",
+                          "Rate limiting, retry, timeout and circuit breaker events")
+
+
+class UpstreamTimeout(Exception):
+    """An upstream call did not finish within its timeout"""
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open and no last good value is available"""
+
+
+class RateLimited(Exception):
+    """No rate-limit token became available within the wait limit"""
+
+
+def record(event, **labels):
+    metrics.registry.inc("dashboard_resilience_events_total", event=event, **labels)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: ``rate`` tokens per second, up to ``burst``"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waits = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1.0, max_wait=None):
+        """Take ``tokens``, sleeping until they are available
+
+        Returns False instead of sleeping longer than ``max_wait`` seconds.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    if waited:
+                        self.waits += 1
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return False
+            waited = True
+            self._sleep(wait)
+
+
+def backoff_delays(retries, base=0.25, cap=4.0, rng=random):
+    """Full-jitter exponential backoff: one delay before each retry"""
+    return [rng.uniform(0, min(cap, base * 2 ** attempt)) for attempt in range(retries)]
+
+
+# Attempts run here so a hung request can be abandoned after its timeout
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream")
+
+
+def _reset_executor():
+    # A forked child (e.g. a screener worker) inherits the pool without its threads
+    global _executor
+    _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="upstream")
+
+
+os.register_at_fork(after_in_child=_reset_executor)
+
+
+def call_with_timeout(func, timeout):
+    """Return ``func()`` or raise ``UpstreamTimeout`` after ``timeout`` seconds
+
+    The abandoned call keeps running in the background; its result is dropped.
+    """
+    if not timeout:
+        return func()
+    future = _executor.submit(func)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise UpstreamTimeout(f"Upstream call exceeded {timeout:g}s") from None
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures, retries after ``reset_timeout``
+
+    While open, ``allow`` refuses calls. Once ``reset_timeout`` has passed a
+    single trial call is let through (half-open); its outcome closes the
+    breaker or re-opens it for another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            # Open, or half-open with the trial call still running
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    record("breaker_open", breaker=self.name)
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+
+    def stats(self):
+        return {"name": self.name, "state": self.state, "failures": self.failures, "trips": self.trips}
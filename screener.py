@@ -0,0 +1,190 @@
+"""Headless batch screener: indicators and screen flags for a whole universe.
+
+Loads OHLCV for every symbol in a universe file, computes the dashboard's
+indicator set in a pool of worker processes and writes one row per symbol
+with the latest indicator values and screen flags to CSV or Parquet.
+
+    python screener.py universe.txt --output screen.parquet
+    python screener.py universe.txt --source csv --data-dir bars/ --output screen.csv
+    STOCK_DATA_PROVIDER=fake python screener.py universe.txt --source provider --workers 8
+
+The universe file lists one symbol per line (blank lines and ``#`` comments
+are ignored), or is a CSV with a ``Symbol`` or ``Ticker`` column. Symbols
+that fail to load are kept in the output with their ``error``.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_provider import get_provider, slice_period
+from indicators import INDICATOR_COLUMNS, add_technical_indicators
+from store import DEFAULT_STORE_DIR, OHLCVStore
+
+SOURCES = ["store", "csv", "provider"]
+
+# RSI levels for the overbought/oversold flags
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+# Crossovers within this many bars of the latest one are flagged
+CROSS_LOOKBACK = 5
+
+# Symbols handed to a worker process per task
+CHUNK_SIZE = 64
+
+FLAG_COLUMNS = [
+    "rsi_overbought", "rsi_oversold", "golden_cross", "death_cross",
+    "above_sma200", "bb_breakout_up", "bb_breakout_down",
+]
+
+
+def read_universe(path):
+    """Return the unique symbols listed in ``path``, in file order"""
+    with open(path) as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    lines = [line for line in lines if line]
+    if lines and "," in lines[0]:
+        header = [name.strip().lower() for name in lines[0].split(",")]
+        column = next((header.index(name) for name in ("symbol", "ticker") if name in header), 0)
+        lines = [line.split(",")[column].strip() for line in lines[1:]]
+    return list(dict.fromkeys(symbol.upper() for symbol in lines if symbol))
+
+
+def load_history(ticker, source="store", period="1y", interval="1d", data_dir=None):
+    """Load bars for ``ticker`` from the local store, a CSV directory or the provider"""
+    if source == "store":
+        # Read only: the screener never fills the store from upstream
+        history, _ = OHLCVStore(data_dir or os.environ.get("STOCK_STORE_DIR", DEFAULT_STORE_DIR)).load(
+            ticker, interval)
+        if history is None:
+            raise FileNotFoundError(f"{ticker} is not in the local store")
+        return slice_period(history, period)
+    if source == "csv":
+        history = pd.read_csv(os.path.join(data_dir, f"{ticker}.csv"), index_col=0, parse_dates=True)
+        return slice_period(history.sort_index(), period)
+    return get_provider().get_history(ticker, period=period, interval=interval)
+
+
+def _crossed(fast, slow, lookback):
+    """+1 if ``fast`` crossed above ``slow`` in the last ``lookback`` bars, -1 below, else 0"""
+    above = (fast > slow)[-(lookback + 1):]
+    valid = (~np.isnan(fast) & ~np.isnan(slow))[-(lookback + 1):]
+    if valid.sum() < 2:
+        return 0
+    above = above[valid]
+    changes = np.flatnonzero(above[1:] != above[:-1])
+    if not len(changes):
+        return 0
+    return 1 if above[changes[-1] + 1] else -1
+
+
+def screen_frame(ticker, df, lookback=CROSS_LOOKBACK):
+    """Latest indicator values and screen flags for one symbol"""
+    row = {"ticker": ticker, "bars": len(df)}
+    if df.empty:
+        row["error"] = "no data"
+        return row
+
+    df = add_technical_indicators(df)
+    last = df.iloc[-1]
+    row["date"] = df.index[-1]
+    for column in ["Close", "Volume"] + INDICATOR_COLUMNS:
+        row[column] = float(last[column])
+    if len(df) > 1:
+        row["change_pct"] = (last["Close"] / df["Close"].iloc[-2] - 1) * 100
+
+    cross = _crossed(df["SMA50"].to_numpy(), df["SMA200"].to_numpy(), lookback)
+    row.update(
+        rsi_overbought=bool(last["RSI"] > RSI_OVERBOUGHT),
+        rsi_oversold=bool(last["RSI"] < RSI_OVERSOLD),
+        golden_cross=cross > 0,
+        death_cross=cross < 0,
+        above_sma200=bool(last["Close"] > last["SMA200"]),
+        bb_breakout_up=bool(last["Close"] > last["BB_Upper"]),
+        bb_breakout_down=bool(last["Close"] < last["BB_Lower"]),
+    )
+    row["error"] = None
+    return row
+
+
+def screen_symbols(tickers, source="store", period="1y", interval="1d", data_dir=None,
+                   lookback=CROSS_LOOKBACK):
+    """Screen a chunk of symbols; runs inside a worker process"""
+    rows = []
+    for ticker in tickers:
+        try:
+            df = load_history(ticker, source, period, interval, data_dir)
+            # Store frames are read-only memory maps; indicators need a writable frame
+            rows.append(screen_frame(ticker, df.copy(), lookback))
+        except Exception as e:
+            rows.append({"ticker": ticker, "error": f"{type(e).__name__}: {e}"})
+    return rows
+
+
+def run_screen(tickers, workers=None, chunk_size=CHUNK_SIZE, **options):
+    """Screen ``tickers`` across ``workers`` processes and return one frame"""
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        rows = [row for chunk in chunks for row in screen_symbols(chunk, **options)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(screen_symbols, chunk, **options) for chunk in chunks]
+            rows = [row for future in futures for row in future.result()]
+
+    columns = ["ticker", "date", "bars", "Close", "change_pct", "Volume"] + INDICATOR_COLUMNS + FLAG_COLUMNS
+    result = pd.DataFrame(rows).reindex(columns=columns + ["error"])
+    result["bars"] = result["bars"].astype("Int64")
+    for column in FLAG_COLUMNS:
+        result[column] = result[column].astype("boolean")
+    return result
+
+
+def write_result(result, path):
+    """Write CSV, or Parquet when ``path`` ends with ``.parquet``"""
+    if path.endswith(".parquet"):
+        result.to_parquet(path, index=False)
+    else:
+        result.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("universe", help="file with one symbol per line, or a CSV with a Symbol column")
+    parser.add_argument("--output", default="screen.csv", help="CSV or .parquet file to write")
+    parser.add_argument("--source", choices=SOURCES, default="store",
+                        help="local bar store (default), CSV directory, or the configured data provider")
+    parser.add_argument("--data-dir", help="store root or CSV directory (one <SYMBOL>.csv per symbol)")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--lookback", type=int, default=CROSS_LOOKBACK,
+                        help="bars in which an SMA50/SMA200 crossover is flagged")
+    parser.add_argument("--flagged-only", action="store_true", help="only write symbols with a flag set")
+    args = parser.parse_args()
+    if args.source == "csv" and not args.data_dir:
+        parser.error("--source csv requires --data-dir")
+
+    tickers = read_universe(args.universe)
+    start = time.perf_counter()
+    result = run_screen(tickers, workers=args.workers, chunk_size=args.chunk_size, source=args.source,
+                        period=args.period, interval=args.interval, data_dir=args.data_dir,
+                        lookback=args.lookback)
+    elapsed = time.perf_counter() - start
+    failed = int(result["error"].notna().sum())
+
+    if args.flagged_only:
+        result = result[result[FLAG_COLUMNS].fillna(False).any(axis=1)]
+    write_result(result, args.output)
+    print(f"Screened {len(tickers):,} symbols in {elapsed:.1f}s ({failed:,} failed), "
+          f"wrote {len(result):,} rows to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Persistent local OHLCV store with delta fetching.
+
+Bars already downloaded are kept on disk, one memory-mapped ``.npy`` file per
+ticker and interval, so a repeat lookup only asks the provider for the bars
+after the last stored timestamp. Each file holds a ``(6, n)`` float64 array:
+row 0 is the int64 nanosecond timestamp reinterpreted as float64 bits, rows
+1-5 are Open, High, Low, Close and Volume. Keeping one file per table means a
+rewrite is a single atomic rename, and reading it back is a zero-copy view.
+"""
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_provider import get_provider, period_start, slice_period
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "real-time-stock", "ohlcv")
+
+# Slack allowed between a calendar period's start and the first trading bar
+COVERAGE_GRACE = pd.Timedelta(days=4)
+
+# Relative close difference on an already-final bar that signals a
+# split/dividend re-adjustment of the whole history upstream
+ADJUSTMENT_TOLERANCE = 1e-6
+
+
+class OHLCVStore:
+    """Memory-mapped bar tables under ``root/<interval>/<TICKER>.npy``"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR, provider=None):
+        self.root = root
+        self._provider = provider
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.full_fetches = 0
+        self.delta_fetches = 0
+
+    @property
+    def provider(self):
+        return self._provider or get_provider()
+
+    def _paths(self, ticker, interval):
+        base = os.path.join(self.root, interval, ticker.upper())
+        return base + ".npy", base + ".json"
+
+    def _lock(self, ticker, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def load(self, ticker, interval):
+        """Return the stored bars and metadata, or ``(None, None)``"""
+        data_path, meta_path = self._paths(ticker, interval)
+        if not os.path.exists(data_path) or not os.path.exists(meta_path):
+            return None, None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        table = np.load(data_path, mmap_mode="r")
+        return self._frame(table, meta.get("tz")), meta
+
+    def _frame(self, table, tz):
+        index = pd.DatetimeIndex(table[0].view(np.int64).view("M8[ns]"), name="Date")
+        if tz:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        # The (5, n) row block becomes the frame's single float block without a copy
+        return pd.DataFrame(table[1:].T, index=index, columns=OHLCV_COLUMNS, copy=False)
+
+    def save(self, ticker, interval, history, meta):
+        """Atomically replace the stored table for (ticker, interval)"""
+        data_path, meta_path = self._paths(ticker, interval)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+        index = history.index
+        tz = str(index.tz) if index.tz is not None else None
+        if tz:
+            index = index.tz_convert("UTC").tz_localize(None)
+        table = np.empty((6, len(history)))
+        table[0] = index.as_unit("ns").asi8.view(np.float64)
+        table[1:] = history[OHLCV_COLUMNS].to_numpy(dtype=np.float64).T
+
+        meta = dict(meta, tz=tz, rows=len(history))
+        self._write_atomic(data_path, lambda f: np.save(f, table))
+        self._write_atomic(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+
+    def _write_atomic(self, path, write):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get_history(self, ticker, period="1y", interval="1d"):
+        """Return ``period`` of bars, fetching only what the store is missing"""
+        with self._lock(ticker, interval):
+            stored, meta = self.load(ticker, interval)
+            if stored is None or stored.empty or not self._covers(stored, meta, period):
+                self._refresh(ticker, period, interval)
+            else:
+                self._extend(ticker, period, interval, stored, meta)
+            stored, _ = self.load(ticker, interval)
+        if stored is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return slice_period(stored, period)
+
+    def _covers(self, stored, meta, period):
+        if meta.get("max"):
+            return True
+        if period == "max":
+            return False
+        # Everything after the last stored bar is fetched anyway, so the
+        # stored bars only need to reach back one period from that bar.
+        # Calendar periods get slack for weekends and holidays at the start.
+        grace = pd.Timedelta(0) if period in ("1d", "5d") else COVERAGE_GRACE
+        return stored.index[0] <= period_start(period, stored.index[-1]) + grace
+
+    def _refresh(self, ticker, period, interval, keep_max=False):
+        """Download the whole ``period`` and replace the stored table"""
+        self.full_fetches += 1
+        history = self.provider.get_history(ticker, period=period, interval=interval)
+        if history.empty:
+            return
+        self.save(ticker, interval, history, {"max": keep_max or period == "max"})
+
+    def _extend(self, ticker, period, interval, stored, meta):
+        """Fetch bars from the last final stored bar onwards and merge them"""
+        self.delta_fetches += 1
+        # The last stored bar may still have been forming, so the overlap
+        # starts one bar earlier to compare against a settled bar
+        anchor = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+        delta = self.provider.get_history(ticker, interval=interval, start=anchor)
+        if delta.empty:
+            return
+
+        if anchor in delta.index:
+            before = stored.loc[anchor, "Close"]
+            after = delta.loc[anchor, "Close"]
+            if abs(after - before) > ADJUSTMENT_TOLERANCE * abs(before):
+                # Upstream re-adjusted past prices: the stored bars are stale
+                covered = "max" if meta.get("max") else period
+                self._refresh(ticker, covered, interval, keep_max=meta.get("max", False))
+                return
+
+        new_rows = delta.index[delta.index > stored.index[-1]]
+        last = stored.index[-1]
+        if not len(new_rows) and (last not in delta.index or
+                                  delta.loc[last, OHLCV_COLUMNS].equals(stored.loc[last, OHLCV_COLUMNS])):
+            return
+
+        kept = stored.iloc[:stored.index.searchsorted(delta.index[0])]
+        merged = pd.concat([kept, delta[OHLCV_COLUMNS]])
+        self.save(ticker, interval, merged, meta)
+
+    def stats(self):
+        return {"full_fetches": self.full_fetches, "delta_fetches": self.delta_fetches}
+
+
+_store = None
+
+
+def get_store():
+    """Return the process-wide store, or ``None`` if ``STOCK_STORE_DIR`` is ``off``"""
+    global _store
+    root = os.environ.get("STOCK_STORE_DIR", DEFAULT_STORE_DIR)
+    if root.lower() in ("", "off", "none"):
+        return None
+    if _store is None:
+        _store = OHLCVStore(root)
+    return _store
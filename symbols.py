@@ -0,0 +1,363 @@
+"""Symbol metadata index for sector and industry peer lookup.
+
+Each symbol's name, sector, industry, exchange and market cap bucket are
+kept in one ``.npz`` file: sector, industry and exchange are stored as int16
+codes into small vocabularies, so thousands of symbols take a few hundred
+KB. The index is loaded once per process and kept in memory with
+dictionaries for O(1) lookup by symbol, sector or industry. It is rebuilt
+from provider info in a background thread once it is older than
+``REFRESH_INTERVAL``; until a file exists, a built-in seed list of large US
+companies (using Yahoo Finance's sector names) is used.
+
+    python symbols.py universe.txt    # build the index from provider info
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from data_provider import MAX_WORKERS, get_provider
+from metrics import log_event
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "real-time-stock", "symbols.npz")
+
+# Rebuild the index from provider info once it is this old (seconds)
+REFRESH_INTERVAL = 7 * 24 * 3600
+
+# How often get_index checks the file for a newer copy (seconds)
+CHECK_INTERVAL = 60
+
+# Market cap lower bounds of each bucket, largest first
+CAP_BUCKETS = [(200e9, "mega"), (10e9, "large"), (2e9, "mid"), (300e6, "small"), (50e6, "micro"), (0, "nano")]
+
+# Columns stored as codes into a vocabulary
+CATEGORIES = ("sector", "industry", "exchange")
+
+# (symbol, name, sector, industry, exchange, approximate market cap in $B)
+SEED_SYMBOLS = [
+    ("AAPL", "Apple Inc.", "Technology", "Consumer Electronics", "NMS", 3400),
+    ("MSFT", "Microsoft Corporation", "Technology", "Software - Infrastructure", "NMS", 3100),
+    ("NVDA", "NVIDIA Corporation", "Technology", "Semiconductors", "NMS", 3300),
+    ("AVGO", "Broadcom Inc.", "Technology", "Semiconductors", "NMS", 1000),
+    ("ORCL", "Oracle Corporation", "Technology", "Software - Infrastructure", "NYQ", 470),
+    ("CRM", "Salesforce, Inc.", "Technology", "Software - Application", "NYQ", 320),
+    ("AMD", "Advanced Micro Devices, Inc.", "Technology", "Semiconductors", "NMS", 200),
+    ("ADBE", "Adobe Inc.", "Technology", "Software - Infrastructure", "NMS", 195),
+    ("GOOGL", "Alphabet Inc.", "Communication Services", "Internet Content & Information", "NMS", 2300),
+    ("META", "Meta Platforms, Inc.", "Communication Services", "Internet Content & Information", "NMS", 1500),
+    ("NFLX", "Netflix, Inc.", "Communication Services", "Entertainment", "NMS", 380),
+    ("DIS", "The Walt Disney Company", "Communication Services", "Entertainment", "NYQ", 200),
+    ("TMUS", "T-Mobile US, Inc.", "Communication Services", "Telecom Services", "NMS", 255),
+    ("VZ", "Verizon Communications Inc.", "Communication Services", "Telecom Services", "NYQ", 170),
+    ("AMZN", "Amazon.com, Inc.", "Consumer Cyclical", "Internet Retail", "NMS", 2300),
+    ("TSLA", "Tesla, Inc.", "Consumer Cyclical", "Auto Manufacturers", "NMS", 1300),
+    ("HD", "The Home Depot, Inc.", "Consumer Cyclical", "Home Improvement Retail", "NYQ", 390),
+    ("MCD", "McDonald's Corporation", "Consumer Cyclical", "Restaurants", "NYQ", 210),
+    ("NKE", "NIKE, Inc.", "Consumer Cyclical", "Footwear & Accessories", "NYQ", 110),
+    ("SBUX", "Starbucks Corporation", "Consumer Cyclical", "Restaurants", "NMS", 105),
+    ("WMT", "Walmart Inc.", "Consumer Defensive", "Discount Stores", "NYQ", 730),
+    ("COST", "Costco Wholesale Corporation", "Consumer Defensive", "Discount Stores", "NMS", 410),
+    ("PG", "The Procter & Gamble Company", "Consumer Defensive", "Household & Personal Products", "NYQ", 395),
+    ("KO", "The Coca-Cola Company", "Consumer Defensive", "Beverages - Non-Alcoholic", "NYQ", 270),
+    ("PEP", "PepsiCo, Inc.", "Consumer Defensive", "Beverages - Non-Alcoholic", "NMS", 210),
+    ("JPM", "JPMorgan Chase & Co.", "Financial Services", "Banks - Diversified", "NYQ", 670),
+    ("V", "Visa Inc.", "Financial Services", "Credit Services", "NYQ", 610),
+    ("MA", "Mastercard Incorporated", "Financial Services", "Credit Services", "NYQ", 480),
+    ("BAC", "Bank of America Corporation", "Financial Services", "Banks - Diversified", "NYQ", 340),
+    ("WFC", "Wells Fargo & Company", "Financial Services", "Banks - Diversified", "NYQ", 235),
+    ("GS", "The Goldman Sachs Group, Inc.", "Financial Services", "Capital Markets", "NYQ", 180),
+    ("C", "Citigroup Inc.", "Financial Services", "Banks - Diversified", "NYQ", 135),
+    ("LLY", "Eli Lilly and Company", "Healthcare", "Drug Manufacturers - General", "NYQ", 730),
+    ("UNH", "UnitedHealth Group Incorporated", "Healthcare", "Healthcare Plans", "NYQ", 465),
+    ("JNJ", "Johnson & Johnson", "Healthcare", "Drug Manufacturers - General", "NYQ", 350),
+    ("ABBV", "AbbVie Inc.", "Healthcare", "Drug Manufacturers - General", "NYQ", 315),
+    ("MRK", "Merck & Co., Inc.", "Healthcare", "Drug Manufacturers - General", "NYQ", 250),
+    ("PFE", "Pfizer Inc.", "Healthcare", "Drug Manufacturers - General", "NYQ", 150),
+    ("GE", "GE Aerospace", "Industrials", "Aerospace & Defense", "NYQ", 180),
+    ("CAT", "Caterpillar Inc.", "Industrials", "Farm & Heavy Construction Machinery", "NYQ", 175),
+    ("RTX", "RTX Corporation", "Industrials", "Aerospace & Defense", "NYQ", 155),
+    ("HON", "Honeywell International Inc.", "Industrials", "Conglomerates", "NMS", 145),
+    ("UNP", "Union Pacific Corporation", "Industrials", "Railroads", "NYQ", 140),
+    ("BA", "The Boeing Company", "Industrials", "Aerospace & Defense", "NYQ", 130),
+    ("MMM", "3M Company", "Industrials", "Conglomerates", "NYQ", 70),
+    ("XOM", "Exxon Mobil Corporation", "Energy", "Oil & Gas Integrated", "NYQ", 470),
+    ("CVX", "Chevron Corporation", "Energy", "Oil & Gas Integrated", "NYQ", 260),
+    ("COP", "ConocoPhillips", "Energy", "Oil & Gas E&P", "NYQ", 125),
+    ("EOG", "EOG Resources, Inc.", "Energy", "Oil & Gas E&P", "NYQ", 70),
+    ("SLB", "Schlumberger Limited", "Energy", "Oil & Gas Equipment & Services", "NYQ", 55),
+    ("LIN", "Linde plc", "Basic Materials", "Specialty Chemicals", "NMS", 200),
+    ("SHW", "The Sherwin-Williams Company", "Basic Materials", "Specialty Chemicals", "NYQ", 85),
+    ("FCX", "Freeport-McMoRan Inc.", "Basic Materials", "Copper", "NYQ", 55),
+    ("NEM", "Newmont Corporation", "Basic Materials", "Gold", "NYQ", 45),
+    ("PLD", "Prologis, Inc.", "Real Estate", "REIT - Industrial", "NYQ", 100),
+    ("AMT", "American Tower Corporation", "Real Estate", "REIT - Specialty", "NYQ", 85),
+    ("EQIX", "Equinix, Inc.", "Real Estate", "REIT - Specialty", "NMS", 90),
+    ("SPG", "Simon Property Group, Inc.", "Real Estate", "REIT - Retail", "NYQ", 55),
+    ("NEE", "NextEra Energy, Inc.", "Utilities", "Utilities - Regulated Electric", "NYQ", 150),
+    ("SO", "The Southern Company", "Utilities", "Utilities - Regulated Electric", "NYQ", 90),
+    ("DUK", "Duke Energy Corporation", "Utilities", "Utilities - Regulated Electric", "NYQ", 85),
+    ("AEP", "American Electric Power Company, Inc.", "Utilities", "Utilities - Regulated Electric", "NMS", 50),
+]
+
+
+def cap_bucket(market_cap):
+    """Name of the market cap bucket for ``market_cap`` dollars, or ``""``"""
+    if market_cap is None or not np.isfinite(market_cap):
+        return ""
+    for bound, name in CAP_BUCKETS:
+        if market_cap >= bound:
+            return name
+    return ""
+
+
+def make_record(symbol, name="", sector="", industry="", exchange="", market_cap=None):
+    market_cap = float(market_cap) if market_cap is not None else float("nan")
+    return {
+        "symbol": symbol.upper(),
+        "name": name or "",
+        "sector": sector or "",
+        "industry": industry or "",
+        "exchange": exchange or "",
+        "market_cap": market_cap,
+        "cap_bucket": cap_bucket(market_cap),
+    }
+
+
+class SymbolIndex:
+    """Read-only symbol metadata with O(1) lookup by symbol, sector and industry
+
+    Members of each sector and industry are kept largest market cap first,
+    so peers come out in the order a user would expect.
+    """
+
+    def __init__(self, records, built=None):
+        # Largest first; unknown market caps last
+        self.records = tuple(sorted(records, key=lambda r: (np.isnan(r["market_cap"]), -r["market_cap"])))
+        self.built = built if built is not None else time.time()
+        self._by_symbol = {r["symbol"]: r for r in self.records}
+        self._members = {"sector": {}, "industry": {}}
+        for r in self.records:
+            for field, members in self._members.items():
+                if r[field]:
+                    members.setdefault(r[field], []).append(r["symbol"])
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, symbol):
+        return symbol.upper() in self._by_symbol
+
+    @property
+    def symbols(self):
+        return [r["symbol"] for r in self.records]
+
+    def get(self, symbol):
+        """Metadata for ``symbol``, or ``None``"""
+        return self._by_symbol.get(symbol.upper())
+
+    def members(self, field, value):
+        """Symbols whose ``field`` ("sector" or "industry") is ``value``"""
+        return tuple(self._members[field].get(value, ()))
+
+    def peers(self, symbol, limit=5, sector=None, industry=None):
+        """Up to ``limit`` symbols in the same industry, then the same sector
+
+        ``sector`` and ``industry`` are used for symbols that are not indexed.
+        """
+        symbol = symbol.upper()
+        meta = self.get(symbol)
+        if meta is not None:
+            sector, industry = meta["sector"], meta["industry"]
+        peers = []
+        for field, value in (("industry", industry), ("sector", sector)):
+            for other in self._members[field].get(value, ()):
+                if other != symbol and other not in peers:
+                    peers.append(other)
+                    if len(peers) == limit:
+                        return peers
+        return peers
+
+    def save(self, path):
+        """Atomically write the index to ``path``"""
+        arrays = {
+            "symbol": np.array(self.symbols, dtype=str),
+            "name": np.array([r["name"] for r in self.records], dtype=str),
+            "market_cap": np.array([r["market_cap"] for r in self.records], dtype=np.float64),
+            "built": np.array(self.built),
+        }
+        for field in CATEGORIES:
+            values = [r[field] for r in self.records]
+            vocabulary = sorted(set(values))
+            codes = {value: i for i, value in enumerate(vocabulary)}
+            arrays[field] = np.array([codes[value] for value in values], dtype=np.int16)
+            arrays[f"{field}_names"] = np.array(vocabulary, dtype=str)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            columns = {field: data[f"{field}_names"][data[field]].tolist() for field in CATEGORIES}
+            records = [
+                make_record(symbol, name, market_cap=market_cap,
+                            **{field: columns[field][i] for field in CATEGORIES})
+                for i, (symbol, name, market_cap) in enumerate(
+                    zip(data["symbol"].tolist(), data["name"].tolist(), data["market_cap"].tolist()))
+            ]
+            return cls(records, built=float(data["built"]))
+
+    @classmethod
+    def from_seed(cls):
+        """Index of the built-in seed symbols"""
+        records = [make_record(symbol, name, sector, industry, exchange, cap * 1e9)
+                   for symbol, name, sector, industry, exchange, cap in SEED_SYMBOLS]
+        return cls(records)
+
+
+def build_index(tickers, provider=None, base=None, max_workers=MAX_WORKERS):
+    """Build an index from provider info for ``tickers``
+
+    Symbols whose info cannot be fetched keep their record from ``base``.
+    """
+    provider = provider or get_provider()
+
+    def fetch(ticker):
+        previous = base.get(ticker) if base is not None else None
+        try:
+            info = provider.get_info(ticker)
+        except Exception:
+            return previous
+        previous = previous or {}
+        return make_record(
+            ticker,
+            info.get("shortName") or info.get("longName") or previous.get("name"),
+            info.get("sector") or previous.get("sector"),
+            info.get("industry") or previous.get("industry"),
+            info.get("exchange") or previous.get("exchange"),
+            info.get("marketCap", previous.get("market_cap")),
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="symbols") as pool:
+        records = [r for r in pool.map(fetch, list(dict.fromkeys(t.upper() for t in tickers))) if r]
+    return SymbolIndex(records)
+
+
+def index_path():
+    """Location of the index file, or ``None`` if ``STOCK_SYMBOL_INDEX`` is ``off``"""
+    path = os.environ.get("STOCK_SYMBOL_INDEX", DEFAULT_INDEX_PATH)
+    return None if path.lower() in ("", "off", "none") else path
+
+
+_index = None
+_index_mtime = None
+_checked = 0.0
+_refreshing = False
+_lock = threading.Lock()
+
+
+def _load(path):
+    """Load the index file if it changed since it was last read"""
+    global _index, _index_mtime
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+    if mtime is None:
+        # First run: start from the seed list, refreshed on the usual schedule
+        if _index is None:
+            _index = SymbolIndex.from_seed()
+        try:
+            _index.save(path)
+            _index_mtime = os.stat(path).st_mtime
+        except OSError:
+            pass
+        return
+    if mtime != _index_mtime:
+        try:
+            _index = SymbolIndex.load(path)
+            _index_mtime = mtime
+        except (OSError, ValueError, KeyError):
+            if _index is None:
+                _index = SymbolIndex.from_seed()
+
+
+def _refresh(path, current):
+    global _index, _index_mtime, _refreshing
+    start = time.perf_counter()
+    try:
+        index = build_index(current.symbols, base=current)
+        if len(index):
+            index.save(path)
+            mtime = os.stat(path).st_mtime
+            # Swapped under the lock get_index loads the file with, so neither overwrites the other
+            with _lock:
+                _index = index
+                _index_mtime = mtime
+        log_event("symbol_index_refresh", symbols=len(index), ms=round((time.perf_counter() - start) * 1e3, 3))
+    except Exception as e:
+        log_event("symbol_index_refresh", error=f"{type(e).__name__}: {e}")
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def get_index():
+    """Return the process-wide symbol index
+
+    The file is read once and re-read only if another process replaced it;
+    a stale index is rebuilt in a background thread while the old one keeps
+    serving lookups.
+    """
+    global _index, _checked, _refreshing
+    now = time.monotonic()
+    if _index is not None and now - _checked < CHECK_INTERVAL:
+        return _index
+
+    with _lock:
+        if _index is None or now - _checked >= CHECK_INTERVAL:
+            _checked = now
+            path = index_path()
+            if path is None:
+                if _index is None:
+                    _index = SymbolIndex.from_seed()
+                return _index
+            _load(path)
+            if not _refreshing and time.time() - _index.built > REFRESH_INTERVAL:
+                _refreshing = True
+                threading.Thread(target=_refresh, args=(path, _index), name="symbol-index", daemon=True).start()
+    return _index
+
+
+def main():
+    from screener import read_universe
+
+    parser = argparse.ArgumentParser(description="Build the symbol metadata index from provider info")
+    parser.add_argument("universe", nargs="?", help="symbols to index (default: the built-in seed list)")
+    parser.add_argument("--output", default=index_path() or DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    seed = SymbolIndex.from_seed()
+    tickers = read_universe(args.universe) if args.universe else seed.symbols
+    start = time.perf_counter()
+    index = build_index(tickers, base=seed)
+    index.save(args.output)
+    print(f"Indexed {len(index):,} of {len(tickers):,} symbols in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(args.output) / 1024:,.0f} KiB) -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
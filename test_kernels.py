@@ -0,0 +1,144 @@
+"""The NumPy indicator kernels and the incremental engine must match the ``ta`` columns they replace.
+
+    python -m pytest test_kernels.py
+"""
+import numpy as np
+import pytest
+import ta
+
+import kernels
+from data_provider import synthetic_ohlcv
+from indicators import (INDICATOR_COLUMNS, EMAState, LiveTail, MACDState, RollingWindow, RSIState,
+                        StreamingIndicators, ensure_indicators)
+from kernel_cases import CASES
+
+
+def assert_matches(expected, got, scale):
+    """Same NaN positions and values within a tolerance relative to the price level"""
+    for exp, res in zip(expected, got):
+        exp = np.asarray(exp, dtype=np.float64)
+        np.testing.assert_array_equal(np.isnan(exp), np.isnan(res))
+        np.testing.assert_allclose(res, exp, rtol=1e-9, atol=1e-9 * scale)
+
+
+@pytest.fixture(scope="module")
+def closes():
+    frames = [synthetic_ohlcv(5_000, seed=seed, interval="1m") for seed in range(3)]
+    return [frame["Close"].reset_index(drop=True) for frame in frames]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_kernel_matches_ta(name, closes):
+    ta_impl, kernel_impl = CASES[name]
+    x = kernels.as_float_array(closes[0].to_numpy())
+    assert_matches(ta_impl(closes[0]), kernel_impl(x), float(np.abs(x).max()))
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_kernel_rows_match_ta(name, closes):
+    # A 2-D array is one series per row, as for several tickers at once
+    ta_impl, kernel_impl = CASES[name]
+    matrix = kernels.as_float_array(np.stack([close.to_numpy() for close in closes]))
+    got = kernel_impl(matrix)
+    for row, close in enumerate(closes):
+        assert_matches(ta_impl(close), [out[row] for out in got], float(np.abs(matrix).max()))
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_short_series(name):
+    # Series shorter than most windows keep the same NaN head as ta
+    close = synthetic_ohlcv(15, seed=1)["Close"].reset_index(drop=True)
+    ta_impl, kernel_impl = CASES[name]
+    x = kernels.as_float_array(close.to_numpy())
+    assert_matches(ta_impl(close), kernel_impl(x), float(np.abs(x).max()))
+
+
+# The incremental engine's running states, named as in CASES: (factory, values of a state as a tuple)
+STATES = {
+    "SMA20": (lambda: RollingWindow(20), lambda s: (s.mean,)),
+    "SMA200": (lambda: RollingWindow(200), lambda s: (s.mean,)),
+    "EMA20": (lambda: EMAState.from_span(20), lambda s: (s.value,)),
+    "RSI14": (lambda: RSIState(14), lambda s: (s.value,)),
+    "MACD": (lambda: MACDState(12, 26, 9), lambda s: (s.macd, s.signal, s.macd - s.signal)),
+    "BB20": (lambda: RollingWindow(20), lambda s: (s.mean + 2 * s.std, s.mean, s.mean - 2 * s.std)),
+}
+
+
+def ta_columns(close):
+    """The ``ta`` value of every column StreamingIndicators produces"""
+    macd = ta.trend.MACD(close)
+    bands = ta.volatility.BollingerBands(close)
+    return {
+        "SMA20": ta.trend.sma_indicator(close, window=20),
+        "SMA50": ta.trend.sma_indicator(close, window=50),
+        "SMA200": ta.trend.sma_indicator(close, window=200),
+        "EMA20": ta.trend.ema_indicator(close, window=20),
+        "EMA50": ta.trend.ema_indicator(close, window=50),
+        "RSI": ta.momentum.rsi(close, window=14),
+        "MACD": macd.macd(),
+        "MACD_Signal": macd.macd_signal(),
+        "MACD_Hist": macd.macd_diff(),
+        "BB_Upper": bands.bollinger_hband(),
+        "BB_Lower": bands.bollinger_lband(),
+        "BB_Mid": bands.bollinger_mavg(),
+    }
+
+
+@pytest.mark.parametrize("revise", [False, True], ids=["push", "undo"])
+@pytest.mark.parametrize("name", STATES)
+def test_state_matches_ta(name, revise, closes):
+    factory, values = STATES[name]
+    state = factory()
+    got = []
+    for close in closes[0].to_numpy():
+        if revise:
+            # A forming bar whose close moved before the bar completed
+            state.push(close * 1.05)
+            state.undo()
+        state.push(close)
+        got.append(values(state))
+    assert_matches(CASES[name][0](closes[0]), np.array(got).T, float(closes[0].abs().max()))
+
+
+@pytest.mark.parametrize("revise", [False, True], ids=["update", "revise"])
+def test_streaming_matches_ta(revise, closes):
+    close = closes[0]
+    engine = StreamingIndicators()
+    rows = []
+    for value in close.to_numpy():
+        if revise:
+            engine.update(value * 0.95)
+            rows.append(engine.revise(value))
+        else:
+            rows.append(engine.update(value))
+    expected = ta_columns(close)
+    got = [np.array([row[column] for row in rows]) for column in INDICATOR_COLUMNS]
+    assert_matches([expected[column] for column in INDICATOR_COLUMNS], got, float(close.abs().max()))
+
+
+def test_live_tail_splice_matches_ta():
+    df = synthetic_ohlcv(1_000, seed=4, interval="5m")
+    history = ensure_indicators(df.iloc[:800], INDICATOR_COLUMNS)
+    tail = LiveTail(history)
+    # Polls from the history's last bar on; the newest bar is still forming and its close moves
+    for end in range(800, 1_001, 7):
+        bars = df.iloc[799:end].copy()
+        bars.iloc[-1, bars.columns.get_loc("Close")] *= 1.02
+        tail.splice(bars)
+    live = tail.splice(df.iloc[799:])
+
+    assert live.index.equals(df.index)
+    expected = ta_columns(df["Close"])
+    assert_matches([expected[column] for column in INDICATOR_COLUMNS],
+                   [live[column].to_numpy() for column in INDICATOR_COLUMNS], float(df["Close"].abs().max()))
+
+
+def test_live_tail_prunes_committed_rows():
+    df = synthetic_ohlcv(300, seed=5, interval="5m")
+    history = df.iloc[:200].copy()
+    tail = LiveTail(history)
+    tail.splice(df.iloc[199:])
+    assert len(tail._committed) == 100
+    # Once polls start later, the rows before them are dropped
+    tail.splice(df.iloc[290:])
+    assert min(tail._committed) >= df.index[290]
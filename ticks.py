@@ -0,0 +1,279 @@
+"""Fixed-memory tick buffers with incremental intraday bar aggregation.
+
+Each watched symbol gets a ``SymbolTicks``: a preallocated ring of the most
+recent ticks and one ring of OHLCV bars per bar interval. Rings use the same
+layout as the bar store, a float64 table whose row 0 holds int64 nanosecond
+timestamps reinterpreted as float64 bits, so appending a tick writes a few
+array slots and allocates no Python objects per tick. Memory per symbol is
+fixed by the capacities, which keeps hundreds of symbols bounded.
+
+``SymbolTicks.bars`` returns a frame in the same shape as provider history
+(``Open``/``High``/``Low``/``Close``/``Volume`` on a ``Date`` index), so the
+chart and indicator code consume it directly.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_provider import INTERVAL_FREQ
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Ticks kept per symbol (3 float64 rows: ~24 bytes per tick)
+TICK_CAPACITY = 4096
+
+# Bars kept per symbol and interval (6 float64 rows: ~48 bytes per bar)
+BAR_CAPACITY = 1024
+
+# Bar intervals aggregated from ticks by default
+BAR_INTERVALS = ("1m", "5m")
+
+
+def interval_nanos(interval):
+    """Length of a bar interval such as ``"5m"`` in nanoseconds"""
+    return pd.tseries.frequencies.to_offset(INTERVAL_FREQ[interval]).nanos
+
+
+def _as_nanos(ts):
+    """Nanoseconds since the epoch (UTC) for a timestamp-like or int"""
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    ts = pd.Timestamp(ts)
+    if ts.tz is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.value
+
+
+class Ring:
+    """Preallocated ``(rows, capacity)`` float64 table used as a ring
+
+    Row 0 holds int64 nanosecond timestamps stored as float64 bits; ``times``
+    views it as int64 without copying.
+    """
+
+    def __init__(self, rows, capacity):
+        self.capacity = capacity
+        self.table = np.zeros((rows, capacity))
+        self.times = self.table[0].view(np.int64)
+        self.count = 0
+        # Slot of the most recent row
+        self.last = -1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def advance(self):
+        """Move to the next slot, overwriting the oldest row when full"""
+        self.last = (self.last + 1) % self.capacity
+        self.count += 1
+        return self.last
+
+    def ordered(self):
+        """Return the rows oldest-first (a copy when the ring has wrapped)"""
+        n = len(self)
+        if self.count <= self.capacity:
+            return self.table[:, :n]
+        start = self.last + 1
+        return np.concatenate((self.table[:, start:], self.table[:, :start]), axis=1)
+
+
+class BarRing(Ring):
+    """Ring of OHLCV bars of one interval, updated tick by tick"""
+
+    def __init__(self, interval, capacity=BAR_CAPACITY):
+        super().__init__(6, capacity)
+        self.interval = interval
+        self.nanos = interval_nanos(interval)
+
+    def push(self, ts, price, size):
+        """Fold one tick (nanosecond timestamp) into the current or a new bar"""
+        start = ts - ts % self.nanos
+        i = self.last
+        if i >= 0 and self.times[i] == start:
+            table = self.table
+            if price > table[2, i]:
+                table[2, i] = price
+            if price < table[3, i]:
+                table[3, i] = price
+            table[4, i] = price
+            table[5, i] += size
+        elif i < 0 or start > self.times[i]:
+            i = self.advance()
+            self.times[i] = start
+            self.table[1:5, i] = price
+            self.table[5, i] = size
+        # Ticks older than the current bar are late prints and are dropped
+
+    def extend(self, times, prices, sizes):
+        """Fold a batch of time-ordered ticks with array operations"""
+        if not len(times):
+            return
+        starts = times - times % self.nanos
+        i = self.last
+        if i >= 0:
+            keep = starts >= self.times[i]
+            times, prices, sizes, starts = times[keep], prices[keep], sizes[keep], starts[keep]
+            if not len(times):
+                return
+
+        # Boundaries between bars within the batch
+        edges = np.flatnonzero(np.diff(starts)) + 1
+        firsts = np.concatenate(([0], edges))
+        lasts = np.concatenate((edges - 1, [len(starts) - 1]))
+        high = np.maximum.reduceat(prices, firsts)
+        low = np.minimum.reduceat(prices, firsts)
+        volume = np.add.reduceat(sizes, firsts)
+
+        # The first bucket may continue the bar that is already open
+        first = 0
+        if i >= 0 and self.times[i] == starts[0]:
+            table = self.table
+            table[2, i] = max(table[2, i], high[0])
+            table[3, i] = min(table[3, i], low[0])
+            table[4, i] = prices[lasts[0]]
+            table[5, i] += volume[0]
+            first = 1
+
+        new = len(firsts) - first
+        if not new:
+            return
+        # Only the newest `capacity` bars can survive the write
+        skip = max(0, new - self.capacity)
+        slots = (self.last + 1 + skip + np.arange(new - skip)) % self.capacity
+        picked = slice(first + skip, None)
+        self.times[slots] = starts[firsts[picked]]
+        self.table[1, slots] = prices[firsts[picked]]
+        self.table[2, slots] = high[picked]
+        self.table[3, slots] = low[picked]
+        self.table[4, slots] = prices[lasts[picked]]
+        self.table[5, slots] = volume[picked]
+        self.last = int(slots[-1])
+        self.count += new
+
+
+class SymbolTicks:
+    """Recent ticks for one symbol plus the bars aggregated from them"""
+
+    def __init__(self, tick_capacity=TICK_CAPACITY, bar_capacity=BAR_CAPACITY, intervals=BAR_INTERVALS):
+        self.ticks = Ring(3, tick_capacity)
+        self.rings = {interval: BarRing(interval, bar_capacity) for interval in intervals}
+        self._rings = tuple(self.rings.values())
+        self._lock = threading.Lock()
+
+    def push(self, ts, price, size=0.0):
+        """Record one tick; ``ts`` is a timestamp or nanoseconds since the epoch (UTC)"""
+        ts = _as_nanos(ts)
+        with self._lock:
+            i = self.ticks.advance()
+            self.ticks.times[i] = ts
+            self.ticks.table[1, i] = price
+            self.ticks.table[2, i] = size
+            for ring in self._rings:
+                ring.push(ts, price, size)
+
+    def extend(self, times, prices, sizes=None):
+        """Record a batch of time-ordered ticks without a Python loop per tick"""
+        times = np.asarray(times)
+        if times.dtype.kind == "M":
+            times = times.astype("M8[ns]").view(np.int64)
+        times = times.astype(np.int64, copy=False)
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.zeros(len(times)) if sizes is None else np.asarray(sizes, dtype=np.float64)
+        n = len(times)
+        if not n:
+            return
+
+        with self._lock:
+            ring = self.ticks
+            skip = max(0, n - ring.capacity)
+            slots = (ring.last + 1 + skip + np.arange(n - skip)) % ring.capacity
+            ring.times[slots] = times[skip:]
+            ring.table[1, slots] = prices[skip:]
+            ring.table[2, slots] = sizes[skip:]
+            ring.last = int(slots[-1])
+            ring.count += n
+            for bars in self._rings:
+                bars.extend(times, prices, sizes)
+
+    def last_price(self):
+        """Price of the most recent tick, or ``None``"""
+        with self._lock:
+            return float(self.ticks.table[1, self.ticks.last]) if self.ticks.count else None
+
+    def since(self, ts):
+        """High, low, last price and total size of the ticks at or after ``ts``, or ``None``"""
+        ts = _as_nanos(ts)
+        with self._lock:
+            table = self.ticks.ordered()
+            start = int(np.searchsorted(table[0].view(np.int64), ts))
+            if start == table.shape[1]:
+                return None
+            prices = table[1, start:]
+            return float(prices.max()), float(prices.min()), float(prices[-1]), float(table[2, start:].sum())
+
+    def tick_frame(self, tz=None):
+        """Return the buffered ticks as a ``Price``/``Size`` frame"""
+        with self._lock:
+            table = self.ticks.ordered().copy()
+        return pd.DataFrame({"Price": table[1], "Size": table[2]}, index=_index(table[0], tz))
+
+    def bars(self, interval, tz=None):
+        """Return the aggregated bars of ``interval`` as an OHLCV frame"""
+        with self._lock:
+            table = self.rings[interval].ordered().copy()
+        return pd.DataFrame(table[1:].T, index=_index(table[0], tz), columns=OHLCV_COLUMNS)
+
+    def nbytes(self):
+        return self.ticks.table.nbytes + sum(ring.table.nbytes for ring in self._rings)
+
+
+def _index(times, tz):
+    index = pd.DatetimeIndex(times.view(np.int64).view("M8[ns]"), name="Date")
+    if tz:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return index
+
+
+class TickStore:
+    """Tick buffers for many symbols, created on first use"""
+
+    def __init__(self, tick_capacity=TICK_CAPACITY, bar_capacity=BAR_CAPACITY, intervals=BAR_INTERVALS):
+        self.tick_capacity = tick_capacity
+        self.bar_capacity = bar_capacity
+        self.intervals = tuple(intervals)
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, ticker):
+        return ticker.upper() in self._symbols
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def symbol(self, ticker):
+        """Return the buffer for ``ticker``, allocating it on first use"""
+        ticker = ticker.upper()
+        buffer = self._symbols.get(ticker)
+        if buffer is None:
+            with self._lock:
+                buffer = self._symbols.setdefault(
+                    ticker, SymbolTicks(self.tick_capacity, self.bar_capacity, self.intervals))
+        return buffer
+
+    def push(self, ticker, ts, price, size=0.0):
+        self.symbol(ticker).push(ts, price, size)
+
+    def extend(self, ticker, times, prices, sizes=None):
+        self.symbol(ticker).extend(times, prices, sizes)
+
+    def bars(self, ticker, interval="1m", tz=None):
+        return self.symbol(ticker).bars(interval, tz)
+
+    def drop(self, ticker):
+        with self._lock:
+            self._symbols.pop(ticker.upper(), None)
+
+    def nbytes(self):
+        """Total memory held by all symbol buffers"""
+        return sum(buffer.nbytes() for buffer in list(self._symbols.values()))